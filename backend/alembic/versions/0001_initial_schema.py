@@ -0,0 +1,228 @@
+"""initial schema
+
+Tables as created by init_db()/init.sql. Databases that already have them
+should be marked as migrated with `alembic stamp 0001` instead of upgraded.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 09:52:22.291597
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('username', sa.String(length=255), nullable=False),
+    sa.Column('hashed_password', sa.String(length=255), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('is_superuser', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+    op.create_table('agents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('role', sa.String(length=255), nullable=False),
+    sa.Column('goal', sa.Text(), nullable=False),
+    sa.Column('backstory', sa.Text(), nullable=False),
+    sa.Column('tools', sa.JSON(), nullable=True),
+    sa.Column('llm_config', sa.JSON(), nullable=True),
+    sa.Column('memory_enabled', sa.Boolean(), nullable=True),
+    sa.Column('allow_delegation', sa.Boolean(), nullable=True),
+    sa.Column('verbose', sa.Boolean(), nullable=True),
+    sa.Column('cache_results', sa.Boolean(), nullable=True),
+    sa.Column('total_executions', sa.Integer(), nullable=True),
+    sa.Column('successful_executions', sa.Integer(), nullable=True),
+    sa.Column('success_rate', sa.Integer(), nullable=True),
+    sa.Column('avg_response_time', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_agents_id'), 'agents', ['id'], unique=False)
+    op.create_table('latency_sketches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('worker_id', sa.String(length=100), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('subject', sa.String(length=50), nullable=False),
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('day', sa.DateTime(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('sketch', sa.JSON(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('worker_id', 'subject', 'model', 'day', name='uq_latency_sketches_worker_subject_model_day')
+    )
+    op.create_index('idx_latency_sketches_user_day', 'latency_sketches', ['user_id', 'day'], unique=False)
+    op.create_index(op.f('ix_latency_sketches_id'), 'latency_sketches', ['id'], unique=False)
+    op.create_table('usage_counts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('metric', sa.String(length=50), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'metric', 'bucket_start', name='uq_usage_counts_user_metric_bucket')
+    )
+    op.create_index(op.f('ix_usage_counts_id'), 'usage_counts', ['id'], unique=False)
+    op.create_table('workflows',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('workflow_definition', sa.JSON(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_workflows_id'), 'workflows', ['id'], unique=False)
+    op.create_table('teams',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('process_type', sa.String(length=50), nullable=True),
+    sa.Column('max_concurrency', sa.Integer(), nullable=True),
+    sa.Column('reducer_agent_id', sa.Integer(), nullable=True),
+    sa.Column('merge_template', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['reducer_agent_id'], ['agents.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_teams_id'), 'teams', ['id'], unique=False)
+    op.create_table('workflow_edges',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('workflow_id', sa.Integer(), nullable=False),
+    sa.Column('edge_id', sa.String(length=100), nullable=False),
+    sa.Column('source_node_id', sa.String(length=100), nullable=False),
+    sa.Column('target_node_id', sa.String(length=100), nullable=False),
+    sa.Column('source_handle', sa.String(length=100), nullable=True),
+    sa.Column('target_handle', sa.String(length=100), nullable=True),
+    sa.Column('edge_type', sa.String(length=50), nullable=True),
+    sa.ForeignKeyConstraint(['workflow_id'], ['workflows.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_workflow_edges_id'), 'workflow_edges', ['id'], unique=False)
+    op.create_table('workflow_nodes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('workflow_id', sa.Integer(), nullable=False),
+    sa.Column('node_id', sa.String(length=100), nullable=False),
+    sa.Column('node_type', sa.String(length=50), nullable=False),
+    sa.Column('position_x', sa.Integer(), nullable=True),
+    sa.Column('position_y', sa.Integer(), nullable=True),
+    sa.Column('data', sa.JSON(), nullable=True),
+    sa.Column('config', sa.JSON(), nullable=True),
+    sa.ForeignKeyConstraint(['workflow_id'], ['workflows.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_workflow_nodes_id'), 'workflow_nodes', ['id'], unique=False)
+    op.create_table('conversations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=True),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_conversations_id'), 'conversations', ['id'], unique=False)
+    op.create_table('execution_records',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('agent_id', sa.Integer(), nullable=True),
+    sa.Column('team_id', sa.Integer(), nullable=True),
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('duration_ms', sa.Integer(), nullable=False),
+    sa.Column('ttft_ms', sa.Integer(), nullable=True),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=True),
+    sa.Column('completion_tokens', sa.Integer(), nullable=True),
+    sa.Column('success', sa.Boolean(), nullable=False),
+    sa.Column('error_class', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['agent_id'], ['agents.id'], ),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_execution_records_user_created', 'execution_records', ['user_id', 'created_at'], unique=False)
+    op.create_index(op.f('ix_execution_records_agent_id'), 'execution_records', ['agent_id'], unique=False)
+    op.create_index(op.f('ix_execution_records_id'), 'execution_records', ['id'], unique=False)
+    op.create_index(op.f('ix_execution_records_team_id'), 'execution_records', ['team_id'], unique=False)
+    op.create_table('team_agents',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('team_id', sa.Integer(), nullable=False),
+    sa.Column('agent_id', sa.Integer(), nullable=False),
+    sa.Column('order', sa.Integer(), nullable=True),
+    sa.Column('is_manager', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['agent_id'], ['agents.id'], ),
+    sa.ForeignKeyConstraint(['team_id'], ['teams.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_team_agents_id'), 'team_agents', ['id'], unique=False)
+    op.create_table('messages',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('conversation_id', sa.Integer(), nullable=False),
+    sa.Column('agent_id', sa.Integer(), nullable=True),
+    sa.Column('role', sa.String(length=50), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['agent_id'], ['agents.id'], ),
+    sa.ForeignKeyConstraint(['conversation_id'], ['conversations.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_messages_id'), 'messages', ['id'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_messages_id'), table_name='messages')
+    op.drop_table('messages')
+    op.drop_index(op.f('ix_team_agents_id'), table_name='team_agents')
+    op.drop_table('team_agents')
+    op.drop_index(op.f('ix_execution_records_team_id'), table_name='execution_records')
+    op.drop_index(op.f('ix_execution_records_id'), table_name='execution_records')
+    op.drop_index(op.f('ix_execution_records_agent_id'), table_name='execution_records')
+    op.drop_index('idx_execution_records_user_created', table_name='execution_records')
+    op.drop_table('execution_records')
+    op.drop_index(op.f('ix_conversations_id'), table_name='conversations')
+    op.drop_table('conversations')
+    op.drop_index(op.f('ix_workflow_nodes_id'), table_name='workflow_nodes')
+    op.drop_table('workflow_nodes')
+    op.drop_index(op.f('ix_workflow_edges_id'), table_name='workflow_edges')
+    op.drop_table('workflow_edges')
+    op.drop_index(op.f('ix_teams_id'), table_name='teams')
+    op.drop_table('teams')
+    op.drop_index(op.f('ix_workflows_id'), table_name='workflows')
+    op.drop_table('workflows')
+    op.drop_index(op.f('ix_usage_counts_id'), table_name='usage_counts')
+    op.drop_table('usage_counts')
+    op.drop_index(op.f('ix_latency_sketches_id'), table_name='latency_sketches')
+    op.drop_index('idx_latency_sketches_user_day', table_name='latency_sketches')
+    op.drop_table('latency_sketches')
+    op.drop_index(op.f('ix_agents_id'), table_name='agents')
+    op.drop_table('agents')
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
@@ -0,0 +1,37 @@
+"""list endpoint indexes
+
+Composite indexes matching the keyset-paginated list queries in app/api.
+On PostgreSQL they are built CONCURRENTLY so large tables stay writable.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:52:39.170525
+"""
+from alembic import op
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('idx_agents_user_active', 'agents', ['user_id', 'is_active', 'id']),
+    ('idx_teams_user_active', 'teams', ['user_id', 'is_active', 'id']),
+    ('idx_team_agents_team_order', 'team_agents', ['team_id', 'order']),
+    ('idx_workflows_user_active', 'workflows', ['user_id', 'is_active', 'id']),
+    ('idx_workflow_nodes_workflow_id', 'workflow_nodes', ['workflow_id']),
+    ('idx_workflow_edges_workflow_id', 'workflow_edges', ['workflow_id']),
+    ('idx_conversations_user_created', 'conversations', ['user_id', 'created_at', 'id']),
+    ('idx_messages_conversation_created', 'messages', ['conversation_id', 'created_at', 'id']),
+]
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
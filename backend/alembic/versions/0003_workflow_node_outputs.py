@@ -0,0 +1,38 @@
+"""workflow node outputs
+
+Memoized agent node outputs used to skip unchanged nodes on workflow reruns.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:06:51.402318
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('workflow_node_outputs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('workflow_id', sa.Integer(), nullable=False),
+    sa.Column('node_key', sa.String(length=64), nullable=False),
+    sa.Column('node_id', sa.String(length=100), nullable=False),
+    sa.Column('output', sa.LargeBinary(), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('llm_ms', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['workflow_id'], ['workflows.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('workflow_id', 'node_key', name='uq_workflow_node_outputs_workflow_key')
+    )
+    op.create_index('idx_workflow_node_outputs_workflow_used', 'workflow_node_outputs', ['workflow_id', 'last_used_at'], unique=False)
+    op.create_index(op.f('ix_workflow_node_outputs_id'), 'workflow_node_outputs', ['id'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_workflow_node_outputs_id'), table_name='workflow_node_outputs')
+    op.drop_index('idx_workflow_node_outputs_workflow_used', table_name='workflow_node_outputs')
+    op.drop_table('workflow_node_outputs')
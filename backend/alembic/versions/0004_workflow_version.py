@@ -0,0 +1,21 @@
+"""workflow version
+
+Graph version used to key the compiled workflow graph cache.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 15:21:07.118240
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('workflows', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+def downgrade():
+    op.drop_column('workflows', 'version')
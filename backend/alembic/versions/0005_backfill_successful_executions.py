@@ -0,0 +1,27 @@
+"""backfill successful executions
+
+Agents created before the counters were buffered only stored success_rate
+(a percentage); derive successful_executions from it so the first flush
+doesn't reset their rate.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 18:02:44.530917
+"""
+from alembic import op
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute(
+        "UPDATE agents "
+        "SET successful_executions = CAST(ROUND(COALESCE(success_rate, 0) * total_executions / 100.0) AS INTEGER) "
+        "WHERE total_executions > 0 AND COALESCE(successful_executions, 0) = 0"
+    )
+
+def downgrade():
+    # The backfilled counts are consistent with success_rate; nothing to undo
+    pass
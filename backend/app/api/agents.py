@@ -1,11 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.core.security import get_current_user
+from typing import List, Dict, Any, Optional
+from app.core.database import get_db, get_async_db, SessionLocal
+from app.core.security import get_current_user, get_current_user_async, get_user_from_token
+from app.core.pagination import paginate_async, DEFAULT_PAGE_SIZE
 from app.models.user import User
 from app.models.agent import Agent
 from app.services.agent_service import AgentService
+from app.services.agent_cache import agent_cache
+from app.services.tool_registry import tool_registry
+from app.services.analytics_service import invalidate_dashboard
+from app.services.execution_events import receive_request, sse_execution, stream_execution, SSE_HEADERS
+from app.services.admission import admission, retry_after
 from app.schemas.agent import AgentCreate, AgentResponse, AgentUpdate, TaskExecute, AgentExecutionResult
 
 router = APIRouter()
@@ -19,33 +31,40 @@ def create_agent(
     """Create a new AI agent with Cerebras integration"""
     agent_service = AgentService(db)
     agent = agent_service.create_agent(current_user.id, agent_data.dict())
+    invalidate_dashboard(current_user.id)
     return agent
 
 @router.get("/", response_model=List[AgentResponse])
-def get_agents(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_agents(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
-    """Get user's agents"""
-    agents = db.query(Agent).filter(
+    """Get user's agents, one keyset page at a time (next cursor in X-Next-Cursor)"""
+    statement = select(Agent).where(
         Agent.user_id == current_user.id,
         Agent.is_active == True
-    ).offset(skip).limit(limit).all()
-    return agents
+    )
+    return await paginate_async(db, statement, [Agent.id], cursor, limit, response)
+
+@router.get("/tools", response_model=List[Dict[str, Any]])
+async def get_available_tools(current_user: User = Depends(get_current_user_async)):
+    """List tools agents can use, with import/build timings for tools already built"""
+    return tool_registry.stats()
 
 @router.get("/{agent_id}", response_model=AgentResponse)
-def get_agent(
+async def get_agent(
     agent_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Get specific agent"""
-    agent = db.query(Agent).filter(
+    agent = await db.scalar(select(Agent).where(
         Agent.id == agent_id,
         Agent.user_id == current_user.id
-    ).first()
+    ))
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
     return agent
@@ -68,9 +87,83 @@ def execute_agent(
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
     
-    result = agent_service.execute_single_agent(agent_id, task_data.task_description)
+    with admission.acquire(current_user.id, [agent_id]):
+        result = agent_service.execute_single_agent(agent_id, task_data.task_description)
     return AgentExecutionResult(**result)
 
+@router.post("/{agent_id}/execute/stream")
+def execute_agent_stream(
+    agent_id: int,
+    task_data: TaskExecute,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Execute agent task, streaming progress events and the final result as SSE"""
+    agent = db.query(Agent).filter(
+        Agent.id == agent_id,
+        Agent.user_id == current_user.id
+    ).first()
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    
+    lease = admission.acquire(current_user.id, [agent_id])
+    return StreamingResponse(
+        sse_execution("agent", agent_id, task_data.task_description, lease),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+        # The execution thread releases the lease; this covers a client gone before it started
+        background=BackgroundTask(lease.release_unclaimed)
+    )
+
+def _open_agent_socket(token: str, agent_id: int) -> int:
+    """Authenticate an execution socket for an owned agent; the session isn't held open"""
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(token, db)
+        agent = db.query(Agent.id).filter(
+            Agent.id == agent_id,
+            Agent.user_id == user.id
+        ).first()
+        if not agent:
+            raise HTTPException(status_code=404, detail="Agent not found")
+        return user.id
+    finally:
+        db.close()
+
+@router.websocket("/{agent_id}/execute/ws")
+async def execute_agent_ws(
+    websocket: WebSocket,
+    agent_id: int,
+    token: str
+):
+    """Execute agent tasks over a WebSocket, streaming progress events and results"""
+    try:
+        user_id = await run_in_threadpool(_open_agent_socket, token, agent_id)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    try:
+        while True:
+            task_data = await receive_request(websocket, TaskExecute)
+            if task_data is None:
+                continue
+            try:
+                lease = await admission.acquire_async(user_id, [agent_id])
+            except HTTPException as exc:
+                await websocket.send_json({"type": "error", "detail": exc.detail, "retry_after": retry_after(exc)})
+                continue
+            try:
+                async for event in stream_execution("agent", agent_id, task_data.task_description, lease):
+                    await websocket.send_json(jsonable_encoder(event))
+            finally:
+                # Held until the execution thread finishes, even if this socket closes first
+                if not lease.claimed:
+                    await admission.release_async(lease)
+    except WebSocketDisconnect:
+        pass
+
 @router.put("/{agent_id}", response_model=AgentResponse)
 def update_agent(
     agent_id: int,
@@ -92,6 +185,8 @@ def update_agent(
     
     db.commit()
     db.refresh(agent)
+    agent_cache.invalidate(agent_id)
+    invalidate_dashboard(current_user.id)
     return agent
 
 @router.delete("/{agent_id}")
@@ -110,4 +205,6 @@ def delete_agent(
     
     agent.is_active = False
     db.commit()
+    agent_cache.invalidate(agent_id)
+    invalidate_dashboard(current_user.id)
     return {"message": "Agent deleted successfully"} 
\ No newline at end of file
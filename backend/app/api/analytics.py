@@ -1,12 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from app.core.database import get_db
-from app.core.security import get_current_user
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc, select
+from app.core.database import get_async_db
+from app.core.security import get_current_user_async
+from app.services.analytics_service import dashboard_cache, hour_bucket, usage_series, usage_window, BUCKET_SIZES
+from app.services.performance_service import performance_summary, error_breakdown, EMPTY_PERFORMANCE
 from app.models.user import User
 from app.models.agent import Agent, Team
-from app.models.conversation import Conversation, Message
-from typing import Dict, List, Any
+from app.models.conversation import Conversation
+from app.models.usage import UsageCount
+from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 from pydantic import BaseModel
 
@@ -22,64 +25,56 @@ class DashboardMetrics(BaseModel):
     recent_conversations: List[Dict[str, Any]]
 
 @router.get("/dashboard", response_model=DashboardMetrics)
-def get_dashboard_metrics(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_dashboard_metrics(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Get dashboard metrics for a user"""
+    cached = dashboard_cache.get(current_user.id)
+    if cached is not None:
+        return cached
     
-    # Agent metrics
-    total_agents = db.query(Agent).filter(
-        Agent.user_id == current_user.id,
-        Agent.is_active == True
-    ).count()
-    
-    # Most active agent
-    most_active_agent = db.query(Agent).filter(
-        Agent.user_id == current_user.id,
-        Agent.is_active == True
-    ).order_by(desc(Agent.total_executions)).first()
-    
-    # Team metrics
-    total_teams = db.query(Team).filter(
-        Team.user_id == current_user.id,
-        Team.is_active == True
-    ).count()
-    
-    # Recent conversations
-    recent_conversations = db.query(Conversation).filter(
-        Conversation.user_id == current_user.id
-    ).order_by(desc(Conversation.created_at)).limit(5).all()
+    active_agents = (Agent.user_id == current_user.id, Agent.is_active == True)
+    most_active_agent = select(Agent.name, Agent.total_executions).where(
+        *active_agents
+    ).order_by(desc(Agent.total_executions)).limit(1).subquery()
     
     # Usage metrics (last 30 days)
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
     
-    total_messages = db.query(Message).join(Conversation).filter(
-        Conversation.user_id == current_user.id,
-        Message.created_at >= thirty_days_ago
-    ).count()
-    
-    # Average response time
-    avg_response_time = db.query(func.avg(Agent.avg_response_time)).filter(
-        Agent.user_id == current_user.id,
-        Agent.is_active == True
-    ).scalar() or 0
+    # All counters in a single round trip
+    metrics = (await db.execute(select(
+        select(func.count(Agent.id)).where(*active_agents).scalar_subquery().label("total_agents"),
+        select(func.avg(Agent.avg_response_time)).where(*active_agents).scalar_subquery().label("avg_response_time"),
+        select(func.avg(Agent.success_rate)).where(*active_agents).scalar_subquery().label("avg_success_rate"),
+        select(func.count(Team.id)).where(
+            Team.user_id == current_user.id,
+            Team.is_active == True
+        ).scalar_subquery().label("total_teams"),
+        # At most 720 hourly counters instead of a scan over the message history
+        select(func.coalesce(func.sum(UsageCount.count), 0)).where(
+            UsageCount.user_id == current_user.id,
+            UsageCount.metric == "messages",
+            UsageCount.bucket_start >= hour_bucket(thirty_days_ago)
+        ).scalar_subquery().label("total_messages"),
+        select(most_active_agent.c.name).scalar_subquery().label("most_active_name"),
+        select(most_active_agent.c.total_executions).scalar_subquery().label("most_active_executions")
+    ))).one()
     
-    # Success rate
-    avg_success_rate = db.query(func.avg(Agent.success_rate)).filter(
-        Agent.user_id == current_user.id,
-        Agent.is_active == True
-    ).scalar() or 0
+    # Recent conversations
+    recent_conversations = (await db.scalars(select(Conversation).where(
+        Conversation.user_id == current_user.id
+    ).order_by(desc(Conversation.created_at)).limit(5))).all()
     
-    return DashboardMetrics(
-        total_agents=total_agents,
-        total_teams=total_teams,
-        total_messages=total_messages,
-        avg_response_time=int(avg_response_time),
-        avg_success_rate=int(avg_success_rate),
+    dashboard = DashboardMetrics(
+        total_agents=metrics.total_agents,
+        total_teams=metrics.total_teams,
+        total_messages=metrics.total_messages,
+        avg_response_time=int(metrics.avg_response_time or 0),
+        avg_success_rate=int(metrics.avg_success_rate or 0),
         most_active_agent={
-            "name": most_active_agent.name if most_active_agent else None,
-            "executions": most_active_agent.total_executions if most_active_agent else 0
+            "name": metrics.most_active_name,
+            "executions": metrics.most_active_executions or 0
         },
         recent_conversations=[
             {
@@ -89,66 +84,98 @@ def get_dashboard_metrics(
             } for conv in recent_conversations
         ]
     )
+    dashboard_cache.set(current_user.id, dashboard)
+    return dashboard
 
 @router.get("/performance")
-def get_agent_performance_data(
+async def get_agent_performance_data(
     days: int = 30,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
-    """Get agent performance data for charts"""
+    """Get agent performance data for charts, with p50/p95/p99 latency over the last `days` days"""
     cutoff_date = datetime.utcnow() - timedelta(days=days)
     
-    agents = db.query(Agent).filter(
+    agents = (await db.scalars(select(Agent).where(
         Agent.user_id == current_user.id,
         Agent.is_active == True,
         Agent.created_at >= cutoff_date
-    ).all()
+    ))).all()
+    # Service helpers take a sync Session; run_sync bridges without a thread hop
+    performance = await db.run_sync(performance_summary, current_user.id, days)
     
     return [
         {
+            "id": agent.id,
             "name": agent.name,
             "executions": agent.total_executions,
             "success_rate": agent.success_rate,
             "avg_response_time": agent.avg_response_time,
-            "created_at": agent.created_at.isoformat()
+            "created_at": agent.created_at.isoformat(),
+            **performance.get(f"agent:{agent.id}", EMPTY_PERFORMANCE)
         } for agent in agents
     ]
 
+@router.get("/performance/teams")
+async def get_team_performance_data(
+    days: int = 30,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Get team execution latency percentiles over the last `days` days"""
+    teams = (await db.scalars(select(Team).where(
+        Team.user_id == current_user.id,
+        Team.is_active == True
+    ))).all()
+    performance = await db.run_sync(performance_summary, current_user.id, days)
+    
+    return [
+        {
+            "id": team.id,
+            "name": team.name,
+            "process_type": team.process_type,
+            **performance.get(f"team:{team.id}", EMPTY_PERFORMANCE)
+        } for team in teams
+    ]
+
+@router.get("/performance/errors")
+async def get_execution_errors(
+    days: int = 30,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Get failed executions over the last `days` days grouped by error class"""
+    return await db.run_sync(error_breakdown, current_user.id, days)
+
 @router.get("/trends")
-def get_usage_trends(
+async def get_usage_trends(
     days: int = 30,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    bucket: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
-    """Get usage trends over time"""
-    cutoff_date = datetime.utcnow() - timedelta(days=days)
+    """Get usage trends over time (hour, day or week buckets; defaults to the last `days` days).
+
+    Counters are hourly, so the range is widened to whole hours; the
+    returned start and end are the range actually counted.
+    """
+    if bucket not in BUCKET_SIZES:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of: {', '.join(BUCKET_SIZES)}")
     
-    # Daily message counts
-    daily_messages = db.query(
-        func.date(Message.created_at).label('date'),
-        func.count(Message.id).label('count')
-    ).join(Conversation).filter(
-        Conversation.user_id == current_user.id,
-        Message.created_at >= cutoff_date
-    ).group_by(func.date(Message.created_at)).all()
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=days)
     
-    # Agent creation trend
-    daily_agents = db.query(
-        func.date(Agent.created_at).label('date'),
-        func.count(Agent.id).label('count')
-    ).filter(
-        Agent.user_id == current_user.id,
-        Agent.created_at >= cutoff_date
-    ).group_by(func.date(Agent.created_at)).all()
+    # Read pre-aggregated hourly counters instead of scanning raw messages
+    series = await db.run_sync(usage_series, current_user.id, start, end, bucket)
+    start, end = usage_window(start, end)
     
     return {
-        "message_trends": [
-            {"date": str(date), "count": count} 
-            for date, count in daily_messages
-        ],
-        "agent_creation_trends": [
-            {"date": str(date), "count": count} 
-            for date, count in daily_agents
-        ]
-    } 
\ No newline at end of file
+        "bucket": bucket,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "message_trends": series["messages"],
+        "agent_creation_trends": series["agent_creations"],
+        "execution_trends": series["executions"]
+    }
@@ -1,29 +1,34 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token, get_current_user
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.core.security import password_hasher, create_access_token, get_current_user_async
 from app.models.user import User
 from app.schemas.user import UserCreate, UserResponse, UserLogin, Token
 
 router = APIRouter()
 
+# Auth endpoints run on the async session: bcrypt goes to the dedicated
+# password_hasher pool and DB calls never take a threadpool slot.
+
 @router.post("/register", response_model=UserResponse)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Check if user already exists
-    existing_user = db.query(User).filter(
+    existing_user = await db.scalar(select(User).where(
         (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    ))
     
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User with this email or username already exists"
         )
+    await db.commit()  # Don't hold a pooled connection while bcrypt runs
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -31,18 +36,22 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login user and return access token"""
     # Find user by email
-    user = db.query(User).filter(User.email == user_credentials.email).first()
+    user = await db.scalar(select(User).where(User.email == user_credentials.email))
+    await db.commit()  # Don't hold a pooled connection while bcrypt runs; user stays loaded
     
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await password_hasher.verify_and_update(user_credentials.password, user.hashed_password)
+    
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -55,13 +64,18 @@ def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
             detail="Inactive user"
         )
     
+    # Transparently upgrade hashes made with an older BCRYPT_ROUNDS
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
     # Create access token
     access_token = create_access_token(data={"sub": str(user.id)})
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user_async)):
     """Get current user information"""
     return current_user
 
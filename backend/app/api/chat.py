@@ -1,68 +1,242 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.core.database import get_db
-from app.services.cerebras_service import CerebrasService
+from app.core.database import get_db, SessionLocal
+from app.core.security import get_current_user, get_user_from_token
+from app.core.pagination import paginate, DEFAULT_PAGE_SIZE
+from app.services.cerebras_service import get_cerebras_service
+from app.services.message_sink import message_sink
+from app.services.connections import connection_manager
+from app.services.admission import admission, retry_after
+from app.services.framing import coalesce, coalesce_window, negotiate
+from app.services.chat_context import load_context
+from app.services.performance_service import record_execution
 from app.models.agent import Agent
-import json
-import asyncio
-from typing import List
+from app.models.conversation import Conversation, Message
+from app.models.user import User
+from app.schemas.conversation import ChatMessageIn, ConversationResponse, MessageResponse
+from app.services.execution_events import receive_request
+from contextlib import aclosing
+import logging
+import time
+from typing import List, Optional
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-    
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-    
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-    
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+# Client keepalives, answered or ignored instead of being treated as chat input
+HEARTBEAT_TYPES = ("ping", "pong")
+
+def _open_chat(token: str, agent_id: int, conversation_id: Optional[int]):
+    """Authenticate a chat connection and load its agent persona and conversation history"""
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(token, db)
+        agent = db.query(Agent).filter(Agent.id == agent_id, Agent.user_id == user.id).first()
+        if not agent:
+            raise HTTPException(status_code=404, detail="Agent not found")
+        if conversation_id is not None:
+            conversation = db.query(Conversation).filter(
+                Conversation.id == conversation_id,
+                Conversation.user_id == user.id
+            ).first()
+            if not conversation:
+                raise HTTPException(status_code=404, detail="Conversation not found")
+        
+        cerebras = get_cerebras_service()
+        config_type = (agent.llm_config or {}).get("config_type", "fast_chat")
+        if config_type not in cerebras.llm_configs:
+            config_type = "fast_chat"
+        budget = cerebras.llm_configs[config_type]["prompt_token_budget"]
+        return user.id, config_type, load_context(db, agent, budget, conversation_id)
+    finally:
+        db.close()
+
+def _record_reply(
+    user_id: int,
+    agent_id: int,
+    model: str,
+    duration_ms: int,
+    ttft_ms: Optional[int],
+    error: Optional[BaseException] = None
+):
+    """Record one chat reply: time to its first coalesced piece and to the end of the stream"""
+    db = SessionLocal()
+    try:
+        record_execution(
+            db,
+            user_id=user_id,
+            subject=f"agent:{agent_id}",
+            model=model,
+            duration_ms=duration_ms,
+            agent_id=agent_id,
+            ttft_ms=ttft_ms,
+            error=error
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("Failed to record chat reply for agent %s", agent_id)
+    finally:
+        db.close()
 
-manager = ConnectionManager()
+def _create_conversation(user_id: int, title: str) -> int:
+    db = SessionLocal()
+    try:
+        conversation = Conversation(user_id=user_id, title=title[:255] or "New conversation")
+        db.add(conversation)
+        db.commit()
+        return conversation.id
+    finally:
+        db.close()
 
 @router.websocket("/ws/{agent_id}")
-async def websocket_chat(websocket: WebSocket, agent_id: int):
-    await manager.connect(websocket)
-    cerebras = CerebrasService()
+async def websocket_chat(
+    websocket: WebSocket,
+    agent_id: int,
+    token: str,
+    conversation_id: Optional[int] = None,
+    coalesce_ms: Optional[int] = None,
+    coalesce_bytes: Optional[int] = None
+):
+    try:
+        user_id, config_type, context = await run_in_threadpool(_open_chat, token, agent_id, conversation_id)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    # chat.v2.* subprotocols get compact (or msgpack) frames; everyone else the original JSON
+    subprotocol, codec = negotiate(websocket)
+    connection = await connection_manager.connect(websocket, user_id, subprotocol, codec)
+    window_seconds, max_bytes = coalesce_window(coalesce_ms, coalesce_bytes)
+    cerebras = get_cerebras_service()
+    model = cerebras.llm_configs[config_type]["model"]
+    topic = f"conversation:{conversation_id}"
     
     try:
+        # Other sockets on this conversation, on any worker, see the same stream
+        if conversation_id is not None:
+            await connection_manager.subscribe(connection, topic)
+        
         while True:
-            # Receive message from client
-            data = await websocket.receive_text()
-            message_data = json.loads(data)
+            # Receive message from client; malformed frames get an error and the socket stays open
+            message = await receive_request(websocket, ChatMessageIn, lambda error: connection_manager.send(connection, error))
+            connection.touch()
+            if message is None:
+                continue
+            if message.type in HEARTBEAT_TYPES:
+                if message.type == "ping":
+                    connection_manager.send(connection, {"type": "pong"})
+                else:
+                    connection.pong()
+                continue
             
-            # Prepare conversation history
-            messages = [
-                {"role": "system", "content": "You are a helpful AI assistant."},
-                {"role": "user", "content": message_data["content"]}
-            ]
+            # Each message is one LLM call, charged to the user and the agent
+            try:
+                lease = await admission.acquire_async(user_id, [agent_id])
+            except HTTPException as exc:
+                connection_manager.send(connection, {"type": "error", "detail": exc.detail, "retry_after": retry_after(exc)})
+                continue
             
-            # Stream response from Cerebras
-            response_chunks = []
-            async for chunk in cerebras.stream_response(messages):
-                response_chunks.append(chunk)
-                # Send each chunk to client in real-time
-                await manager.send_personal_message(
-                    json.dumps({
-                        "type": "chunk",
-                        "content": chunk
-                    }),
-                    websocket
+            try:
+                # The conversation is created with the first message (one INSERT per chat, not per message)
+                if conversation_id is None:
+                    conversation_id = await run_in_threadpool(_create_conversation, user_id, message.content[:50])
+                    topic = f"conversation:{conversation_id}"
+                    await connection_manager.subscribe(connection, topic)
+                    connection_manager.send(connection, {"type": "conversation", "conversation_id": conversation_id})
+                message_sink.submit(user_id, conversation_id, "user", message.content)
+                await connection_manager.publish(
+                    topic,
+                    {"type": "user_message", "content": message.content},
+                    origin=connection
                 )
-            
-            # Send completion signal
-            await manager.send_personal_message(
-                json.dumps({
+                
+                # Agent persona plus as much history as fits the model's prompt budget
+                context.add("user", message.content)
+                
+                # Stream response from Cerebras, coalescing token deltas into fewer frames
+                response_chunks = []
+                started = time.perf_counter()
+                ttft_ms = None
+                frames = 0
+                stream = cerebras.stream_response(context.messages(), config_type=config_type)
+                try:
+                    async with aclosing(coalesce(stream, window_seconds, max_bytes)) as pieces:
+                        async for piece in pieces:
+                            if connection.closed:
+                                break  # Stop paying for tokens nobody will read
+                            if ttft_ms is None:
+                                ttft_ms = int((time.perf_counter() - started) * 1000)
+                            response_chunks.append(piece)
+                            frames += 1
+                            event = {"type": "chunk", "content": piece}
+                            connection_manager.send(connection, event)
+                            await connection_manager.publish(topic, event, origin=connection)
+                except Exception as exc:
+                    # Upstream error or timeout: report it and keep the socket for the next message
+                    logger.exception("Chat stream failed for agent %s", agent_id)
+                    event = {"type": "error", "detail": "The model failed to respond; please try again"}
+                    connection_manager.send(connection, event)
+                    await connection_manager.publish(topic, event, origin=connection)
+                    duration_ms = int((time.perf_counter() - started) * 1000)
+                    await run_in_threadpool(_record_reply, user_id, agent_id, model, duration_ms, ttft_ms, exc)
+                    continue
+                duration_ms = int((time.perf_counter() - started) * 1000)
+                if connection.closed:
+                    break
+                
+                full_response = "".join(response_chunks)
+                context.add("assistant", full_response)
+                message_sink.submit(user_id, conversation_id, "assistant", full_response, agent_id=agent_id)
+                
+                # Send completion signal; v2 clients already have the text and only get the metadata
+                event = {
                     "type": "complete",
-                    "full_response": "".join(response_chunks)
-                }),
-                websocket
-            )
+                    "full_response": full_response,
+                    "chars": len(full_response),
+                    "frames": frames,
+                    "ms": duration_ms
+                }
+                connection_manager.send(connection, event)
+                await connection_manager.publish(topic, event, origin=connection)
+                await run_in_threadpool(_record_reply, user_id, agent_id, model, duration_ms, ttft_ms)
+            finally:
+                await admission.release_async(lease)
             
     except WebSocketDisconnect:
-        manager.disconnect(websocket) 
\ No newline at end of file
+        pass
+    finally:
+        await connection_manager.disconnect(connection)
+
+@router.get("/conversations", response_model=List[ConversationResponse])
+def get_conversations(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the user's conversations, newest first (next cursor in X-Next-Cursor)"""
+    query = db.query(Conversation).filter(Conversation.user_id == current_user.id)
+    return paginate(query, [Conversation.created_at, Conversation.id], cursor, limit, response, descending=True)
+
+@router.get("/conversations/{conversation_id}/messages", response_model=List[MessageResponse])
+def get_conversation_messages(
+    conversation_id: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get a conversation's messages in order (writes land within MESSAGE_SINK_FLUSH_SECONDS)"""
+    conversation = db.query(Conversation).filter(
+        Conversation.id == conversation_id,
+        Conversation.user_id == current_user.id
+    ).first()
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    query = db.query(Message).filter(Message.conversation_id == conversation_id)
+    return paginate(query, [Message.created_at, Message.id], cursor, limit, response)
@@ -0,0 +1,102 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.core.security import get_current_user
+from app.models.user import User
+from app.models.agent import Agent, Team
+from app.services.job_service import job_queue, FINISHED_STATUSES
+from app.services.admission import admission
+from app.services.team_plan import team_agent_ids
+from app.schemas.agent import TaskExecute
+from app.schemas.team import TeamExecutionRequest
+from app.schemas.job import JobResponse
+import asyncio
+
+router = APIRouter()
+
+POLL_INTERVAL_SECONDS = 0.5
+
+def _get_owned_job(job_id: str, current_user: User):
+    job = job_queue.get(job_id)
+    if not job or job["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.post("/agents/{agent_id}", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def submit_agent_job(
+    agent_id: int,
+    task_data: TaskExecute,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Queue an agent execution and return immediately with a job ID"""
+    agent = db.query(Agent).filter(
+        Agent.id == agent_id,
+        Agent.user_id == current_user.id
+    ).first()
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
+    # Queued jobs are bounded by the job workers; only the submission rate is limited
+    admission.acquire(current_user.id, [agent_id], concurrent=False)
+    return job_queue.submit("agent", agent_id, task_data.task_description, current_user.id)
+
+@router.post("/teams/{team_id}", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def submit_team_job(
+    team_id: int,
+    execution_data: TeamExecutionRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Queue a team execution and return immediately with a job ID"""
+    team = db.query(Team).filter(
+        Team.id == team_id,
+        Team.user_id == current_user.id
+    ).first()
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+
+    admission.acquire(current_user.id, team_agent_ids(db, team), concurrent=False)
+    return job_queue.submit("team", team_id, execution_data.task_description, current_user.id)
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get job status and, once finished, its result"""
+    return _get_owned_job(job_id, current_user)
+
+@router.delete("/{job_id}", response_model=JobResponse)
+def cancel_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Cancel a queued or running job"""
+    _get_owned_job(job_id, current_user)
+    return job_queue.cancel(job_id)
+
+@router.get("/{job_id}/stream")
+def stream_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream job status changes as server-sent events until the job finishes"""
+    _get_owned_job(job_id, current_user)
+
+    async def event_stream():
+        last_status = None
+        while True:
+            job = await run_in_threadpool(job_queue.get, job_id)
+            if job is None:
+                break
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield f"event: status\ndata: {JobResponse(**job).model_dump_json()}\n\n"
+            if job["status"] in FINISHED_STATUSES:
+                break
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
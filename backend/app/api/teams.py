@@ -1,15 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.core.security import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Response, status, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import List, Optional, Tuple
+from app.core.database import get_db, SessionLocal
+from app.core.security import get_current_user, get_user_from_token
+from app.core.pagination import paginate, DEFAULT_PAGE_SIZE
 from app.models.user import User
 from app.models.agent import Team, TeamAgent, Agent
 from app.services.agent_service import AgentService
+from app.services.analytics_service import invalidate_dashboard
+from app.services.execution_events import receive_request, sse_execution, stream_execution, SSE_HEADERS
+from app.services.admission import admission, retry_after
+from app.services.team_plan import team_agent_ids
 from app.schemas.team import TeamCreate, TeamResponse, TeamUpdate, TeamAgentAdd, TeamExecutionRequest
 
 router = APIRouter()
 
+def _verify_reducer_agent(db: Session, agent_id: int, user_id: int):
+    """Ensure a parallel team's reducer agent belongs to the user"""
+    agent = db.query(Agent).filter(
+        Agent.id == agent_id,
+        Agent.user_id == user_id
+    ).first()
+    if not agent:
+        raise HTTPException(status_code=404, detail="Reducer agent not found")
+
 @router.post("/", response_model=TeamResponse)
 def create_team(
     team_data: TeamCreate,
@@ -17,29 +35,40 @@ def create_team(
     current_user: User = Depends(get_current_user)
 ):
     """Create a new team"""
+    if team_data.reducer_agent_id is not None:
+        _verify_reducer_agent(db, team_data.reducer_agent_id, current_user.id)
+    
     team = Team(
         user_id=current_user.id,
         name=team_data.name,
         description=team_data.description,
-        process_type=team_data.process_type
+        process_type=team_data.process_type,
+        max_concurrency=team_data.max_concurrency,
+        reducer_agent_id=team_data.reducer_agent_id,
+        merge_template=team_data.merge_template
     )
     
     db.add(team)
     db.commit()
     db.refresh(team)
+    invalidate_dashboard(current_user.id)
     return team
 
 @router.get("/", response_model=List[TeamResponse])
 def get_teams(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get user's teams"""
-    teams = db.query(Team).filter(
+    """Get user's teams, one keyset page at a time (next cursor in X-Next-Cursor)"""
+    # Members of the whole page arrive in one extra query
+    query = db.query(Team).options(selectinload(Team.agents)).filter(
         Team.user_id == current_user.id,
         Team.is_active == True
-    ).all()
-    return teams
+    )
+    return paginate(query, [Team.id], cursor, limit, response)
 
 @router.get("/{team_id}", response_model=TeamResponse)
 def get_team(
@@ -48,7 +77,7 @@ def get_team(
     current_user: User = Depends(get_current_user)
 ):
     """Get specific team with agents"""
-    team = db.query(Team).filter(
+    team = db.query(Team).options(joinedload(Team.agents)).filter(
         Team.id == team_id,
         Team.user_id == current_user.id
     ).first()
@@ -117,9 +146,83 @@ def execute_team(
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
     
-    result = agent_service.execute_team(team_id, execution_data.task_description)
+    with admission.acquire(current_user.id, team_agent_ids(db, team)):
+        result = agent_service.execute_team(team_id, execution_data.task_description)
     return result
 
+@router.post("/{team_id}/execute/stream")
+def execute_team_stream(
+    team_id: int,
+    execution_data: TeamExecutionRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Execute team workflow, streaming progress events and the final result as SSE"""
+    team = db.query(Team).filter(
+        Team.id == team_id,
+        Team.user_id == current_user.id
+    ).first()
+    if not team:
+        raise HTTPException(status_code=404, detail="Team not found")
+    
+    lease = admission.acquire(current_user.id, team_agent_ids(db, team))
+    return StreamingResponse(
+        sse_execution("team", team_id, execution_data.task_description, lease),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+        # The execution thread releases the lease; this covers a client gone before it started
+        background=BackgroundTask(lease.release_unclaimed)
+    )
+
+def _open_team_socket(token: str, team_id: int) -> Tuple[int, List[int]]:
+    """Authenticate an execution socket for an owned team; the session isn't held open"""
+    db = SessionLocal()
+    try:
+        user = get_user_from_token(token, db)
+        team = db.query(Team).filter(
+            Team.id == team_id,
+            Team.user_id == user.id
+        ).first()
+        if not team:
+            raise HTTPException(status_code=404, detail="Team not found")
+        return user.id, team_agent_ids(db, team)
+    finally:
+        db.close()
+
+@router.websocket("/{team_id}/execute/ws")
+async def execute_team_ws(
+    websocket: WebSocket,
+    team_id: int,
+    token: str
+):
+    """Execute team workflows over a WebSocket, streaming progress events and results"""
+    try:
+        user_id, agent_ids = await run_in_threadpool(_open_team_socket, token, team_id)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    try:
+        while True:
+            execution_data = await receive_request(websocket, TeamExecutionRequest)
+            if execution_data is None:
+                continue
+            try:
+                lease = await admission.acquire_async(user_id, agent_ids)
+            except HTTPException as exc:
+                await websocket.send_json({"type": "error", "detail": exc.detail, "retry_after": retry_after(exc)})
+                continue
+            try:
+                async for event in stream_execution("team", team_id, execution_data.task_description, lease):
+                    await websocket.send_json(jsonable_encoder(event))
+            finally:
+                # Held until the execution thread finishes, even if this socket closes first
+                if not lease.claimed:
+                    await admission.release_async(lease)
+    except WebSocketDisconnect:
+        pass
+
 @router.put("/{team_id}", response_model=TeamResponse)
 def update_team(
     team_id: int,
@@ -135,6 +238,9 @@ def update_team(
     if not team:
         raise HTTPException(status_code=404, detail="Team not found")
     
+    if team_update.reducer_agent_id is not None:
+        _verify_reducer_agent(db, team_update.reducer_agent_id, current_user.id)
+    
     # Update fields
     for field, value in team_update.dict(exclude_unset=True).items():
         setattr(team, field, value)
@@ -159,4 +265,5 @@ def delete_team(
     
     team.is_active = False
     db.commit()
+    invalidate_dashboard(current_user.id)
     return {"message": "Team deleted successfully"} 
\ No newline at end of file
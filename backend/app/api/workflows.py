@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.core.database import get_db
 from app.core.security import get_current_user
+from app.core.pagination import paginate, DEFAULT_PAGE_SIZE
 from app.models.user import User
 from app.models.workflow import Workflow, WorkflowNode, WorkflowEdge
+from app.services.admission import admission
+from app.services.node_outputs import delete_outputs
+from app.services.workflow_graph import workflow_graphs
+from app.services.workflow_service import WorkflowService
+from app.services.workflow_sync import sync_workflow_graph
 from pydantic import BaseModel
 from typing import Dict, Any
 
@@ -15,17 +21,31 @@ class WorkflowCreate(BaseModel):
     description: str = ""
     definition: Dict[str, Any] = {}
 
+class WorkflowUpdate(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    definition: Optional[Dict[str, Any]] = None
+
+class WorkflowRunRequest(BaseModel):
+    input: str = ""
+    max_concurrency: Optional[int] = None  # Capped at WORKFLOW_MAX_CONCURRENCY
+    reuse: bool = True  # False reruns every agent node instead of reusing stored outputs
+
 class WorkflowResponse(BaseModel):
     id: int
     user_id: int
     name: str
     description: str
     workflow_definition: Dict[str, Any]
+    version: int
     is_active: bool
     
     class Config:
         from_attributes = True
 
+class WorkflowSyncResponse(WorkflowResponse):
+    changes: Dict[str, int] = {}  # Rows added/updated/deleted per table
+
 @router.post("/", response_model=WorkflowResponse)
 def create_workflow(
     workflow_data: WorkflowCreate,
@@ -41,21 +61,26 @@ def create_workflow(
     )
     
     db.add(workflow)
+    db.flush()
+    sync_workflow_graph(db, workflow, workflow_data.definition)
     db.commit()
     db.refresh(workflow)
     return workflow
 
 @router.get("/", response_model=List[WorkflowResponse])
 def get_workflows(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get user's workflows"""
-    workflows = db.query(Workflow).filter(
+    """Get user's workflows, one keyset page at a time (next cursor in X-Next-Cursor)"""
+    query = db.query(Workflow).filter(
         Workflow.user_id == current_user.id,
         Workflow.is_active == True
-    ).all()
-    return workflows
+    )
+    return paginate(query, [Workflow.id], cursor, limit, response)
 
 @router.get("/{workflow_id}", response_model=WorkflowResponse)
 def get_workflow(
@@ -72,6 +97,65 @@ def get_workflow(
         raise HTTPException(status_code=404, detail="Workflow not found")
     return workflow
 
+@router.put("/{workflow_id}", response_model=WorkflowSyncResponse)
+def update_workflow(
+    workflow_id: int,
+    workflow_update: WorkflowUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Update a workflow, writing only the nodes and edges that changed"""
+    # Row lock so concurrent saves of one workflow diff against each other's results
+    workflow = db.query(Workflow).filter(
+        Workflow.id == workflow_id,
+        Workflow.user_id == current_user.id,
+        Workflow.is_active == True
+    ).with_for_update().first()
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    
+    if workflow_update.name is not None:
+        workflow.name = workflow_update.name
+    if workflow_update.description is not None:
+        workflow.description = workflow_update.description
+    changes = {}
+    if workflow_update.definition is not None:
+        changes = sync_workflow_graph(db, workflow, workflow_update.definition)
+    
+    db.commit()
+    db.refresh(workflow)
+    
+    # Compile the new version now so the next run starts from the cache;
+    # drafts that don't compile yet are still saved
+    try:
+        workflow_graphs.get_or_compile(workflow.id, workflow.version, workflow.workflow_definition or {})
+    except HTTPException:
+        pass
+    
+    response = WorkflowSyncResponse.model_validate(workflow)
+    response.changes = changes
+    return response
+
+@router.post("/{workflow_id}/run")
+def run_workflow(
+    workflow_id: int,
+    run_data: WorkflowRunRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Run a workflow's nodes in dependency order, with per-node timing and the critical path"""
+    workflow = db.query(Workflow).filter(
+        Workflow.id == workflow_id,
+        Workflow.user_id == current_user.id,
+        Workflow.is_active == True
+    ).first()
+    if not workflow:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    
+    graph = workflow_graphs.get_or_compile(workflow.id, workflow.version, workflow.workflow_definition or {})
+    with admission.acquire(current_user.id, graph.agent_ids()):
+        return WorkflowService(db).run(workflow, run_data.input, run_data.max_concurrency, run_data.reuse)
+
 @router.delete("/{workflow_id}")
 def delete_workflow(
     workflow_id: int,
@@ -87,5 +171,6 @@ def delete_workflow(
         raise HTTPException(status_code=404, detail="Workflow not found")
     
     workflow.is_active = False
+    delete_outputs(db, workflow.id)
     db.commit()
     return {"message": "Workflow deleted successfully"} 
\ No newline at end of file
@@ -0,0 +1,131 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import threading
+import time
+from sqlalchemy import event
+from app.core.config import settings
+from app.models.user import User
+
+# Columns kept in a user snapshot (never the password hash)
+USER_SNAPSHOT_FIELDS = ("id", "email", "username", "is_active", "is_superuser", "created_at", "updated_at")
+
+class AuthCache:
+    """Short-TTL cache of decoded tokens and user snapshots, with an optional Redis tier"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int, use_redis: bool):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.tokens: "OrderedDict[str, tuple]" = OrderedDict()
+        self.users: "OrderedDict[int, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.redis = None
+        self.async_redis = None
+        if use_redis:
+            from app.core.redis import get_async_redis, get_redis
+            self.redis = get_redis()
+            self.async_redis = get_async_redis()
+
+    def get_user_id(self, token: str) -> Optional[int]:
+        """User id of a previously verified token"""
+        return self._get_local(self.tokens, self._token_key(token))
+
+    def set_user_id(self, token: str, user_id: int, token_expires_at: Optional[float]):
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            # Never trust a cached token past its own expiry
+            expires_at = min(expires_at, token_expires_at)
+        self._set_local(self.tokens, self._token_key(token), user_id, expires_at)
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        snapshot = self._get_local(self.users, user_id)
+        if snapshot is None and self.redis is not None:
+            snapshot = self._remember(user_id, self.redis.get(self._redis_key(user_id)))
+        return self._to_user(snapshot) if snapshot is not None else None
+
+    def set_user(self, user: User):
+        snapshot = self._snapshot(user)
+        if self.redis is not None:
+            self.redis.set(self._redis_key(user.id), json.dumps(snapshot), ex=self.ttl_seconds)
+
+    async def get_user_async(self, user_id: int) -> Optional[User]:
+        """get_user() for the event loop; the Redis tier is read with redis.asyncio"""
+        snapshot = self._get_local(self.users, user_id)
+        if snapshot is None and self.async_redis is not None:
+            snapshot = self._remember(user_id, await self.async_redis.get(self._redis_key(user_id)))
+        return self._to_user(snapshot) if snapshot is not None else None
+
+    async def set_user_async(self, user: User):
+        snapshot = self._snapshot(user)
+        if self.async_redis is not None:
+            await self.async_redis.set(self._redis_key(user.id), json.dumps(snapshot), ex=self.ttl_seconds)
+
+    def _snapshot(self, user: User) -> Dict[str, Any]:
+        """Cache a user locally and return the JSON-ready snapshot"""
+        snapshot = {
+            field: value.isoformat() if isinstance(value, datetime) else value
+            for field, value in ((field, getattr(user, field)) for field in USER_SNAPSHOT_FIELDS)
+        }
+        self._set_local(self.users, user.id, snapshot, time.time() + self.ttl_seconds)
+        return snapshot
+
+    def _remember(self, user_id: int, raw: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Snapshot read from Redis, kept locally for the TTL"""
+        if raw is None:
+            return None
+        snapshot = json.loads(raw)
+        self._set_local(self.users, user_id, snapshot, time.time() + self.ttl_seconds)
+        return snapshot
+
+    def invalidate_user(self, user_id: int):
+        """Forget a user's snapshot (other workers' local copies expire within the TTL)"""
+        with self.lock:
+            self.users.pop(user_id, None)
+        if self.redis is not None:
+            self.redis.delete(self._redis_key(user_id))
+
+    def _get_local(self, entries: OrderedDict, key: Any):
+        with self.lock:
+            entry = entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del entries[key]
+                return None
+            entries.move_to_end(key)
+            return entry[1]
+
+    def _set_local(self, entries: OrderedDict, key: Any, value: Any, expires_at: float):
+        with self.lock:
+            entries[key] = (expires_at, value)
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def _to_user(self, snapshot: Dict[str, Any]) -> User:
+        """Detached User built from a snapshot (no DB session attached)"""
+        values = dict(snapshot)
+        for field in ("created_at", "updated_at"):
+            if values.get(field):
+                values[field] = datetime.fromisoformat(values[field])
+        return User(**values)
+
+    def _token_key(self, token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def _redis_key(self, user_id: int) -> str:
+        return f"auth:user:{user_id}"
+
+auth_cache = AuthCache(
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    use_redis=settings.AUTH_CACHE_REDIS
+)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target: User):
+    """Drop cached snapshots whenever a user row is changed or deleted"""
+    auth_cache.invalidate_user(target.id)
@@ -11,10 +11,27 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str = ""
     SERPER_API_KEY: str = ""
     
+    # Cerebras HTTP client pool
+    CEREBRAS_BASE_URL: str = ""  # Empty uses the official endpoint; applies to chat and CrewAI runs
+    CEREBRAS_MAX_CONNECTIONS: int = 100
+    CEREBRAS_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    CEREBRAS_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    CEREBRAS_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    CEREBRAS_READ_TIMEOUT_SECONDS: float = 60.0
+    CEREBRAS_POOL_TIMEOUT_SECONDS: float = 10.0
+    
     # Authentication
     JWT_SECRET: str = "your-super-secret-jwt-key-change-this-in-production"
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_CACHE_TTL_SECONDS: int = 30  # 0 disables the token/user cache
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_CACHE_REDIS: bool = False  # Share user snapshots across workers
+    
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12  # Existing hashes are upgraded on next login
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64  # Reject logins beyond this queue depth
     
     # CORS
     BACKEND_CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:8080"]
@@ -22,6 +39,55 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
     
+    # Background jobs
+    JOB_BACKEND: str = "thread"  # thread, celery
+    JOB_WORKERS: int = 4
+    JOB_RESULT_TTL_SECONDS: int = 3600
+    
+    # Agent execution
+    AGENT_CACHE_SIZE: int = 256
+    TEAM_PLAN_CACHE_SIZE: int = 256
+    TEAM_PLAN_TTL_SECONDS: int = 60  # 0 compiles the plan on every run
+    WORKFLOW_MAX_CONCURRENCY: int = 4  # Nodes of one workflow run executing at once
+    WORKFLOW_GRAPH_CACHE_SIZE: int = 256
+    WORKFLOW_OUTPUT_TTL_HOURS: int = 168  # Memoized agent node outputs unused this long are dropped
+    WORKFLOW_OUTPUT_MAX_BYTES: int = 2_000_000  # Compressed output budget per workflow
+    AGENT_METRICS_FLUSH_SECONDS: float = 5.0  # 0 writes counters after every execution
+    
+    # Admission control for LLM calls, per user and per agent (0 disables a limit)
+    ADMISSION_BACKEND: str = "memory"  # Empty disables it; memory (per worker), redis (shared across workers)
+    ADMISSION_USER_RATE_PER_MINUTE: float = 60.0
+    ADMISSION_USER_BURST: int = 20
+    ADMISSION_USER_MAX_CONCURRENT: int = 4
+    ADMISSION_AGENT_RATE_PER_MINUTE: float = 120.0
+    ADMISSION_AGENT_BURST: int = 30
+    ADMISSION_AGENT_MAX_CONCURRENT: int = 8
+    ADMISSION_LEASE_SECONDS: int = 900  # Slots a crashed worker held in Redis free up after this
+    
+    # Result cache for deterministic executions
+    RESULT_CACHE_BACKEND: str = ""  # Empty disables it; memory, redis
+    RESULT_CACHE_TTL_SECONDS: int = 3600
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    RESULT_CACHE_MAX_TEMPERATURE: float = 0.2  # Only cache low-temperature configs
+    
+    # Analytics
+    DASHBOARD_CACHE_TTL_SECONDS: int = 30
+    
+    # Chat persistence (messages are written in batches)
+    MESSAGE_SINK_BATCH_SIZE: int = 500
+    MESSAGE_SINK_FLUSH_SECONDS: float = 1.0
+    MESSAGE_SINK_MAX_RETRIES: int = 3  # Then the batch is written row by row and failing rows are dropped
+    MESSAGE_SINK_MAX_PENDING: int = 50000  # Messages beyond this are dropped rather than buffered
+    
+    # Chat WebSockets
+    WS_BACKPLANE: str = "memory"  # memory (single worker), redis (fan-out across workers)
+    WS_SEND_QUEUE_SIZE: int = 256  # Outbound messages buffered per connection
+    WS_SLOW_CONSUMER_POLICY: str = "close"  # close, drop (what to do when the queue is full)
+    WS_HEARTBEAT_SECONDS: float = 30.0
+    WS_IDLE_TIMEOUT_SECONDS: float = 300.0  # Only for clients that answer pings; 0 never closes quiet connections
+    WS_COALESCE_MS: int = 25  # Default window for grouping token deltas into one frame; 0 sends each delta
+    WS_COALESCE_BYTES: int = 512  # A frame is sent early once this much text is buffered
+    
     # Email
     SMTP_HOST: str = ""
     SMTP_PORT: int = 587
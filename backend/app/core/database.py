@@ -1,7 +1,9 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
 
 # Optimized database configuration
@@ -23,6 +25,35 @@ SessionLocal = sessionmaker(
     expire_on_commit=False           # Prevent expired object issues
 )
 
+# Async driver for each sync dialect, used by the AsyncSession path
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL rewritten for its async driver (postgresql -> asyncpg, sqlite -> aiosqlite)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+# Async engine for high-traffic read endpoints: requests wait on the DB
+# without holding a threadpool slot
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL),
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=20,
+    max_overflow=30,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    echo=False
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 def get_db():
@@ -33,7 +64,12 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as session:
+        yield session
+
 def init_db():
     """Initialize database tables"""
-    from app.models import user, agent, conversation, workflow
+    from app.models import user, agent, conversation, workflow, usage, execution
     Base.metadata.create_all(bind=engine) 
\ No newline at end of file
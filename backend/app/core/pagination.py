@@ -0,0 +1,80 @@
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+import base64
+import json
+from fastapi import HTTPException, Response
+from sqlalchemy import DateTime, Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, keys: Sequence[Any]) -> List[Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError(cursor)
+        return [
+            datetime.fromisoformat(value) if isinstance(key.type, DateTime) else value
+            for key, value in zip(keys, values)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def keyset_page(statement, keys: Sequence[Any], cursor: Optional[str], limit: int, descending: bool = False):
+    """Restrict a Query or select() to the page after `cursor`, ordered by `keys`.
+
+    `keys` must end with a unique column. Seeking past the cursor instead of
+    using OFFSET keeps every page an index range scan of the same cost. One
+    extra row is fetched so next_page() can tell whether another page exists.
+    """
+    if cursor:
+        position = tuple_(*keys)
+        after = tuple_(*decode_cursor(cursor, keys))
+        statement = statement.filter(position < after if descending else position > after)
+
+    order = [key.desc() if descending else key for key in keys]
+    return statement.order_by(*order).limit(page_size(limit) + 1)
+
+def next_page(items: list, keys: Sequence[Any], limit: int, response: Response) -> list:
+    """Trim the extra row and put the next page's cursor in X-Next-Cursor"""
+    limit = page_size(limit)
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(last, key.key) for key in keys])
+    return items
+
+def page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def paginate(
+    query: Query,
+    keys: Sequence[Any],
+    cursor: Optional[str],
+    limit: int,
+    response: Response,
+    descending: bool = False
+) -> list:
+    """One keyset page of a sync ORM query"""
+    items = keyset_page(query, keys, cursor, limit, descending).all()
+    return next_page(items, keys, limit, response)
+
+async def paginate_async(
+    db: AsyncSession,
+    statement: Select,
+    keys: Sequence[Any],
+    cursor: Optional[str],
+    limit: int,
+    response: Response,
+    descending: bool = False
+) -> list:
+    """One keyset page of a select() run on an AsyncSession"""
+    items = (await db.scalars(keyset_page(statement, keys, cursor, limit, descending))).all()
+    return next_page(list(items), keys, limit, response)
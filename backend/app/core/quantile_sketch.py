@@ -0,0 +1,98 @@
+from typing import Any, Dict, Optional
+import math
+
+class QuantileSketch:
+    """Constant-memory, mergeable quantile sketch with relative-error guarantees (DDSketch).
+
+    Values are counted in logarithmic bins, so any quantile is estimated within
+    `relative_accuracy` of the true value. Two sketches with the same accuracy
+    merge by adding bin counts, which lets each worker keep its own sketch.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0  # Values too small to bin (e.g. 0 ms)
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float, weight: int = 1):
+        if value < 1e-9:
+            self.zero_count += weight
+        else:
+            index = math.ceil(math.log(value) / self.log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + weight
+            self._collapse()
+        self.count += weight
+        self.sum += value * weight
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "QuantileSketch"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for index, bin_count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + bin_count
+        self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile q (0..1), or None for an empty sketch"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # Midpoint of the bin, clamped to the observed range
+                estimate = 2 * self.gamma ** index / (self.gamma + 1)
+                return max(self.min, min(self.max, estimate))
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "bins": {str(index): bin_count for index, bin_count in self.bins.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_bins: int = 2048) -> "QuantileSketch":
+        sketch = cls(relative_accuracy=data["relative_accuracy"], max_bins=max_bins)
+        sketch.bins = {int(index): bin_count for index, bin_count in data["bins"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        return sketch
+
+    def _collapse(self):
+        """Fold the lowest bins together once the bin limit is hit (keeps the tail exact)"""
+        if len(self.bins) <= self.max_bins:
+            return
+        indexes = sorted(self.bins)
+        overflow = indexes[:len(indexes) - self.max_bins + 1]
+        target = overflow[-1]
+        self.bins[target] = sum(self.bins.pop(index) for index in overflow[:-1]) + self.bins[target]
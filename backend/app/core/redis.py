@@ -0,0 +1,14 @@
+from functools import lru_cache
+import redis
+import redis.asyncio as aioredis
+from app.core.config import settings
+
+@lru_cache()
+def get_redis() -> redis.Redis:
+    """Get the process-wide Redis client (connections are pooled by redis-py)"""
+    return redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+@lru_cache()
+def get_async_redis() -> aioredis.Redis:
+    """Get the process-wide redis.asyncio client, for code running on the event loop"""
+    return aioredis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
@@ -1,16 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+import asyncio
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.models.user import User
+from app.core.auth_cache import auth_cache
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+class PasswordHasher:
+    """Runs bcrypt on its own bounded thread pool so login bursts can't starve the shared threadpool"""
+    
+    def __init__(self, max_workers: int, max_pending: int):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self.max_pending = max_pending
+        self.pending = 0  # Only touched from the event loop thread
+    
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+    
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password; also returns a new hash if the stored one uses outdated settings"""
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+    
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent logins, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
 
 # JWT token handling
 security = HTTPBearer()
@@ -48,32 +88,66 @@ def get_current_user(
     db: Session = Depends(get_db)
 ) -> User:
     """Get current authenticated user"""
-    token = credentials.credentials
-    payload = verify_token(token)
-    
-    if payload is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    return get_user_from_token(credentials.credentials, db)
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Get current authenticated user without taking a threadpool slot"""
+    user_id = user_id_from_token(credentials.credentials)
+    user = await auth_cache.get_user_async(user_id)
+    if user is None:
+        user = _require_user(await db.get(User, user_id))
+        await auth_cache.set_user_async(user)
+    return user
+
+def get_user_from_token(token: str, db: Session) -> User:
+    """Resolve a JWT to its user (also used by WebSocket endpoints, which can't send headers)
+
+    Verified tokens and user snapshots are cached briefly, so most requests
+    skip both the JWT decode and the users query.
+    """
+    user_id = user_id_from_token(token)
+    user = auth_cache.get_user(user_id)
+    if user is None:
+        user = _require_user(db.query(User).filter(User.id == user_id).first())
+        auth_cache.set_user(user)
     
-    user_id: int = payload.get("sub")
+    return user
+
+def user_id_from_token(token: str) -> int:
+    """User id carried by a valid JWT (from the token cache when possible)"""
+    user_id = auth_cache.get_user_id(token)
     if user_id is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        payload = verify_token(token)
+        
+        if payload is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        if payload.get("sub") is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        user_id = int(payload["sub"])
+        auth_cache.set_user_id(token, user_id, payload.get("exp"))
     
-    user = db.query(User).filter(User.id == user_id).first()
+    return user_id
+
+def _require_user(user: Optional[User]) -> User:
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
     return user
 
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
@@ -5,8 +5,21 @@ import uvicorn
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.core.database import init_db
-from app.api import auth, agents, teams, chat, workflows, analytics
+from app.core.database import init_db, async_engine
+from app.core.security import password_hasher
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.api import auth, agents, teams, chat, workflows, analytics, jobs
+from app.services.job_service import job_queue
+from app.services.cerebras_service import get_cerebras_service
+from app.services.agent_cache import agent_cache
+from app.services.team_plan import team_plans
+from app.services.workflow_graph import workflow_graphs
+from app.services.result_cache import result_cache
+from app.services.analytics_service import dashboard_cache
+from app.services.agent_metrics import agent_metrics
+from app.services.admission import admission
+from app.services.message_sink import message_sink
+from app.services.connections import connection_manager
 
 security = HTTPBearer()
 
@@ -14,9 +27,19 @@ security = HTTPBearer()
 async def lifespan(app: FastAPI):
     # Startup
     init_db()
+    cerebras = get_cerebras_service()  # Open the shared, pooled Cerebras client up front
+    agent_metrics.start()
+    message_sink.start()
+    await connection_manager.start()
     yield
     # Shutdown
-    pass
+    await connection_manager.shutdown()  # Close chat sockets before their messages are flushed
+    job_queue.shutdown()
+    agent_metrics.shutdown()  # Flush buffered agent counters
+    message_sink.shutdown()  # Persist buffered chat messages
+    await async_engine.dispose()
+    password_hasher.shutdown()
+    await cerebras.aclose()
 
 app = FastAPI(
     title="AI Agents Platform",
@@ -32,6 +55,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],  # Let the frontend read list pagination cursors
 )
 
 # Include routers
@@ -41,12 +65,29 @@ app.include_router(teams.router, prefix="/teams", tags=["teams"])
 app.include_router(chat.router, prefix="/chat", tags=["chat"])
 app.include_router(workflows.router, prefix="/workflows", tags=["workflows"])
 app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+app.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "ai-agents-platform"}
 
+@app.get("/metrics")
+async def metrics():
+    """Runtime metrics for this worker process"""
+    return {
+        "cerebras_http": get_cerebras_service().http_metrics.snapshot(),
+        "agent_cache": agent_cache.stats(),
+        "team_plans": team_plans.stats(),
+        "workflow_graphs": workflow_graphs.stats(),
+        "result_cache": result_cache.stats() if result_cache else None,
+        "dashboard_cache": dashboard_cache.stats(),
+        "agent_metrics_pending": agent_metrics.pending(),
+        "message_sink": message_sink.stats(),
+        "websockets": connection_manager.stats(),
+        "admission": admission.stats()
+    }
+
 @app.get("/")
 async def root():
     """Root endpoint"""
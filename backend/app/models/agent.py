@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 class Agent(Base):
     __tablename__ = "agents"
+    __table_args__ = (
+        Index("idx_agents_user_active", "user_id", "is_active", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -19,9 +22,11 @@ class Agent(Base):
     memory_enabled = Column(Boolean, default=True)
     allow_delegation = Column(Boolean, default=False)
     verbose = Column(Boolean, default=True)
+    cache_results = Column(Boolean, default=True)  # Per-agent opt-out of the result cache
     
     # Performance tracking
     total_executions = Column(Integer, default=0)
+    successful_executions = Column(Integer, default=0)
     success_rate = Column(Integer, default=0)
     avg_response_time = Column(Integer, default=0)
     
@@ -37,12 +42,20 @@ class Agent(Base):
 
 class Team(Base):
     __tablename__ = "teams"
+    __table_args__ = (
+        Index("idx_teams_user_active", "user_id", "is_active", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     name = Column(String(255), nullable=False)
     description = Column(Text)
-    process_type = Column(String(50), default="sequential")  # sequential, hierarchical
+    process_type = Column(String(50), default="sequential")  # sequential, hierarchical, parallel
+    
+    # Parallel process settings
+    max_concurrency = Column(Integer, default=4)  # Agents running at once
+    reducer_agent_id = Column(Integer, ForeignKey("agents.id"), nullable=True)  # Merges agent outputs
+    merge_template = Column(Text, nullable=True)  # Used when there is no reducer agent
     
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -50,11 +63,16 @@ class Team(Base):
     
     # Relationships
     user = relationship("User", back_populates="teams")
-    team_agents = relationship("TeamAgent", back_populates="team")
+    team_agents = relationship("TeamAgent", back_populates="team", order_by="TeamAgent.order")
+    agents = relationship("Agent", secondary="team_agents", order_by="TeamAgent.order", viewonly=True)
+    reducer_agent = relationship("Agent", foreign_keys=[reducer_agent_id])
     conversations = relationship("Conversation", back_populates="team")
 
 class TeamAgent(Base):
     __tablename__ = "team_agents"
+    __table_args__ = (
+        Index("idx_team_agents_team_order", "team_id", "order"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     team_id = Column(Integer, ForeignKey("teams.id"), nullable=False)
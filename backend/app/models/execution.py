@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class ExecutionRecord(Base):
+    """One row per agent or team execution, successful or not"""
+    __tablename__ = "execution_records"
+    __table_args__ = (
+        Index("idx_execution_records_user_created", "user_id", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    agent_id = Column(Integer, ForeignKey("agents.id"), index=True)
+    team_id = Column(Integer, ForeignKey("teams.id"), index=True)
+    model = Column(String(100), nullable=False)
+    duration_ms = Column(Integer, nullable=False)
+    ttft_ms = Column(Integer)  # Time to first token, streaming executions only
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
+    success = Column(Boolean, nullable=False)
+    error_class = Column(String(100))
+    created_at = Column(DateTime, server_default=func.now())
+
+class LatencySketch(Base):
+    """Serialized QuantileSketch of durations for one subject/model/day, written by one worker"""
+    __tablename__ = "latency_sketches"
+    __table_args__ = (
+        UniqueConstraint("worker_id", "subject", "model", "day", name="uq_latency_sketches_worker_subject_model_day"),
+        Index("idx_latency_sketches_user_day", "user_id", "day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    worker_id = Column(String(100), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    subject = Column(String(50), nullable=False)  # "agent:<id>" or "team:<id>"
+    model = Column(String(100), nullable=False)
+    day = Column(DateTime, nullable=False)  # Start of the UTC day
+    count = Column(Integer, nullable=False, default=0)
+    sketch = Column(JSON, nullable=False)
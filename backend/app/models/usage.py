@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from app.core.database import Base
+
+class UsageCount(Base):
+    """Per-user hourly counters behind /analytics/trends, maintained as events happen"""
+    __tablename__ = "usage_counts"
+    __table_args__ = (
+        UniqueConstraint("user_id", "metric", "bucket_start", name="uq_usage_counts_user_metric_bucket"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    metric = Column(String(50), nullable=False)  # messages, agent_creations, executions
+    bucket_start = Column(DateTime, nullable=False)  # Start of the UTC hour
+    count = Column(Integer, nullable=False, default=0)
@@ -1,22 +1,29 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, Boolean, ForeignKey, Index, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
 class Workflow(Base):
     __tablename__ = "workflows"
+    __table_args__ = (
+        Index("idx_workflows_user_active", "user_id", "is_active", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     name = Column(String(255), nullable=False)
     description = Column(Text)
     workflow_definition = Column(JSON, default=dict)  # React Flow definition
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped when the graph changes
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
 class WorkflowNode(Base):
     __tablename__ = "workflow_nodes"
+    __table_args__ = (
+        Index("idx_workflow_nodes_workflow_id", "workflow_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=False)
@@ -29,6 +36,9 @@ class WorkflowNode(Base):
 
 class WorkflowEdge(Base):
     __tablename__ = "workflow_edges"
+    __table_args__ = (
+        Index("idx_workflow_edges_workflow_id", "workflow_id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=False)
@@ -37,4 +47,22 @@ class WorkflowEdge(Base):
     target_node_id = Column(String(100), nullable=False)
     source_handle = Column(String(100))
     target_handle = Column(String(100))
-    edge_type = Column(String(50), default="default") 
\ No newline at end of file
+    edge_type = Column(String(50), default="default") 
+
+class WorkflowNodeOutput(Base):
+    """Memoized output of an agent node, keyed by a hash of its config and inputs"""
+    __tablename__ = "workflow_node_outputs"
+    __table_args__ = (
+        UniqueConstraint("workflow_id", "node_key", name="uq_workflow_node_outputs_workflow_key"),
+        Index("idx_workflow_node_outputs_workflow_used", "workflow_id", "last_used_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer, ForeignKey("workflows.id"), nullable=False)
+    node_key = Column(String(64), nullable=False)
+    node_id = Column(String(100), nullable=False)  # Node that produced it, for inspection
+    output = Column(LargeBinary, nullable=False)  # zlib-compressed UTF-8
+    size_bytes = Column(Integer, nullable=False)  # Compressed size, used for eviction
+    llm_ms = Column(Integer, nullable=False)  # Execution time a reuse saves
+    created_at = Column(DateTime, server_default=func.now())
+    last_used_at = Column(DateTime, nullable=False)
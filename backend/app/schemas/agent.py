@@ -12,6 +12,7 @@ class AgentBase(BaseModel):
     memory_enabled: bool = True
     allow_delegation: bool = False
     verbose: bool = True
+    cache_results: bool = True
 
 class AgentCreate(AgentBase):
     pass
@@ -26,6 +27,7 @@ class AgentUpdate(BaseModel):
     memory_enabled: Optional[bool] = None
     allow_delegation: Optional[bool] = None
     verbose: Optional[bool] = None
+    cache_results: Optional[bool] = None
 
 class AgentResponse(AgentBase):
     id: int
@@ -46,4 +48,5 @@ class TaskExecute(BaseModel):
 class AgentExecutionResult(BaseModel):
     result: str
     execution_time: int
-    agent_name: str 
\ No newline at end of file
+    agent_name: str
+    cached: bool = False 
\ No newline at end of file
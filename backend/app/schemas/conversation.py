@@ -0,0 +1,37 @@
+from pydantic import BaseModel, model_validator
+from typing import Literal, Optional
+from datetime import datetime
+
+class ConversationResponse(BaseModel):
+    id: int
+    user_id: int
+    team_id: Optional[int] = None
+    title: str
+    is_active: bool
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class MessageResponse(BaseModel):
+    id: int
+    conversation_id: int
+    agent_id: Optional[int] = None
+    role: str
+    content: str
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class ChatMessageIn(BaseModel):
+    """A frame sent on a chat socket: a keepalive or a message for the agent"""
+    type: Literal["message", "ping", "pong"] = "message"
+    content: str = ""
+
+    @model_validator(mode="after")
+    def require_content(self):
+        if self.type == "message" and not self.content.strip():
+            raise ValueError("content is required")
+        return self
@@ -6,7 +6,10 @@ from .agent import AgentResponse
 class TeamBase(BaseModel):
     name: str
     description: Optional[str] = None
-    process_type: str = "sequential"
+    process_type: str = "sequential"  # sequential, hierarchical, parallel
+    max_concurrency: int = 4
+    reducer_agent_id: Optional[int] = None
+    merge_template: Optional[str] = None
 
 class TeamCreate(TeamBase):
     pass
@@ -15,6 +18,9 @@ class TeamUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     process_type: Optional[str] = None
+    max_concurrency: Optional[int] = None
+    reducer_agent_id: Optional[int] = None
+    merge_template: Optional[str] = None
 
 class TeamResponse(TeamBase):
     id: int
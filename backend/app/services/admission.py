@@ -0,0 +1,299 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import math
+import threading
+import time
+import uuid
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Retry-After hint when a concurrency cap (not a rate) is what's full
+BUSY_RETRY_SECONDS = 1.0
+
+# (key, tokens per second, burst, max concurrent); 0 disables that limit
+Limit = Tuple[str, float, int, int]
+
+# KEYS: bucket hash and lease sorted set per limit
+# ARGV: now, lease id, lease seconds, then rate, burst, cap, cost per limit
+ADMIT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local lease_seconds = tonumber(ARGV[3])
+local n = #KEYS / 2
+local tokens = {}
+local wait, denied, busy = 0, 0, 0
+for i = 1, n do
+    local base = 3 + (i - 1) * 4
+    local rate, burst = tonumber(ARGV[base + 1]), tonumber(ARGV[base + 2])
+    local cap, cost = tonumber(ARGV[base + 3]), tonumber(ARGV[base + 4])
+    if rate > 0 then
+        local state = redis.call("HMGET", KEYS[2 * i - 1], "tokens", "updated")
+        local available = tonumber(state[1]) or burst
+        local updated = tonumber(state[2]) or now
+        available = math.min(burst, available + math.max(0, now - updated) * rate)
+        tokens[i] = available
+        if available < cost and (cost - available) / rate > wait then
+            wait, denied, busy = (cost - available) / rate, i, 0
+        end
+    end
+    if cap > 0 then
+        redis.call("ZREMRANGEBYSCORE", KEYS[2 * i], "-inf", now)
+        if redis.call("ZCARD", KEYS[2 * i]) >= cap and denied == 0 then
+            denied, busy = i, 1
+        end
+    end
+end
+if denied > 0 then
+    return {0, denied, busy, tostring(wait)}
+end
+for i = 1, n do
+    local base = 3 + (i - 1) * 4
+    local rate, burst = tonumber(ARGV[base + 1]), tonumber(ARGV[base + 2])
+    local cap, cost = tonumber(ARGV[base + 3]), tonumber(ARGV[base + 4])
+    if rate > 0 then
+        redis.call("HSET", KEYS[2 * i - 1], "tokens", tostring(tokens[i] - cost), "updated", tostring(now))
+        redis.call("EXPIRE", KEYS[2 * i - 1], math.ceil(burst / rate) + 1)
+    end
+    if cap > 0 then
+        redis.call("ZADD", KEYS[2 * i], now + lease_seconds, ARGV[2])
+        redis.call("EXPIRE", KEYS[2 * i], lease_seconds)
+    end
+end
+return {1}
+"""
+
+class Lease:
+    """Concurrency slots held by one admitted call; release when the call finishes"""
+
+    def __init__(self, controller: "AdmissionController", lease_id: str, keys: List[str], shared: bool):
+        self.controller = controller
+        self.id = lease_id
+        self.keys = keys
+        self.shared = shared
+        self.released = False
+        self.claimed = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller.release(self)
+
+    def claim(self):
+        """Hand the lease to the thread running the call; it releases the lease when done"""
+        self.claimed = True
+
+    def release_unclaimed(self):
+        """Release a lease whose call never started, e.g. a response that never streamed"""
+        if not self.claimed:
+            self.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+class AdmissionController:
+    """Token-bucket rate limits and concurrency caps per user and per agent.
+
+    Every LLM call is charged to its user and to each agent it runs. A call
+    is admitted only when all of those buckets have a token and none of them
+    is at its concurrency cap, so one user (or one popular agent) can't take
+    all of the upstream capacity. Rejections raise 429 with a Retry-After
+    hint. With use_redis the buckets and slots are shared by every worker;
+    if Redis is unreachable each worker falls back to its own counters.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        use_redis: bool,
+        user_limits: Tuple[float, int, int],
+        agent_limits: Tuple[float, int, int],
+        lease_seconds: int
+    ):
+        self.enabled = enabled
+        self.user_limits = user_limits
+        self.agent_limits = agent_limits
+        self.lease_seconds = lease_seconds
+        self.buckets: Dict[str, List[float]] = {}
+        self.active: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.next_purge = time.monotonic() + 60
+        self.counters = {"admitted": 0, "rejected_rate": 0, "rejected_busy": 0, "redis_errors": 0}
+        self.redis = None
+        self.script = None
+        if use_redis:
+            from app.core.redis import get_redis
+            self.redis = get_redis()
+            self.script = self.redis.register_script(ADMIT_SCRIPT)
+
+    def limits(self, user_id: int, agent_ids: Iterable[int], concurrent: bool = True) -> List[Limit]:
+        """Limits a call by user_id running agent_ids is charged against"""
+        scopes = [(f"user:{user_id}", self.user_limits)]
+        scopes += [(f"agent:{agent_id}", self.agent_limits) for agent_id in sorted(set(agent_ids))]
+        return [
+            (key, rate_per_minute / 60, burst, cap if concurrent else 0)
+            for key, (rate_per_minute, burst, cap) in scopes
+        ]
+
+    def acquire(self, user_id: int, agent_ids: Iterable[int] = (), concurrent: bool = True) -> Lease:
+        """Admit one call or raise 429.
+
+        With concurrent=False only the rate is charged (for calls that are
+        queued rather than run, like background jobs).
+        """
+        lease_id = uuid.uuid4().hex
+        if not self.enabled:
+            return Lease(self, lease_id, [], False)
+
+        limits = self.limits(user_id, agent_ids, concurrent)
+        denied = None
+        shared = False
+        if self.redis is not None:
+            try:
+                denied = self._acquire_redis(lease_id, limits)
+                shared = True
+            except Exception:
+                self.counters["redis_errors"] += 1
+                logger.warning("Admission control can't reach Redis; using per-worker limits", exc_info=True)
+        if not shared:
+            denied = self._acquire_local(limits)
+
+        if denied is not None:
+            key, busy, wait = denied
+            self.counters["rejected_busy" if busy else "rejected_rate"] += 1
+            retry_after = max(1, math.ceil(wait))
+            scope, _, scope_id = key.partition(":")
+            reason = "Too many concurrent requests" if busy else "Rate limit exceeded"
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"{reason} for {scope} {scope_id}; retry in {retry_after}s",
+                headers={"Retry-After": str(retry_after)}
+            )
+
+        self.counters["admitted"] += 1
+        return Lease(self, lease_id, [key for key, _, _, cap in limits if cap > 0], shared)
+
+    def release(self, lease: Lease):
+        if not lease.keys:
+            return
+        if lease.shared:
+            try:
+                pipeline = self.redis.pipeline(transaction=False)
+                for key in lease.keys:
+                    pipeline.zrem(f"admission:leases:{key}", lease.id)
+                pipeline.execute()
+            except Exception:
+                # The slot expires after lease_seconds
+                self.counters["redis_errors"] += 1
+                logger.warning("Couldn't release an admission lease in Redis", exc_info=True)
+            return
+        with self.lock:
+            for key in lease.keys:
+                remaining = self.active.get(key, 0) - 1
+                if remaining > 0:
+                    self.active[key] = remaining
+                else:
+                    self.active.pop(key, None)
+
+    async def acquire_async(self, user_id: int, agent_ids: Iterable[int] = (), concurrent: bool = True) -> Lease:
+        """acquire() for the event loop; Redis round trips go to the threadpool"""
+        if self.redis is None:
+            return self.acquire(user_id, agent_ids, concurrent)
+        return await run_in_threadpool(self.acquire, user_id, list(agent_ids), concurrent)
+
+    async def release_async(self, lease: Lease):
+        if lease.shared and not lease.released:
+            await run_in_threadpool(lease.release)
+        else:
+            lease.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "backend": "redis" if self.redis is not None else ("memory" if self.enabled else None),
+                "buckets": len(self.buckets),
+                "active": sum(self.active.values()),
+                **self.counters
+            }
+
+    def _acquire_redis(self, lease_id: str, limits: List[Limit]) -> Optional[Tuple[str, bool, float]]:
+        keys, args = [], [time.time(), lease_id, self.lease_seconds]
+        for key, rate, burst, cap in limits:
+            keys += [f"admission:bucket:{key}", f"admission:leases:{key}"]
+            args += [rate, burst, cap, 1]
+        result = self.script(keys=keys, args=args)
+        if int(result[0]) == 1:
+            return None
+        busy = int(result[2]) == 1
+        return limits[int(result[1]) - 1][0], busy, BUSY_RETRY_SECONDS if busy else float(result[3])
+
+    def _acquire_local(self, limits: List[Limit]) -> Optional[Tuple[str, bool, float]]:
+        now = time.monotonic()
+        with self.lock:
+            if now >= self.next_purge:
+                self._purge(now)
+
+            denied = None
+            refilled = []
+            for key, rate, burst, cap in limits:
+                if rate > 0:
+                    tokens, updated = self.buckets.get(key, (burst, now))
+                    tokens = min(burst, tokens + (now - updated) * rate)
+                    refilled.append(tokens)
+                    if tokens < 1 and (denied is None or (1 - tokens) / rate > denied[2]):
+                        denied = (key, False, (1 - tokens) / rate)
+                else:
+                    refilled.append(None)
+                if cap > 0 and self.active.get(key, 0) >= cap and denied is None:
+                    denied = (key, True, BUSY_RETRY_SECONDS)
+            if denied is not None:
+                return denied
+
+            for (key, _, _, cap), tokens in zip(limits, refilled):
+                if tokens is not None:
+                    self.buckets[key] = [tokens - 1, now]
+                if cap > 0:
+                    self.active[key] = self.active.get(key, 0) + 1
+            return None
+
+    def _purge(self, now: float):
+        # Buckets that have refilled are the same as no bucket at all
+        full = [
+            key for key, (tokens, updated) in self.buckets.items()
+            if tokens + (now - updated) * self._rate(key) >= self._burst(key)
+        ]
+        for key in full:
+            del self.buckets[key]
+        self.next_purge = now + 60
+
+    def _rate(self, key: str) -> float:
+        return (self.user_limits if key.startswith("user:") else self.agent_limits)[0] / 60
+
+    def _burst(self, key: str) -> int:
+        return (self.user_limits if key.startswith("user:") else self.agent_limits)[1]
+
+def retry_after(exc: HTTPException) -> Optional[int]:
+    """Retry-After seconds of a 429 raised by acquire(), for WebSocket error events"""
+    if exc.status_code != status.HTTP_429_TOO_MANY_REQUESTS or not exc.headers:
+        return None
+    return int(exc.headers["Retry-After"])
+
+admission = AdmissionController(
+    enabled=bool(settings.ADMISSION_BACKEND),
+    use_redis=settings.ADMISSION_BACKEND == "redis",
+    user_limits=(
+        settings.ADMISSION_USER_RATE_PER_MINUTE,
+        settings.ADMISSION_USER_BURST,
+        settings.ADMISSION_USER_MAX_CONCURRENT
+    ),
+    agent_limits=(
+        settings.ADMISSION_AGENT_RATE_PER_MINUTE,
+        settings.ADMISSION_AGENT_BURST,
+        settings.ADMISSION_AGENT_MAX_CONCURRENT
+    ),
+    lease_seconds=settings.ADMISSION_LEASE_SECONDS
+)
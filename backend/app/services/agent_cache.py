@@ -0,0 +1,70 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+import hashlib
+import json
+import threading
+from app.core.config import settings
+
+# Fields that change how a CrewAI agent is built
+AGENT_CONFIG_FIELDS = (
+    "role", "goal", "backstory", "tools", "llm_config",
+    "memory_enabled", "allow_delegation", "verbose"
+)
+
+def agent_config_hash(agent_data: Dict[str, Any]) -> str:
+    """Stable hash of the fields used to build a CrewAI agent"""
+    config = {field: agent_data.get(field) for field in AGENT_CONFIG_FIELDS}
+    payload = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class AgentCache:
+    """Process-wide LRU cache of CrewAI agent specs keyed by (agent id, config hash).
+
+    A spec holds the resolved LLM and tool instances, which are the costly
+    part of building an agent. The Agent itself is built fresh for every
+    run: Crew.kickoff() sets per-run state on it (crew, executor, task,
+    callbacks), so sharing one between concurrent runs mixes them up.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: "OrderedDict[Tuple[int, str], Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(
+        self,
+        agent_id: int,
+        agent_data: Dict[str, Any],
+        builder: Callable[[Dict[str, Any]], Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        key = (agent_id, agent_config_hash(agent_data))
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        # Build outside the lock; a concurrent miss for the same key just builds twice
+        spec = builder(agent_data)
+
+        with self.lock:
+            self.entries[key] = spec
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return spec
+
+    def invalidate(self, agent_id: int):
+        """Drop every cached build of an agent (call after it is updated or deleted)"""
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == agent_id]:
+                del self.entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+agent_cache = AgentCache(max_size=settings.AGENT_CACHE_SIZE)
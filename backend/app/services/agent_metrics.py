@@ -0,0 +1,113 @@
+from typing import Dict, List
+import logging
+import threading
+from sqlalchemy import Float, Integer, bindparam, case, cast, func, update
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.agent import Agent
+
+logger = logging.getLogger(__name__)
+
+class AgentMetricsAggregator:
+    """Per-worker write-behind buffer for agent execution counters.
+
+    Executions only add deltas in memory; flush() applies them to the agents
+    table as atomic increments in one batched UPDATE, so concurrent runs of
+    the same agent never overwrite each other's counts.
+    """
+
+    def __init__(self, flush_seconds: float):
+        self.flush_seconds = flush_seconds
+        # agent_id -> [executions, successes, summed successful execution time]
+        self.deltas: Dict[int, List[int]] = {}
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def add(self, agent_id: int, execution_time: int, success: bool):
+        with self.lock:
+            delta = self.deltas.setdefault(agent_id, [0, 0, 0])
+            delta[0] += 1
+            if success:
+                delta[1] += 1
+                delta[2] += execution_time
+        if self.flush_seconds <= 0:
+            self.flush()
+
+    def flush(self) -> int:
+        """Write buffered deltas to the database; returns the number of agents updated"""
+        with self.flush_lock:
+            with self.lock:
+                deltas, self.deltas = self.deltas, {}
+            if not deltas:
+                return 0
+
+            params = [
+                {"agent_id": agent_id, "executions": executions, "successes": successes, "success_time": success_time}
+                for agent_id, (executions, successes, success_time) in deltas.items()
+            ]
+            db = SessionLocal()
+            try:
+                db.execute(self._increment_statement(), params)
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._restore(deltas)
+                logger.exception("Failed to flush agent metrics; will retry")
+                return 0
+            finally:
+                db.close()
+            return len(params)
+
+    def start(self):
+        """Start the background flusher thread (no-op when flushing on every execution)"""
+        if self.flush_seconds <= 0 or self.thread is not None:
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="agent-metrics-flush", daemon=True)
+        self.thread.start()
+
+    def shutdown(self):
+        """Stop the flusher and write whatever is still buffered"""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+    def pending(self) -> int:
+        with self.lock:
+            return len(self.deltas)
+
+    def _run(self):
+        while not self.stopped.wait(self.flush_seconds):
+            self.flush()
+
+    def _restore(self, deltas: Dict[int, List[int]]):
+        with self.lock:
+            for agent_id, (executions, successes, success_time) in deltas.items():
+                delta = self.deltas.setdefault(agent_id, [0, 0, 0])
+                delta[0] += executions
+                delta[1] += successes
+                delta[2] += success_time
+
+    def _increment_statement(self):
+        # SET expressions see the row's pre-update values, so every column is
+        # derived from the same snapshot inside a single atomic UPDATE
+        agents = Agent.__table__
+        total = func.coalesce(agents.c.total_executions, 0) + bindparam("executions")
+        successes = func.coalesce(agents.c.successful_executions, 0) + bindparam("successes")
+        old_avg = func.coalesce(agents.c.avg_response_time, 0)
+        old_time = cast(old_avg, Float) * func.coalesce(agents.c.successful_executions, 0)
+        return update(agents).where(agents.c.id == bindparam("agent_id")).values(
+            total_executions=total,
+            successful_executions=successes,
+            success_rate=cast(successes * 100.0 / total, Integer),
+            avg_response_time=case(
+                (successes > 0, cast((old_time + bindparam("success_time")) / successes, Integer)),
+                else_=old_avg
+            )
+        )
+
+agent_metrics = AgentMetricsAggregator(flush_seconds=settings.AGENT_METRICS_FLUSH_SECONDS)
@@ -1,8 +1,17 @@
 from sqlalchemy.orm import Session
-from app.models.agent import Agent, Team, TeamAgent
-from app.services.cerebras_service import CerebrasService
-from crewai import Crew, Task
-from typing import List, Dict, Any
+from app.models.agent import Agent
+from app.services.cerebras_service import get_cerebras_service
+from app.services.agent_cache import agent_cache, agent_config_hash
+from app.services.result_cache import result_cache, result_cache_key
+from app.services.execution_events import CrewEventRelay, EventCallback
+from app.services.analytics_service import increment_usage
+from app.services.performance_service import TokenCounts, record_execution, crew_token_counts, crew_token_usage
+from app.services.agent_metrics import agent_metrics
+from app.services.team_plan import PlanMember, TeamPlan, compile_team_plan, member_task, team_plans
+from app.core.config import settings
+from crewai import Agent as CrewAgent, Crew, Task
+from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
 import json
 import time
 from fastapi import HTTPException
@@ -10,7 +19,7 @@ from fastapi import HTTPException
 class AgentService:
     def __init__(self, db: Session):
         self.db = db
-        self.cerebras = CerebrasService()
+        self.cerebras = get_cerebras_service()
     
     def create_agent(self, user_id: int, agent_data: Dict[str, Any]) -> Agent:
         """Create new agent with Cerebras integration"""
@@ -31,16 +40,18 @@ class AgentService:
             llm_config=agent_data["llm_config"],
             memory_enabled=agent_data.get("memory_enabled", True),
             allow_delegation=agent_data.get("allow_delegation", False),
-            verbose=agent_data.get("verbose", True)
+            verbose=agent_data.get("verbose", True),
+            cache_results=agent_data.get("cache_results", True)
         )
         
         self.db.add(db_agent)
+        increment_usage(self.db, user_id, "agent_creations")
         self.db.commit()
         self.db.refresh(db_agent)
         return db_agent
     
-    def execute_single_agent(self, agent_id: int, task_description: str) -> Dict[str, Any]:
-        """Execute single agent task"""
+    def execute_single_agent(self, agent_id: int, task_description: str, on_event: Optional[EventCallback] = None) -> Dict[str, Any]:
+        """Execute single agent task, reporting progress to on_event if given"""
         start_time = time.time()
         
         # Get agent from database
@@ -48,17 +59,20 @@ class AgentService:
         if not db_agent:
             raise HTTPException(status_code=404, detail="Agent not found")
         
-        # Create CrewAI agent
-        crewai_agent = self.cerebras.create_agent({
-            "role": db_agent.role,
-            "goal": db_agent.goal,
-            "backstory": db_agent.backstory,
-            "tools": db_agent.tools,
-            "llm_config": db_agent.llm_config,
-            "memory_enabled": db_agent.memory_enabled,
-            "allow_delegation": db_agent.allow_delegation,
-            "verbose": db_agent.verbose
-        })
+        # Serve repeated low-temperature runs from the result cache
+        cache_key = self._result_cache_key(db_agent, task_description)
+        if cache_key:
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                return {
+                    "result": cached["result"],
+                    "execution_time": int((time.time() - start_time) * 1000),
+                    "agent_name": db_agent.name,
+                    "cached": True
+                }
+        
+        # Create CrewAI agent (its LLM and tools are reused from cache when config is unchanged)
+        crewai_agent = self._build_crewai_agent(db_agent)
         
         # Create task
         task = Task(
@@ -68,87 +82,251 @@ class AgentService:
         )
         
         # Execute task
-        crew = Crew(agents=[crewai_agent], tasks=[task])
-        result = crew.kickoff()
+        relay = CrewEventRelay(on_event, [db_agent.name])
+        crew = Crew(agents=[crewai_agent], tasks=[task], **relay.crew_kwargs())
+        tokens_before = crew_token_counts(crew)
+        relay.start()
+        try:
+            result = crew.kickoff()
+        except Exception as exc:
+            self._record_agent_execution(db_agent, crew_token_usage(crew, tokens_before), start_time, error=exc)
+            raise
         
         # Update agent performance metrics
-        execution_time = int((time.time() - start_time) * 1000)  # milliseconds
-        self._update_agent_metrics(db_agent, execution_time, success=True)
+        execution_time = self._record_agent_execution(db_agent, crew_token_usage(crew, tokens_before), start_time)
+        
+        if cache_key:
+            result_cache.set(cache_key, {"result": str(result)})
         
         return {
             "result": str(result),
             "execution_time": execution_time,
-            "agent_name": db_agent.name
+            "agent_name": db_agent.name,
+            "cached": False
         }
     
-    def execute_team(self, team_id: int, task_description: str) -> Dict[str, Any]:
-        """Execute team of agents"""
-        # Get team and agents
-        team = self.db.query(Team).filter(Team.id == team_id).first()
-        if not team:
-            raise HTTPException(status_code=404, detail="Team not found")
-        
-        team_agents = self.db.query(TeamAgent).filter(
-            TeamAgent.team_id == team_id
-        ).order_by(TeamAgent.order).all()
+    def execute_team(self, team_id: int, task_description: str, on_event: Optional[EventCallback] = None) -> Dict[str, Any]:
+        """Execute team of agents, reporting progress to on_event if given"""
+        start_time = time.time()
         
-        if not team_agents:
+        # Members, reducer and CrewAI agent specs come from the cached plan
+        plan = self._team_plan(team_id)
+        if plan is None:
+            raise HTTPException(status_code=404, detail="Team not found")
+        if not plan.members:
             raise HTTPException(status_code=400, detail="No agents in team")
         
-        # Create CrewAI agents
-        crewai_agents = []
-        for team_agent in team_agents:
-            agent_data = {
-                "role": team_agent.agent.role,
-                "goal": team_agent.agent.goal,
-                "backstory": team_agent.agent.backstory,
-                "tools": team_agent.agent.tools,
-                "llm_config": team_agent.agent.llm_config,
-                "memory_enabled": team_agent.agent.memory_enabled,
-                "allow_delegation": team_agent.agent.allow_delegation,
-                "verbose": team_agent.agent.verbose
-            }
-            crewai_agents.append(self.cerebras.create_agent(agent_data))
-        
-        # Create tasks for team
-        tasks = [
-            Task(
-                description=f"{task_description} (handled by {agent.role})",
-                agent=agent,
-                expected_output="A comprehensive response to your assigned part of the task"
-            ) for agent in crewai_agents
-        ]
+        increment_usage(self.db, plan.user_id, "executions")
+        self.db.commit()
+        
+        if plan.process_type == "parallel":
+            return self._execute_parallel(plan, task_description, on_event)
         
         # Execute team
+        relay = CrewEventRelay(on_event, [member.name for member in plan.members])
+        crew_options = relay.crew_kwargs()
+        if plan.process_type == "hierarchical":
+            # The manager member's model drives delegation, else the first member's
+            manager = plan.manager or plan.members[0]
+            crew_options["manager_llm"] = self.cerebras.get_crewai_llm(
+                (manager.llm_config or {}).get("config_type", "fast_chat")
+            )
+        agents, tasks = plan.crew_inputs(task_description)
         crew = Crew(
-            agents=crewai_agents,
+            agents=agents,
             tasks=tasks,
-            process=team.process_type
+            process=plan.process_type,
+            **crew_options
         )
         
-        result = crew.kickoff()
+        tokens_before = crew_token_counts(crew)
+        relay.start()
+        try:
+            result = crew.kickoff()
+        except Exception as exc:
+            self._record_team_execution(plan, crew_token_usage(crew, tokens_before), start_time, error=exc)
+            raise
+        self._record_team_execution(plan, crew_token_usage(crew, tokens_before), start_time)
         
         return {
             "result": str(result),
-            "team_name": team.name,
-            "agents_count": len(crewai_agents)
+            "team_name": plan.name,
+            "agents_count": len(plan.members)
         }
     
-    def _update_agent_metrics(self, agent: Agent, execution_time: int, success: bool):
-        """Update agent performance metrics"""
-        agent.total_executions += 1
-        if success:
-            # Calculate new success rate
-            success_count = int(agent.success_rate * (agent.total_executions - 1) / 100)
-            success_count += 1
-            agent.success_rate = int((success_count / agent.total_executions) * 100)
-            
-            # Update average response time
-            if agent.avg_response_time == 0:
-                agent.avg_response_time = execution_time
-            else:
-                agent.avg_response_time = int(
-                    (agent.avg_response_time + execution_time) / 2
-                )
-        
-        self.db.commit() 
\ No newline at end of file
+    def _execute_parallel(self, plan: TeamPlan, task_description: str, on_event: Optional[EventCallback] = None) -> Dict[str, Any]:
+        """Run each agent's subtask concurrently, then merge the outputs"""
+        start_time = time.time()
+        
+        def run_subtask(member: PlanMember):
+            subtask_start = time.time()
+            relay = CrewEventRelay(on_event, [member.name])
+            agent = member.build_agent()
+            crew = Crew(
+                agents=[agent],
+                tasks=[member_task(member, task_description, agent)],
+                **relay.crew_kwargs()
+            )
+            tokens_before = crew_token_counts(crew)
+            relay.start()
+            try:
+                result, error = str(crew.kickoff()), None
+            except Exception as exc:
+                result, error = None, exc
+            return result, crew_token_usage(crew, tokens_before), error, int((time.time() - subtask_start) * 1000)
+        
+        max_workers = max(1, min(plan.max_concurrency or 1, len(plan.members)))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="team") as executor:
+            runs = list(executor.map(run_subtask, plan.members))
+        
+        # The session isn't thread-safe, so record subtasks back on this thread
+        for member, (_, tokens, error, execution_time) in zip(plan.members, runs):
+            self._record_agent_execution(member, tokens, execution_time=execution_time, team_id=plan.team_id, error=error)
+        for _, _, error, _ in runs:
+            if error is not None:
+                self._record_team_execution(plan, (None, None), start_time, error=error)
+                raise error
+        
+        agent_results = [
+            {
+                "agent_name": member.name,
+                "role": member.role,
+                "result": result,
+                "execution_time": execution_time
+            } for member, (result, _, _, execution_time) in zip(plan.members, runs)
+        ]
+        
+        merged = self._merge_parallel_results(plan, agent_results, task_description, on_event)
+        self._record_team_execution(plan, (None, None), start_time)
+        
+        return {
+            "result": merged,
+            "team_name": plan.name,
+            "agents_count": len(plan.members),
+            "agent_results": agent_results,
+            "execution_time": int((time.time() - start_time) * 1000)
+        }
+    
+    def _merge_parallel_results(self, plan: TeamPlan, agent_results: List[Dict[str, Any]], task_description: str, on_event: Optional[EventCallback] = None) -> str:
+        """Merge subtask outputs with the team's reducer agent, or its merge template"""
+        sections = "\n\n".join(
+            f"## {item['role']} ({item['agent_name']})\n{item['result']}" for item in agent_results
+        )
+        
+        if plan.reducer is not None:
+            reducer = plan.reducer.build_agent()
+            task = Task(
+                description=(
+                    f"Combine the following partial results into one answer for the task: "
+                    f"{task_description}\n\n{sections}"
+                ),
+                agent=reducer,
+                expected_output="A single, coherent response that merges all partial results"
+            )
+            relay = CrewEventRelay(on_event, [plan.reducer.name])
+            crew = Crew(agents=[reducer], tasks=[task], **relay.crew_kwargs())
+            relay.start()
+            return str(crew.kickoff())
+        
+        # Plain substitution: templates are user input, so avoid str.format
+        template = plan.merge_template or "{outputs}"
+        return template.replace("{task}", task_description).replace("{outputs}", sections)
+    
+    def _team_plan(self, team_id: int) -> Optional[TeamPlan]:
+        """Compiled plan for a team, rebuilt only after it changes or expires"""
+        return team_plans.get_or_build(
+            team_id,
+            lambda: compile_team_plan(self.db, team_id, self._agent_spec)
+        )
+    
+    def _result_cache_key(self, db_agent: Agent, task_description: str):
+        """Result cache key, or None when the cache doesn't apply to this agent"""
+        if result_cache is None or not db_agent.cache_results:
+            return None
+        
+        model_config = self._model_config(db_agent)
+        if model_config["temperature"] > settings.RESULT_CACHE_MAX_TEMPERATURE:
+            return None
+        
+        return result_cache_key(
+            agent_config_hash(self._agent_data(db_agent)),
+            model_config,
+            task_description
+        )
+    
+    def _build_crewai_agent(self, db_agent: Agent) -> CrewAgent:
+        """A fresh CrewAI agent for one run of a database agent"""
+        return CrewAgent(**self._agent_spec(db_agent))
+    
+    def _agent_spec(self, db_agent: Agent) -> Dict[str, Any]:
+        """CrewAI agent arguments with LLM and tools resolved, cached until the agent changes"""
+        return agent_cache.get_or_build(db_agent.id, self._agent_data(db_agent), self.cerebras.agent_spec)
+    
+    def _agent_data(self, db_agent: Agent) -> Dict[str, Any]:
+        """Fields needed to build a CrewAI agent"""
+        return {
+            "role": db_agent.role,
+            "goal": db_agent.goal,
+            "backstory": db_agent.backstory,
+            "tools": db_agent.tools,
+            "llm_config": db_agent.llm_config,
+            "memory_enabled": db_agent.memory_enabled,
+            "allow_delegation": db_agent.allow_delegation,
+            "verbose": db_agent.verbose
+        }
+    
+    def _model_config(self, db_agent: Agent) -> Dict[str, Any]:
+        config_type = (db_agent.llm_config or {}).get("config_type", "fast_chat")
+        return self.cerebras.llm_configs.get(config_type, self.cerebras.llm_configs["fast_chat"])
+    
+    def _model_name(self, db_agent: Agent) -> str:
+        return self._model_config(db_agent)["model"]
+    
+    def _record_agent_execution(
+        self,
+        db_agent: Agent,
+        tokens: TokenCounts,
+        start_time: Optional[float] = None,
+        execution_time: Optional[int] = None,
+        team_id: Optional[int] = None,
+        error: Optional[BaseException] = None
+    ) -> int:
+        """Record an agent run (successful or not) and update its metrics; returns its duration in ms"""
+        if execution_time is None:
+            execution_time = int((time.time() - start_time) * 1000)  # milliseconds
+        prompt_tokens, completion_tokens = tokens
+        record_execution(
+            self.db,
+            user_id=db_agent.user_id,
+            subject=f"agent:{db_agent.id}",
+            model=self._model_name(db_agent),
+            duration_ms=execution_time,
+            agent_id=db_agent.id,
+            team_id=team_id,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            error=error
+        )
+        if team_id is None:
+            increment_usage(self.db, db_agent.user_id, "executions")
+        self.db.commit()
+        # Counters are buffered and flushed as atomic increments
+        agent_metrics.add(db_agent.id, execution_time, success=error is None)
+        return execution_time
+    
+    def _record_team_execution(self, plan: TeamPlan, tokens: TokenCounts, start_time: float, error: Optional[BaseException] = None):
+        """Record a team run as a whole"""
+        models = sorted({self._model_name(member) for member in plan.members})
+        prompt_tokens, completion_tokens = tokens
+        record_execution(
+            self.db,
+            user_id=plan.user_id,
+            subject=f"team:{plan.team_id}",
+            model=models[0] if len(models) == 1 else "mixed",
+            duration_ms=int((time.time() - start_time) * 1000),
+            team_id=plan.team_id,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            error=error
+        )
+        self.db.commit()
@@ -0,0 +1,128 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.ttl_cache import TTLCache
+from app.models.agent import Agent
+from app.models.conversation import Conversation, Message
+from app.models.usage import UsageCount
+
+# Per-user dashboard snapshots, dropped whenever the user's agents or teams change
+dashboard_cache = TTLCache(ttl_seconds=settings.DASHBOARD_CACHE_TTL_SECONDS, max_entries=10000)
+
+USAGE_METRICS = ("messages", "agent_creations", "executions")
+UPSERT_BATCH_SIZE = 1000
+BUCKET_SIZES = ("hour", "day", "week")
+
+def invalidate_dashboard(user_id: int):
+    """Drop a user's cached dashboard so the next read recomputes it"""
+    dashboard_cache.delete(user_id)
+
+def hour_bucket(at: datetime) -> datetime:
+    return at.replace(minute=0, second=0, microsecond=0)
+
+def increment_usage(db: Session, user_id: int, metric: str, amount: int = 1, at: Optional[datetime] = None):
+    """Add to a user's hourly usage counter; the caller commits"""
+    increment_usage_many(db, {(user_id, metric, hour_bucket(at or datetime.utcnow())): amount})
+
+def increment_usage_many(db: Session, deltas: Dict[Tuple[int, str, datetime], int]):
+    """Apply many (user_id, metric, hour bucket) -> amount deltas as atomic upserts"""
+    if not deltas:
+        return
+
+    table = UsageCount.__table__
+    rows = [
+        {"user_id": user_id, "metric": metric, "bucket_start": bucket, "count": amount}
+        for (user_id, metric, bucket), amount in deltas.items()
+    ]
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        for i in range(0, len(rows), UPSERT_BATCH_SIZE):
+            stmt = dialect_insert(table).values(rows[i:i + UPSERT_BATCH_SIZE])
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["user_id", "metric", "bucket_start"],
+                set_={"count": table.c.count + stmt.excluded.count}
+            ))
+        return
+
+    # Portable fallback: update, then insert the buckets that don't exist yet
+    for row in rows:
+        result = db.execute(update(table).where(
+            table.c.user_id == row["user_id"],
+            table.c.metric == row["metric"],
+            table.c.bucket_start == row["bucket_start"]
+        ).values(count=table.c.count + row["count"]))
+        if result.rowcount == 0:
+            db.execute(insert(table).values(**row))
+
+def bucket_label(bucket_start: datetime, bucket: str) -> str:
+    """Label an hourly bucket with the hour, day or week (Monday) it falls in"""
+    if bucket == "hour":
+        return str(bucket_start)
+    day = bucket_start.date()
+    if bucket == "week":
+        day -= timedelta(days=day.weekday())
+    return str(day)
+
+def usage_window(start: datetime, end: datetime) -> Tuple[datetime, datetime]:
+    """The whole UTC hours covering [start, end): counters can't split an hour, so the range widens to fit"""
+    window_end = hour_bucket(end)
+    if window_end < end:
+        window_end += timedelta(hours=1)
+    return hour_bucket(start), window_end
+
+def usage_series(
+    db: Session,
+    user_id: int,
+    start: datetime,
+    end: datetime,
+    bucket: str = "day"
+) -> Dict[str, List[Dict[str, object]]]:
+    """Per-metric [{"date", "count"}] series rolled up from hourly counters.
+
+    Counts events in usage_window(start, end), i.e. start rounded down and
+    end rounded up to the hour.
+    """
+    start, end = usage_window(start, end)
+    rows = db.query(UsageCount.metric, UsageCount.bucket_start, UsageCount.count).filter(
+        UsageCount.user_id == user_id,
+        UsageCount.bucket_start >= start,
+        UsageCount.bucket_start < end
+    ).all()
+
+    totals: Dict[str, Dict[str, int]] = {metric: defaultdict(int) for metric in USAGE_METRICS}
+    for metric, bucket_start, count in rows:
+        if metric in totals and count:
+            totals[metric][bucket_label(bucket_start, bucket)] += count
+
+    return {
+        metric: [{"date": label, "count": count} for label, count in sorted(counts.items())]
+        for metric, counts in totals.items()
+    }
+
+def backfill_usage_counts(db: Session):
+    """Rebuild message and agent-creation counters from the raw tables.
+
+    Executions have no raw history, so their counters are left untouched.
+    """
+    db.query(UsageCount).filter(UsageCount.metric.in_(("messages", "agent_creations"))).delete(
+        synchronize_session=False
+    )
+
+    deltas: Dict[Tuple[int, str, datetime], int] = defaultdict(int)
+    messages = db.query(Conversation.user_id, Message.created_at).select_from(Message).join(
+        Conversation
+    ).yield_per(10000)
+    for user_id, created_at in messages:
+        deltas[(user_id, "messages", hour_bucket(created_at))] += 1
+    agents = db.query(Agent.user_id, Agent.created_at).yield_per(10000)
+    for user_id, created_at in agents:
+        deltas[(user_id, "agent_creations", hour_bucket(created_at))] += 1
+
+    increment_usage_many(db, deltas)
+    db.commit()
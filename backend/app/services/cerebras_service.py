@@ -1,48 +1,155 @@
 import os
-from typing import AsyncGenerator, Dict, Any
-from cerebras.cloud.sdk import Cerebras
+from functools import lru_cache
+from typing import AsyncGenerator, Dict, Any, Union
+from cerebras.cloud.sdk import Cerebras, AsyncCerebras, DefaultHttpxClient, DefaultAsyncHttpxClient
 from crewai import Agent, LLM, Task, Crew
+from app.core.config import settings
+from app.services.tool_registry import tool_registry
+import httpx
 import asyncio
 import time
 import json
 
+class HttpClientMetrics:
+    """Request count, time-to-first-byte and pool usage for the Cerebras HTTP clients"""
+
+    def __init__(self):
+        self.requests = 0
+        self.responses = 0
+        self.ttfb_ms_total = 0.0
+        self.ttfb_ms_max = 0.0
+        self.pools = []
+
+    def on_request(self, request: httpx.Request):
+        request.extensions["start_time"] = time.perf_counter()
+        self.requests += 1
+
+    def on_response(self, response: httpx.Response):
+        # Response hooks run once headers arrive, before a streamed body is read
+        ttfb_ms = (time.perf_counter() - response.request.extensions["start_time"]) * 1000
+        self.responses += 1
+        self.ttfb_ms_total += ttfb_ms
+        self.ttfb_ms_max = max(self.ttfb_ms_max, ttfb_ms)
+
+    async def on_request_async(self, request: httpx.Request):
+        self.on_request(request)
+
+    async def on_response_async(self, response: httpx.Response):
+        self.on_response(response)
+
+    def snapshot(self) -> Dict[str, Any]:
+        # Pools httpx doesn't expose (None) report no connections
+        connections = [conn for pool in self.pools for conn in getattr(pool, "connections", None) or []]
+        active = sum(1 for conn in connections if not conn.is_idle())
+        max_connections = settings.CEREBRAS_MAX_CONNECTIONS * len(self.pools)
+        return {
+            "requests": self.requests,
+            "in_flight_before_headers": self.requests - self.responses,
+            "avg_ttfb_ms": round(self.ttfb_ms_total / self.responses, 2) if self.responses else 0,
+            "max_ttfb_ms": round(self.ttfb_ms_max, 2),
+            "connections": len(connections),
+            "active_connections": active,
+            "idle_connections": len(connections) - active,
+            "max_connections": max_connections,
+            "pool_saturation": round(active / max_connections, 3) if max_connections else 0
+        }
+
+def connection_pool(client: Union[httpx.Client, httpx.AsyncClient]):
+    """httpcore pool behind an httpx client, for pool metrics; None if httpx changes its internals"""
+    return getattr(getattr(client, "_transport", None), "_pool", None)
+
+def crewai_base_url() -> str:
+    """OpenAI-compatible base URL for CrewAI's LLM; the SDK adds /v1 itself, LiteLLM doesn't"""
+    return f"{(settings.CEREBRAS_BASE_URL or 'https://api.cerebras.ai').rstrip('/')}/v1"
+
+def _http_client_options() -> Dict[str, Any]:
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.CEREBRAS_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.CEREBRAS_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.CEREBRAS_KEEPALIVE_EXPIRY_SECONDS
+        ),
+        "timeout": httpx.Timeout(
+            settings.CEREBRAS_READ_TIMEOUT_SECONDS,
+            connect=settings.CEREBRAS_CONNECT_TIMEOUT_SECONDS,
+            pool=settings.CEREBRAS_POOL_TIMEOUT_SECONDS
+        )
+    }
+
 class CerebrasService:
     def __init__(self):
-        self.client = Cerebras(api_key=os.environ.get("CEREBRAS_API_KEY"))
+        # One pooled, keep-alive HTTP client per SDK client, shared process-wide
+        self.http_metrics = HttpClientMetrics()
+        http_client = DefaultHttpxClient(
+            event_hooks={
+                "request": [self.http_metrics.on_request],
+                "response": [self.http_metrics.on_response]
+            },
+            **_http_client_options()
+        )
+        async_http_client = DefaultAsyncHttpxClient(
+            event_hooks={
+                "request": [self.http_metrics.on_request_async],
+                "response": [self.http_metrics.on_response_async]
+            },
+            **_http_client_options()
+        )
+        self.http_metrics.pools = [connection_pool(client) for client in (http_client, async_http_client)]
+        
+        base_url = settings.CEREBRAS_BASE_URL or None
+        self.client = Cerebras(
+            api_key=os.environ.get("CEREBRAS_API_KEY"),
+            base_url=base_url,
+            http_client=http_client
+        )
+        self.async_client = AsyncCerebras(
+            api_key=os.environ.get("CEREBRAS_API_KEY"),
+            base_url=base_url,
+            http_client=async_http_client
+        )
         self.llm_configs = {
             "fast_chat": {
                 "model": "llama-4-scout-17b-16e-instruct",
                 "temperature": 0.2,
-                "max_completion_tokens": 4096
+                "max_completion_tokens": 4096,
+                "prompt_token_budget": 3072  # Chat history window; keeps time-to-first-token low
             },
             "creative": {
                 "model": "llama3.1-8b", 
                 "temperature": 0.7,
-                "max_completion_tokens": 8192
+                "max_completion_tokens": 8192,
+                "prompt_token_budget": 4096
             },
             "analytical": {
                 "model": "llama3.1-70b",
                 "temperature": 0.1,
-                "max_completion_tokens": 8192
+                "max_completion_tokens": 8192,
+                "prompt_token_budget": 6144
             }
         }
+        self._llms: Dict[str, LLM] = {}
     
     def get_crewai_llm(self, config_type: str = "fast_chat") -> LLM:
-        """Get CrewAI compatible LLM instance"""
-        config = self.llm_configs.get(config_type, self.llm_configs["fast_chat"])
-        return LLM(
-            model=f"cerebras/{config['model']}",
-            api_key=os.environ.get("CEREBRAS_API_KEY"),
-            base_url="https://api.cerebras.ai/v1",
-            temperature=config["temperature"],
-            max_tokens=config["max_completion_tokens"]
-        )
+        """Get CrewAI compatible LLM instance (one per config type)"""
+        if config_type not in self.llm_configs:
+            config_type = "fast_chat"
+        if config_type not in self._llms:
+            config = self.llm_configs[config_type]
+            self._llms[config_type] = LLM(
+                model=f"cerebras/{config['model']}",
+                api_key=os.environ.get("CEREBRAS_API_KEY"),
+                base_url=crewai_base_url(),
+                temperature=config["temperature"],
+                max_tokens=config["max_completion_tokens"]
+            )
+        return self._llms[config_type]
     
     async def stream_response(self, messages: list, config_type: str = "fast_chat") -> AsyncGenerator[str, None]:
         """Stream response from Cerebras"""
         config = self.llm_configs.get(config_type, self.llm_configs["fast_chat"])
         
-        stream = self.client.chat.completions.create(
+        # Use the async client so a long stream never blocks the event loop
+        stream = await self.async_client.chat.completions.create(
             messages=messages,
             model=config["model"],
             stream=True,
@@ -50,35 +157,44 @@ class CerebrasService:
             max_completion_tokens=config["max_completion_tokens"]
         )
         
-        for chunk in stream:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Release the connection if the consumer stops early (e.g. client disconnect)
+            await stream.close()
     
-    def create_agent(self, agent_data: Dict[str, Any]) -> Agent:
-        """Create CrewAI agent with Cerebras LLM"""
+    async def aclose(self):
+        """Close pooled connections (called from the app lifespan on shutdown)"""
+        await self.async_client.close()
+        self.client.close()
+    
+    def agent_spec(self, agent_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Keyword arguments for a CrewAI Agent, with its LLM and tools resolved"""
         llm_config = agent_data.get("llm_config", {})
         config_type = llm_config.get("config_type", "fast_chat")
         
-        return Agent(
-            role=agent_data["role"],
-            goal=agent_data["goal"], 
-            backstory=agent_data["backstory"],
-            llm=self.get_crewai_llm(config_type),
-            tools=self._get_tools(agent_data.get("tools", [])),
-            memory=agent_data.get("memory_enabled", True),
-            allow_delegation=agent_data.get("allow_delegation", False),
-            verbose=agent_data.get("verbose", True)
-        )
+        return {
+            "role": agent_data["role"],
+            "goal": agent_data["goal"],
+            "backstory": agent_data["backstory"],
+            "llm": self.get_crewai_llm(config_type),
+            "tools": self._get_tools(agent_data.get("tools", [])),
+            "memory": agent_data.get("memory_enabled", True),
+            "allow_delegation": agent_data.get("allow_delegation", False),
+            "verbose": agent_data.get("verbose", True)
+        }
+    
+    def create_agent(self, agent_data: Dict[str, Any]) -> Agent:
+        """Create CrewAI agent with Cerebras LLM"""
+        return Agent(**self.agent_spec(agent_data))
     
     def _get_tools(self, tool_names: list):
-        """Get actual tool instances based on names"""
-        # Import CrewAI tools based on names
-        from crewai_tools import SerperDevTool, ScrapeWebsiteTool, FileReadTool
-        
-        tool_mapping = {
-            "web_search": SerperDevTool(),
-            "web_scrape": ScrapeWebsiteTool(),
-            "file_read": FileReadTool()
-        }
-        
-        return [tool_mapping[name] for name in tool_names if name in tool_mapping] 
\ No newline at end of file
+        """Get actual tool instances based on names (built lazily by the tool registry)"""
+        return tool_registry.get_tools(tool_names) 
+
+@lru_cache()
+def get_cerebras_service() -> CerebrasService:
+    """Get the process-wide CerebrasService (shares SDK clients and LLM instances)"""
+    return CerebrasService()
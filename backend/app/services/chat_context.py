@@ -0,0 +1,159 @@
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models.agent import Agent
+from app.models.conversation import Message
+
+# Llama tokenizers average roughly 4 characters per token on English text;
+# a few extra tokens cover each message's role/format markers
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+# Share of the prompt budget that notes about trimmed turns may use
+SUMMARY_SHARE = 0.15
+# Share the persona may use; a longer one is shortened so the current turn always fits
+SYSTEM_SHARE = 0.5
+SUMMARY_SNIPPET_CHARS = 160
+SUMMARY_HEADER = "Earlier in this conversation:\n"
+# Stands in for the middle of a single message too long for the budget
+ELISION_MARKER = "\n[...]\n"
+HISTORY_LOAD_LIMIT = 200
+
+def count_tokens(text: str) -> int:
+    """Cheap token estimate, used only for budgeting"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+def truncate_middle(text: str, max_chars: int) -> str:
+    """Shorten text to max_chars, keeping its start and end around an elision marker"""
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= len(ELISION_MARKER) * 2:
+        return text[:max_chars]
+    keep = max_chars - len(ELISION_MARKER)
+    head = keep - keep // 2
+    return text[:head] + ELISION_MARKER + text[len(text) - (keep - head):]
+
+def agent_persona(agent: Agent) -> str:
+    """System prompt built from an agent's role, goal and backstory"""
+    return (
+        f"You are {agent.name}, {agent.role}.\n"
+        f"Goal: {agent.goal}\n"
+        f"Backstory: {agent.backstory}"
+    )
+
+class ConversationContext:
+    """Token-budgeted prompt window for one conversation.
+
+    Keeps a running token count so adding a turn is O(1); when the window
+    goes over budget the oldest turns are dropped and replaced by short
+    snippets in a bounded "earlier in this conversation" note. The persona
+    and the notes have capped shares, so the latest turn is never crowded out.
+    """
+
+    def __init__(self, system_prompt: str, budget: int):
+        self.budget = budget
+        max_system_chars = max(0, int(budget * SYSTEM_SHARE) - MESSAGE_OVERHEAD_TOKENS) * CHARS_PER_TOKEN
+        self.system = {"role": "system", "content": truncate_middle(system_prompt, max_system_chars)}
+        self.system_tokens = message_tokens(self.system)
+        self.turns: Deque[Tuple[Dict[str, str], int]] = deque()
+        self.turn_tokens = 0
+        self.summary: Deque[Tuple[str, int]] = deque()
+        self.summary_tokens = 0
+        self.omitted = 0  # Older turns not represented at all
+
+    def add(self, role: str, content: str):
+        message = {"role": role, "content": content}
+        tokens = message_tokens(message)
+        self.turns.append((message, tokens))
+        self.turn_tokens += tokens
+        self._trim()
+
+    def messages(self) -> List[Dict[str, str]]:
+        """Prompt messages: persona, notes about trimmed turns, then recent turns"""
+        messages = [self.system]
+        if self.summary or self.omitted:
+            notes = [snippet for snippet, _ in self.summary]
+            if self.omitted:
+                notes.insert(0, self._omitted_note())
+            messages.append({"role": "system", "content": SUMMARY_HEADER + "\n".join(notes)})
+        messages.extend(message for message, _ in self.turns)
+        return messages
+
+    @property
+    def token_count(self) -> int:
+        return self.system_tokens + self.notes_tokens + self.turn_tokens
+
+    @property
+    def notes_tokens(self) -> int:
+        """Tokens of the "earlier in this conversation" message, header and omitted count included"""
+        if not (self.summary or self.omitted):
+            return 0
+        tokens = MESSAGE_OVERHEAD_TOKENS + count_tokens(SUMMARY_HEADER) + self.summary_tokens
+        if self.omitted:
+            tokens += count_tokens(self._omitted_note()) + 1
+        return tokens
+
+    def _omitted_note(self) -> str:
+        return f"({self.omitted} earlier messages omitted)"
+
+    def _trim(self):
+        # Always keep the latest turn, truncating it if it alone is over budget
+        while self.token_count > self.budget and len(self.turns) > 1:
+            message, tokens = self.turns.popleft()
+            self.turn_tokens -= tokens
+            self._summarize(message)
+
+        if self.token_count > self.budget and self.turns:
+            message, tokens = self.turns.pop()
+            self.turn_tokens -= tokens
+            available = max(0, self.budget - self.token_count - MESSAGE_OVERHEAD_TOKENS)
+            message = {"role": message["role"], "content": truncate_middle(message["content"], available * CHARS_PER_TOKEN)}
+            tokens = message_tokens(message)
+            self.turns.append((message, tokens))
+            self.turn_tokens += tokens
+
+    def _summarize(self, message: Dict[str, str]):
+        content = " ".join(message["content"].split())
+        if len(content) > SUMMARY_SNIPPET_CHARS:
+            content = content[:SUMMARY_SNIPPET_CHARS].rstrip() + "..."
+        snippet = f"- {message['role']}: {content}"
+        tokens = count_tokens(snippet) + 1
+        self.summary.append((snippet, tokens))
+        self.summary_tokens += tokens
+
+        while self.summary and self.notes_tokens > self.budget * SUMMARY_SHARE:
+            _, dropped = self.summary.popleft()
+            self.summary_tokens -= dropped
+            self.omitted += 1
+
+def load_context(
+    db: Session,
+    agent: Agent,
+    budget: int,
+    conversation_id: Optional[int] = None
+) -> ConversationContext:
+    """Context for an agent's chat, seeded with as much recent history as fits the budget"""
+    context = ConversationContext(agent_persona(agent), budget)
+    if conversation_id is None:
+        return context
+
+    recent = db.query(Message.role, Message.content).filter(
+        Message.conversation_id == conversation_id
+    ).order_by(Message.created_at.desc(), Message.id.desc()).limit(HISTORY_LOAD_LIMIT).all()
+
+    # Walk back from the newest message until the window is full
+    available = budget - context.system_tokens
+    history = []
+    for role, content in recent:
+        tokens = message_tokens({"role": role, "content": content})
+        if tokens > available:
+            break
+        available -= tokens
+        history.append((role, content))
+
+    context.omitted = len(recent) - len(history)
+    for role, content in reversed(history):
+        context.add(role, content)
+    return context
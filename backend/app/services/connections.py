@@ -0,0 +1,327 @@
+from typing import Any, Callable, Dict, Optional, Set
+import asyncio
+import itertools
+import json
+import logging
+import time
+import uuid
+from fastapi import WebSocket, status
+from app.core.config import settings
+from app.services.framing import DEFAULT_CODEC, Frame
+
+logger = logging.getLogger(__name__)
+
+# deliver(topic, payload) callback a backplane hands published messages to
+Deliver = Callable[[str, str], None]
+
+class Connection:
+    """One accepted WebSocket with its own bounded outbound queue and wire codec"""
+
+    def __init__(self, connection_id: str, websocket: WebSocket, user_id: int, queue_size: int, codec: Any):
+        self.id = connection_id
+        self.websocket = websocket
+        self.user_id = user_id
+        self.codec = codec
+        self.queue: "asyncio.Queue[Frame]" = asyncio.Queue(maxsize=queue_size)
+        self.topics: Set[str] = set()
+        self.last_seen = time.monotonic()
+        self.answers_pings = False
+        self.closed = False
+        self.dropped = 0
+        self.sender: Optional[asyncio.Task] = None
+
+    def touch(self):
+        """Record inbound activity; call on every received message"""
+        self.last_seen = time.monotonic()
+
+    def pong(self):
+        """Record a heartbeat reply; from then on the idle timeout applies to this client"""
+        self.answers_pings = True
+
+class MemoryBackplane:
+    """In-process stand-in for Redis pub/sub.
+
+    Every instance shares one subscription table, so several managers in the
+    same process behave like separate workers (used by tests and single-worker
+    deployments).
+    """
+
+    subscribers: Dict[str, Set["MemoryBackplane"]] = {}
+
+    def __init__(self):
+        self.deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        self.deliver = deliver
+
+    async def subscribe(self, topic: str):
+        self.subscribers.setdefault(topic, set()).add(self)
+
+    async def unsubscribe(self, topic: str):
+        backplanes = self.subscribers.get(topic)
+        if backplanes is not None:
+            backplanes.discard(self)
+            if not backplanes:
+                del self.subscribers[topic]
+
+    async def publish(self, topic: str, payload: str):
+        for backplane in list(self.subscribers.get(topic, ())):
+            backplane.deliver(topic, payload)
+
+    async def close(self):
+        for topic in [topic for topic, backplanes in self.subscribers.items() if self in backplanes]:
+            await self.unsubscribe(topic)
+
+class RedisBackplane:
+    """Redis pub/sub fan-out between workers; one subscriber connection per process"""
+
+    def __init__(self, url: str, prefix: str = "ws:"):
+        self.url = url
+        self.prefix = prefix
+        self.redis = None
+        self.pubsub = None
+        self.listener: Optional[asyncio.Task] = None
+        self.deliver: Optional[Deliver] = None
+
+    async def start(self, deliver: Deliver):
+        import redis.asyncio as aioredis
+
+        self.deliver = deliver
+        self.redis = aioredis.Redis.from_url(self.url, decode_responses=True)
+        self.pubsub = self.redis.pubsub()
+
+    async def subscribe(self, topic: str):
+        await self.pubsub.subscribe(self.prefix + topic)
+        if self.listener is None:
+            self.listener = asyncio.create_task(self._listen())
+
+    async def unsubscribe(self, topic: str):
+        await self.pubsub.unsubscribe(self.prefix + topic)
+
+    async def publish(self, topic: str, payload: str):
+        await self.redis.publish(self.prefix + topic, payload)
+
+    async def close(self):
+        if self.listener is not None:
+            self.listener.cancel()
+            self.listener = None
+        if self.pubsub is not None:
+            await self.pubsub.aclose()
+        if self.redis is not None:
+            await self.redis.aclose()
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # redis-py resubscribes when the connection comes back
+                logger.exception("WebSocket backplane lost its Redis connection; retrying")
+                await asyncio.sleep(1.0)
+                continue
+            if message is not None:
+                self.deliver(message["channel"][len(self.prefix):], message["data"])
+
+class ConnectionManager:
+    """Process-wide registry of chat WebSockets.
+
+    Connections are kept by id, so connecting and disconnecting are O(1).
+    Sends only enqueue: each connection has a sender task draining its own
+    bounded queue, so a slow client can never stall the code producing
+    messages. When a queue is full the message is dropped or the connection
+    is closed, depending on the slow-consumer policy. A heartbeat pings
+    every connection and closes the ones that have answered pings before
+    but gone quiet since; clients that never pong are left to the server's
+    protocol-level keepalive, so a healthy idle tab isn't dropped. Messages
+    published to a topic reach its subscribers on every worker through the
+    backplane.
+    """
+
+    def __init__(
+        self,
+        backplane,
+        queue_size: int,
+        slow_consumer_policy: str,
+        heartbeat_seconds: float,
+        idle_timeout_seconds: float
+    ):
+        self.backplane = backplane
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.heartbeat_seconds = heartbeat_seconds
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.connections: Dict[str, Connection] = {}
+        self.topics: Dict[str, Set[str]] = {}
+        self.ids = itertools.count(1)
+        # Connection ids are unique across workers so the backplane can skip the origin
+        self.prefix = uuid.uuid4().hex[:12] + "-"
+        self.heartbeat: Optional[asyncio.Task] = None
+        self.started = False
+        self.counters = {"dropped": 0, "closed_slow": 0, "closed_idle": 0}
+
+    async def start(self):
+        if self.started:
+            return
+        self.started = True
+        await self.backplane.start(self._deliver)
+        if self.heartbeat_seconds > 0:
+            self.heartbeat = asyncio.create_task(self._heartbeat())
+
+    async def shutdown(self):
+        """Close every connection and the backplane"""
+        if self.heartbeat is not None:
+            self.heartbeat.cancel()
+            self.heartbeat = None
+        for connection in list(self.connections.values()):
+            await self.close(connection, status.WS_1012_SERVICE_RESTART, "Server restarting")
+        await self.backplane.close()
+        self.started = False
+
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_id: int,
+        subprotocol: Optional[str] = None,
+        codec: Any = DEFAULT_CODEC
+    ) -> Connection:
+        await self.start()
+        await websocket.accept(subprotocol=subprotocol)
+        connection = Connection(f"{self.prefix}{next(self.ids)}", websocket, user_id, self.queue_size, codec)
+        connection.sender = asyncio.create_task(self._send_loop(connection))
+        self.connections[connection.id] = connection
+        return connection
+
+    async def disconnect(self, connection: Connection):
+        """Forget a connection (idempotent); call when its handler exits"""
+        if self.connections.pop(connection.id, None) is None:
+            return
+        connection.closed = True
+        if connection.sender is not None:
+            connection.sender.cancel()
+        for topic in connection.topics:
+            subscribers = self.topics.get(topic)
+            if subscribers is None:
+                continue
+            subscribers.discard(connection.id)
+            if not subscribers:
+                del self.topics[topic]
+                await self.backplane.unsubscribe(topic)
+        connection.topics.clear()
+
+    async def subscribe(self, connection: Connection, topic: str):
+        subscribers = self.topics.get(topic)
+        if subscribers is None:
+            subscribers = self.topics[topic] = set()
+            await self.backplane.subscribe(topic)
+        subscribers.add(connection.id)
+        connection.topics.add(topic)
+
+    def send(self, connection: Connection, event: Dict[str, Any]) -> bool:
+        """Encode an event for one connection and queue it without waiting; False if it wasn't queued"""
+        if connection.closed:
+            return False
+        try:
+            connection.queue.put_nowait(connection.codec.encode(event))
+            return True
+        except asyncio.QueueFull:
+            self._slow_consumer(connection)
+            return False
+
+    async def publish(self, topic: str, event: Dict[str, Any], origin: Optional[Connection] = None):
+        """Send to a topic's subscribers on every worker, except the origin connection.
+
+        Events travel as JSON and are encoded per subscriber, since sockets on
+        one topic may have negotiated different subprotocols.
+        """
+        await self.backplane.publish(topic, f"{origin.id if origin else ''}|{json.dumps(event)}")
+
+    async def close(self, connection: Connection, code: int = status.WS_1000_NORMAL_CLOSURE, reason: str = ""):
+        if connection.closed:
+            return
+        connection.closed = True
+        await self._close_socket(connection, code, reason)
+
+    def stats(self):
+        return {
+            "connections": len(self.connections),
+            "topics": len(self.topics),
+            "queued": sum(connection.queue.qsize() for connection in self.connections.values()),
+            **self.counters
+        }
+
+    def _deliver(self, topic: str, payload: str):
+        origin, _, message = payload.partition("|")
+        event = None
+        for connection_id in list(self.topics.get(topic, ())):
+            connection = self.connections.get(connection_id)
+            if connection is not None and connection_id != origin:
+                event = event or json.loads(message)
+                self.send(connection, event)
+
+    def _slow_consumer(self, connection: Connection):
+        if self.slow_consumer_policy == "drop":
+            connection.dropped += 1
+            self.counters["dropped"] += 1
+            return
+        # Mark it closed right away so the rest of a burst is discarded, not counted again
+        connection.closed = True
+        self.counters["closed_slow"] += 1
+        asyncio.get_running_loop().create_task(
+            self._close_socket(connection, status.WS_1013_TRY_AGAIN_LATER, "Client too slow")
+        )
+
+    async def _close_socket(self, connection: Connection, code: int, reason: str):
+        if connection.sender is not None:
+            connection.sender.cancel()
+        try:
+            await connection.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass  # Already gone; the handler sees the disconnect and cleans up
+
+    async def _send_loop(self, connection: Connection):
+        try:
+            while True:
+                frame = await connection.queue.get()
+                if isinstance(frame, bytes):
+                    await connection.websocket.send_bytes(frame)
+                else:
+                    await connection.websocket.send_text(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The socket is gone; the handler's receive() will report the disconnect
+            connection.closed = True
+
+    async def _heartbeat(self):
+        ping = {"type": "ping"}
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            cutoff = time.monotonic() - self.idle_timeout_seconds
+            for connection in list(self.connections.values()):
+                if connection.closed:
+                    continue
+                if self.idle_timeout_seconds > 0 and connection.answers_pings and connection.last_seen < cutoff:
+                    # Closed in the background, so one stuck close handshake can't hold up the sweep
+                    connection.closed = True
+                    self.counters["closed_idle"] += 1
+                    asyncio.get_running_loop().create_task(
+                        self._close_socket(connection, status.WS_1000_NORMAL_CLOSURE, "Idle timeout")
+                    )
+                else:
+                    self.send(connection, ping)
+
+def create_backplane():
+    """Backplane configured by WS_BACKPLANE"""
+    if settings.WS_BACKPLANE == "redis":
+        return RedisBackplane(settings.REDIS_URL)
+    return MemoryBackplane()
+
+connection_manager = ConnectionManager(
+    backplane=create_backplane(),
+    queue_size=settings.WS_SEND_QUEUE_SIZE,
+    slow_consumer_policy=settings.WS_SLOW_CONSUMER_POLICY,
+    heartbeat_seconds=settings.WS_HEARTBEAT_SECONDS,
+    idle_timeout_seconds=settings.WS_IDLE_TIMEOUT_SECONDS
+)
@@ -0,0 +1,165 @@
+from fastapi import WebSocket
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+from typing import TYPE_CHECKING, Any, AsyncGenerator, Callable, Dict, List, Optional, Type
+import asyncio
+import json
+
+if TYPE_CHECKING:
+    from app.services.admission import Lease
+
+# on_event(event_type, data) callback passed down into AgentService executions
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+def emit(on_event: Optional[EventCallback], event_type: str, **data):
+    """Send an execution event if someone is listening"""
+    if on_event is not None:
+        on_event(event_type, data)
+
+class CrewEventRelay:
+    """Translates CrewAI step/task callbacks into execution events"""
+
+    def __init__(self, on_event: Optional[EventCallback], agent_names: List[str]):
+        self.on_event = on_event
+        self.agent_names = agent_names
+        self.task_index = 0
+
+    def crew_kwargs(self) -> Dict[str, Any]:
+        """Callbacks to pass to Crew(...); empty when nobody is listening"""
+        if self.on_event is None:
+            return {}
+        return {"step_callback": self.step_callback, "task_callback": self.task_callback}
+
+    def start(self):
+        self._task_started()
+
+    def step_callback(self, step: Any):
+        agent = self._current_agent()
+        tool = getattr(step, "tool", None)
+        if tool:
+            emit(self.on_event, "tool_call", agent=agent, tool=tool, tool_input=str(getattr(step, "tool_input", "")))
+            return
+        thought = getattr(step, "thought", None) or getattr(step, "text", None) or str(step)
+        emit(self.on_event, "agent_step", agent=agent, thought=str(thought))
+
+    def task_callback(self, output: Any):
+        emit(
+            self.on_event, "task_finished",
+            agent=self._current_agent(),
+            task_index=self.task_index,
+            output=str(getattr(output, "raw", None) or output)
+        )
+        self.task_index += 1
+        if self.task_index < len(self.agent_names):
+            self._task_started()
+
+    def _task_started(self):
+        emit(self.on_event, "task_started", agent=self._current_agent(), task_index=self.task_index)
+
+    def _current_agent(self) -> Optional[str]:
+        if self.task_index < len(self.agent_names):
+            return self.agent_names[self.task_index]
+        return None
+
+class ExecutionStream:
+    """Bridges events from an execution running in a worker thread onto the event loop"""
+
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def emit(self, event_type: str, data: Dict[str, Any]):
+        # Called from the worker thread
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, {"type": event_type, **data})
+
+    async def run(self, func: Callable, *args, lease: Optional["Lease"] = None) -> AsyncGenerator[Dict[str, Any], None]:
+        """Run func(*args, on_event=...) in the threadpool, yielding its events then the result.
+
+        The execution is started before the first event. A lease is released
+        by the worker thread when func returns: the thread keeps running
+        (and keeps calling the LLM) after the consumer goes away.
+        """
+        if lease is not None:
+            lease.claim()
+        execution = asyncio.ensure_future(run_in_threadpool(self._call, func, args, lease))
+        yield {"type": "started"}
+
+        while True:
+            next_event = asyncio.ensure_future(self.queue.get())
+            await asyncio.wait({next_event, execution}, return_when=asyncio.FIRST_COMPLETED)
+            if next_event.done():
+                yield next_event.result()
+                continue
+            next_event.cancel()
+            break
+
+        # Events are queued before the execution's completion is delivered, so drain them first
+        while not self.queue.empty():
+            yield self.queue.get_nowait()
+
+        error = execution.exception()
+        if error is not None:
+            yield {"type": "error", "detail": str(getattr(error, "detail", None) or error)}
+        else:
+            yield {"type": "result", "data": execution.result()}
+
+    def _call(self, func: Callable, args: tuple, lease: Optional["Lease"]) -> Any:
+        # Runs on the worker thread
+        try:
+            return func(*args, on_event=self.emit)
+        finally:
+            if lease is not None:
+                lease.release()
+
+async def stream_execution(
+    kind: str,
+    target_id: int,
+    task_description: str,
+    lease: Optional["Lease"] = None
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """Execute an agent or team, yielding progress events and finally the result"""
+    from app.services.job_service import run_job
+
+    stream = ExecutionStream()
+    async for event in stream.run(run_job, kind, target_id, task_description, lease=lease):
+        yield event
+
+async def receive_request(
+    websocket: WebSocket,
+    schema: Type[BaseModel],
+    send_error: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Optional[BaseModel]:
+    """Next request on a socket; a malformed one gets an error frame and None.
+
+    Sockets whose writes go through a send queue pass send_error so the
+    error frame doesn't race the queue's own writes.
+    """
+    try:
+        payload = await websocket.receive_json()
+        if not isinstance(payload, dict):
+            raise TypeError("expected a JSON object")
+        return schema(**payload)
+    except (json.JSONDecodeError, ValidationError, TypeError, KeyError) as exc:
+        # KeyError: a binary frame has no "text"
+        reason = "expected a text frame" if isinstance(exc, KeyError) else exc
+        error = {"type": "error", "detail": f"Invalid request: {reason}"}
+        if send_error is None:
+            await websocket.send_json(error)
+        else:
+            send_error(error)
+        return None
+
+# Keep proxies (nginx) from buffering the stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+async def sse_execution(
+    kind: str,
+    target_id: int,
+    task_description: str,
+    lease: Optional["Lease"] = None
+) -> AsyncGenerator[str, None]:
+    async for event in stream_execution(kind, target_id, task_description, lease):
+        yield format_sse(event)
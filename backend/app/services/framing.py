@@ -0,0 +1,145 @@
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, Union
+import asyncio
+import json
+import msgpack
+from fastapi import WebSocket
+from app.core.config import settings
+
+Frame = Union[str, bytes]
+
+# Upper bounds on what a client may ask for when tuning coalescing
+MAX_COALESCE_MS = 250
+MAX_COALESCE_BYTES = 16384
+# Deltas read ahead of the coalescer; a full queue pauses reading from upstream
+COALESCE_QUEUE_SIZE = 256
+
+class JSONCodec:
+    """Original chat protocol: every event is sent as-is as a JSON text frame"""
+
+    def encode(self, event: Dict[str, Any]) -> Frame:
+        return json.dumps(event)
+
+class CompactJSONCodec:
+    """chat.v2.json: short delta frames and a metadata-only completion frame"""
+
+    def encode(self, event: Dict[str, Any]) -> Frame:
+        return json.dumps(compact_event(event), separators=(",", ":"))
+
+class MsgpackCodec:
+    """chat.v2.msgpack: the compact frames as binary msgpack"""
+
+    def encode(self, event: Dict[str, Any]) -> Frame:
+        return msgpack.packb(compact_event(event))
+
+# Subprotocols a client can offer in Sec-WebSocket-Protocol, in order of preference
+SUBPROTOCOLS = {
+    "chat.v2.msgpack": MsgpackCodec(),
+    "chat.v2.json": CompactJSONCodec(),
+}
+DEFAULT_CODEC = JSONCodec()
+
+def compact_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """v2 wire form: deltas become {"t": "d", "c": text}; the completion drops the full text"""
+    if event["type"] == "chunk":
+        return {"t": "d", "c": event["content"]}
+    if event["type"] == "complete":
+        return {"t": "done", **{key: value for key, value in event.items() if key not in ("type", "full_response")}}
+    return event
+
+def negotiate(websocket: WebSocket) -> Tuple[Optional[str], Any]:
+    """Pick the subprotocol to accept and its codec; clients offering none get the original protocol"""
+    offered = websocket.scope.get("subprotocols") or []
+    for subprotocol, codec in SUBPROTOCOLS.items():
+        if subprotocol in offered:
+            return subprotocol, codec
+    return None, DEFAULT_CODEC
+
+def coalesce_window(window_ms: Optional[int], max_bytes: Optional[int]) -> Tuple[float, int]:
+    """Per-connection coalescing settings: client requests, capped at the server limits"""
+    if window_ms is None:
+        window_ms = settings.WS_COALESCE_MS
+    if max_bytes is None:
+        max_bytes = settings.WS_COALESCE_BYTES
+    window_ms = max(0, min(window_ms, MAX_COALESCE_MS))
+    max_bytes = max(1, min(max_bytes, MAX_COALESCE_BYTES))
+    return window_ms / 1000, max_bytes
+
+_END = object()
+
+async def coalesce(deltas: AsyncIterator[str], window_seconds: float, max_bytes: int) -> AsyncIterator[str]:
+    """Group token deltas into larger pieces.
+
+    The first delta is passed straight through so time to first token is
+    unchanged. Later deltas are buffered until the buffer holds max_bytes or
+    window_seconds have passed since its first delta, whichever comes first.
+    A slow stretch of the stream never holds text back for longer than the
+    window.
+    """
+    if window_seconds <= 0:
+        try:
+            async for delta in deltas:
+                yield delta
+        finally:
+            await _close(deltas)
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=COALESCE_QUEUE_SIZE)
+
+    async def pump():
+        try:
+            async for delta in deltas:
+                await queue.put(delta)
+        except Exception as exc:
+            await queue.put(exc)
+        finally:
+            await _close(deltas)
+        await queue.put(_END)
+
+    reader = asyncio.create_task(pump())
+    try:
+        item = await queue.get()
+        if item is _END:
+            return
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+        buffer, size, deadline = [], 0, 0.0
+        while True:
+            if buffer:
+                try:
+                    item = await asyncio.wait_for(queue.get(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    yield "".join(buffer)
+                    buffer, size = [], 0
+                    continue
+            else:
+                item = await queue.get()
+
+            if item is _END:
+                break
+            if isinstance(item, Exception):
+                # Text that already arrived still reaches the client before the error
+                if buffer:
+                    yield "".join(buffer)
+                raise item
+            if not buffer:
+                deadline = loop.time() + window_seconds
+            buffer.append(item)
+            size += len(item.encode())
+            if size >= max_bytes:
+                yield "".join(buffer)
+                buffer, size = [], 0
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        # Let the pump unwind (closing the upstream stream) before returning
+        reader.cancel()
+        await asyncio.wait([reader])
+
+async def _close(deltas: AsyncIterator[str]):
+    aclose = getattr(deltas, "aclose", None)
+    if aclose is not None:
+        await aclose()
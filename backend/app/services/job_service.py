@@ -0,0 +1,192 @@
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import datetime
+from typing import Dict, Any, Optional
+import json
+import threading
+import uuid
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+JOB_KINDS = ("agent", "team")
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+def run_job(kind: str, target_id: int, task_description: str, on_event=None) -> Dict[str, Any]:
+    """Execute an agent or team job with its own database session"""
+    from app.services.agent_service import AgentService
+
+    db = SessionLocal()
+    try:
+        agent_service = AgentService(db)
+        if kind == "agent":
+            return agent_service.execute_single_agent(target_id, task_description, on_event=on_event)
+        return agent_service.execute_team(target_id, task_description, on_event=on_event)
+    finally:
+        db.close()
+
+def _error_message(exc: BaseException) -> str:
+    # HTTPException raised by AgentService carries its message in `detail`
+    return str(getattr(exc, "detail", None) or exc)
+
+class ThreadJobQueue:
+    """In-process job queue backed by a bounded thread pool"""
+
+    def __init__(self, max_workers: int):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.futures: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+
+    def submit(self, kind: str, target_id: int, task_description: str, user_id: int) -> Dict[str, Any]:
+        self._purge_expired()
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "target_id": target_id,
+            "user_id": user_id,
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "created_at": datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None
+        }
+        with self.lock:
+            self.jobs[job_id] = job
+            self.futures[job_id] = self.executor.submit(self._run, job_id, kind, target_id, task_description)
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] not in FINISHED_STATUSES:
+                # Queued jobs never start; a running crew can't be interrupted,
+                # so its result is discarded when it finishes
+                self.futures[job_id].cancel()
+                job["status"] = "cancelled"
+                job["finished_at"] = datetime.utcnow()
+            return dict(job)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job_id: str, kind: str, target_id: int, task_description: str):
+        with self.lock:
+            job = self.jobs[job_id]
+            if job["status"] == "cancelled":
+                return
+            job["status"] = "running"
+            job["started_at"] = datetime.utcnow()
+
+        try:
+            result = run_job(kind, target_id, task_description)
+            update = {"status": "succeeded", "result": result}
+        except Exception as exc:
+            update = {"status": "failed", "error": _error_message(exc)}
+
+        with self.lock:
+            if job["status"] != "cancelled":
+                job.update(update, finished_at=datetime.utcnow())
+
+    def _purge_expired(self):
+        """Drop finished jobs older than the result TTL"""
+        now = datetime.utcnow()
+        with self.lock:
+            expired = [
+                job_id for job_id, job in self.jobs.items()
+                if job["finished_at"]
+                and (now - job["finished_at"]).total_seconds() > settings.JOB_RESULT_TTL_SECONDS
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+                del self.futures[job_id]
+
+class CeleryJobQueue:
+    """Job queue backed by Celery workers, with job metadata kept in Redis"""
+
+    STATE_MAP = {
+        "PENDING": "queued",
+        "RECEIVED": "queued",
+        "RETRY": "queued",
+        "STARTED": "running",
+        "SUCCESS": "succeeded",
+        "FAILURE": "failed",
+        "REVOKED": "cancelled"
+    }
+
+    def __init__(self):
+        from app.core.redis import get_redis
+        from app.worker import celery_app, execute_job
+
+        self.celery_app = celery_app
+        self.task = execute_job
+        self.redis = get_redis()
+
+    def submit(self, kind: str, target_id: int, task_description: str, user_id: int) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        meta = {
+            "kind": kind,
+            "target_id": target_id,
+            "user_id": user_id,
+            "created_at": datetime.utcnow().isoformat()
+        }
+        # Metadata first so the job is visible (and owned) before a worker picks it up
+        self.redis.set(self._key(job_id), json.dumps(meta), ex=settings.JOB_RESULT_TTL_SECONDS)
+        self.task.apply_async(args=[kind, target_id, task_description], task_id=job_id)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = self.redis.get(self._key(job_id))
+        if raw is None:
+            return None
+        meta = json.loads(raw)
+
+        async_result = self.celery_app.AsyncResult(job_id)
+        status = self.STATE_MAP.get(async_result.state, "queued")
+        if meta.get("cancelled"):
+            status = "cancelled"
+
+        return {
+            "id": job_id,
+            "kind": meta["kind"],
+            "target_id": meta["target_id"],
+            "user_id": meta["user_id"],
+            "status": status,
+            "result": async_result.result if status == "succeeded" else None,
+            "error": _error_message(async_result.result) if status == "failed" else None,
+            "created_at": datetime.fromisoformat(meta["created_at"]),
+            "started_at": None,
+            "finished_at": async_result.date_done if status in FINISHED_STATUSES else None
+        }
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        raw = self.redis.get(self._key(job_id))
+        if raw is None:
+            return None
+        meta = json.loads(raw)
+        meta["cancelled"] = True
+        self.redis.set(self._key(job_id), json.dumps(meta), keepttl=True)
+        # terminate=True stops a crew that is already running in a prefork worker
+        self.celery_app.control.revoke(job_id, terminate=True)
+        return self.get(job_id)
+
+    def shutdown(self):
+        pass
+
+    def _key(self, job_id: str) -> str:
+        return f"jobs:{job_id}"
+
+def create_job_queue():
+    """Create the job queue configured by JOB_BACKEND"""
+    if settings.JOB_BACKEND == "celery":
+        return CeleryJobQueue()
+    return ThreadJobQueue(max_workers=settings.JOB_WORKERS)
+
+job_queue = create_job_queue()
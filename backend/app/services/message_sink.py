@@ -0,0 +1,167 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import threading
+from sqlalchemy import insert
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.conversation import Message
+from app.services.analytics_service import hour_bucket, increment_usage_many
+
+logger = logging.getLogger(__name__)
+
+class MessageSink:
+    """Write-behind buffer that persists chat messages in bulk.
+
+    Connections hand messages over without touching the database; a single
+    background thread inserts them (and bumps the "messages" usage counters)
+    in one transaction once the batch size is reached or the interval passes.
+    A batch that keeps failing is written row by row so one bad message
+    (e.g. for a deleted conversation) is dropped instead of blocking the
+    rest, and at most max_pending messages wait in memory.
+    """
+
+    def __init__(self, batch_size: int, flush_seconds: float, max_retries: int, max_pending: int):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_retries = max_retries
+        self.max_pending = max_pending
+        self.buffer: List[Tuple[int, Dict[str, Any]]] = []
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.failures = 0  # Consecutive failed batch writes
+        self.persisted = 0
+        self.dropped = 0
+
+    def submit(
+        self,
+        user_id: int,
+        conversation_id: int,
+        role: str,
+        content: str,
+        agent_id: Optional[int] = None
+    ):
+        """Queue a message for persistence; never blocks on the database (drops it when the buffer is full)"""
+        row = {
+            "conversation_id": conversation_id,
+            "agent_id": agent_id,
+            "role": role,
+            "content": content,
+            # Stamped now so history keeps the order messages happened in
+            "created_at": datetime.utcnow()
+        }
+        with self.lock:
+            if len(self.buffer) >= self.max_pending:
+                self.dropped += 1
+                overflow = True
+            else:
+                self.buffer.append((user_id, row))
+                overflow = False
+            full = len(self.buffer) >= self.batch_size
+        if overflow:
+            logger.warning("Message buffer is full (%d pending); dropped a chat message", self.max_pending)
+        if self.thread is None:
+            self.start()
+        if full:
+            self.wake.set()
+
+    def flush(self) -> int:
+        """Insert everything buffered so far; returns the number of messages written"""
+        with self.flush_lock:
+            with self.lock:
+                batch, self.buffer = self.buffer, []
+            if not batch:
+                return 0
+
+            try:
+                self._write(batch)
+            except Exception:
+                self.failures += 1
+                if self.failures <= self.max_retries:
+                    with self.lock:
+                        self.buffer[:0] = batch
+                    logger.exception(
+                        "Failed to persist %d chat messages; retry %d of %d",
+                        len(batch), self.failures, self.max_retries
+                    )
+                    return 0
+                # Retries used up: keep the good rows and drop the ones that fail alone
+                self.failures = 0
+                return self._write_rows(batch)
+            self.failures = 0
+            self.persisted += len(batch)
+            return len(batch)
+
+    def start(self):
+        """Start the background writer"""
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.stopped.clear()
+            self.thread = threading.Thread(target=self._run, name="message-sink", daemon=True)
+            self.thread.start()
+
+    def shutdown(self):
+        """Stop the writer and persist whatever is still buffered"""
+        self.stopped.set()
+        self.wake.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        # A failing batch is retried, then written row by row, so this empties the buffer
+        for _ in range(self.max_retries + 1):
+            self.flush()
+            if not self.buffer:
+                break
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"pending": len(self.buffer), "persisted": self.persisted, "dropped": self.dropped}
+
+    def _write(self, batch: List[Tuple[int, Dict[str, Any]]]):
+        """Insert a batch and its usage counters in one transaction"""
+        usage: Dict[Tuple[int, str, datetime], int] = defaultdict(int)
+        for user_id, row in batch:
+            usage[(user_id, "messages", hour_bucket(row["created_at"]))] += 1
+
+        db = SessionLocal()
+        try:
+            db.execute(insert(Message.__table__), [row for _, row in batch])
+            increment_usage_many(db, usage)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _write_rows(self, batch: List[Tuple[int, Dict[str, Any]]]) -> int:
+        written = 0
+        for item in batch:
+            try:
+                self._write([item])
+            except Exception:
+                with self.lock:
+                    self.dropped += 1
+                logger.exception("Dropping a chat message for conversation %s", item[1]["conversation_id"])
+                continue
+            written += 1
+        self.persisted += written
+        return written
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wake.wait(self.flush_seconds)
+            self.wake.clear()
+            self.flush()
+
+message_sink = MessageSink(
+    batch_size=settings.MESSAGE_SINK_BATCH_SIZE,
+    flush_seconds=settings.MESSAGE_SINK_FLUSH_SECONDS,
+    max_retries=settings.MESSAGE_SINK_MAX_RETRIES,
+    max_pending=settings.MESSAGE_SINK_MAX_PENDING
+)
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+import hashlib
+import json
+import zlib
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.workflow import WorkflowNodeOutput
+
+def agent_fingerprint(agent_config_hash: str, model_config: Dict[str, Any]) -> str:
+    """Everything about an agent node's agent that can change its output"""
+    payload = json.dumps({"agent": agent_config_hash, "model": model_config}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def node_output_key(fingerprint: str, prompt: str, expected_output: str) -> str:
+    """Key of an agent node run; the prompt already embeds the node's inputs"""
+    payload = json.dumps([fingerprint, prompt, expected_output])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def load_output(db: Session, workflow_id: int, key: str) -> Optional[Tuple[str, int]]:
+    """(output, llm_ms) stored for a node key, if it hasn't expired"""
+    cutoff = datetime.utcnow() - timedelta(hours=settings.WORKFLOW_OUTPUT_TTL_HOURS)
+    row = db.execute(
+        select(WorkflowNodeOutput.output, WorkflowNodeOutput.llm_ms).where(
+            WorkflowNodeOutput.workflow_id == workflow_id,
+            WorkflowNodeOutput.node_key == key,
+            WorkflowNodeOutput.last_used_at >= cutoff
+        )
+    ).first()
+    if row is None:
+        return None
+    return zlib.decompress(row.output).decode(), row.llm_ms
+
+def save_output(db: Session, workflow_id: int, key: str, node_id: str, output: str, llm_ms: int):
+    """Store (or refresh) a node output; the caller commits"""
+    compressed = zlib.compress(output.encode())
+    row = {
+        "workflow_id": workflow_id,
+        "node_key": key,
+        "node_id": node_id,
+        "output": compressed,
+        "size_bytes": len(compressed),
+        "llm_ms": llm_ms,
+        "last_used_at": datetime.utcnow()
+    }
+    table = WorkflowNodeOutput.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(table).values(**row)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["workflow_id", "node_key"],
+            set_={column: stmt.excluded[column] for column in ("node_id", "output", "size_bytes", "llm_ms", "last_used_at")}
+        ))
+        return
+
+    key_filter = (table.c.workflow_id == workflow_id, table.c.node_key == key)
+    if db.execute(select(table.c.id).where(*key_filter)).first() is None:
+        db.execute(insert(table).values(**row))
+    else:
+        db.execute(update(table).where(*key_filter).values(**row))
+
+def touch_outputs(db: Session, workflow_id: int, keys: Iterable[str]):
+    """Mark reused outputs as recently used so size eviction keeps them"""
+    keys = list(keys)
+    if keys:
+        db.execute(update(WorkflowNodeOutput).where(
+            WorkflowNodeOutput.workflow_id == workflow_id,
+            WorkflowNodeOutput.node_key.in_(keys)
+        ).values(last_used_at=datetime.utcnow()))
+
+def prune_outputs(db: Session, workflow_id: int) -> int:
+    """Drop a workflow's expired outputs, then its least recently used ones over the size budget"""
+    cutoff = datetime.utcnow() - timedelta(hours=settings.WORKFLOW_OUTPUT_TTL_HOURS)
+    expired = db.execute(delete(WorkflowNodeOutput).where(
+        WorkflowNodeOutput.workflow_id == workflow_id,
+        WorkflowNodeOutput.last_used_at < cutoff
+    )).rowcount
+
+    rows = db.execute(
+        select(WorkflowNodeOutput.id, WorkflowNodeOutput.size_bytes).where(
+            WorkflowNodeOutput.workflow_id == workflow_id
+        ).order_by(WorkflowNodeOutput.last_used_at.desc(), WorkflowNodeOutput.id.desc())
+    ).all()
+    total, evict = 0, []
+    for row in rows:
+        total += row.size_bytes
+        if total > settings.WORKFLOW_OUTPUT_MAX_BYTES:
+            evict.append(row.id)
+    if evict:
+        db.execute(delete(WorkflowNodeOutput).where(WorkflowNodeOutput.id.in_(evict)))
+    return expired + len(evict)
+
+def delete_outputs(db: Session, workflow_id: int):
+    db.execute(delete(WorkflowNodeOutput).where(WorkflowNodeOutput.workflow_id == workflow_id))
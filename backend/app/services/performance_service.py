@@ -0,0 +1,241 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import os
+import socket
+import threading
+from fastapi import HTTPException
+from sqlalchemy import case, func, select, update, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core.quantile_sketch import QuantileSketch
+from app.models.execution import ExecutionRecord, LatencySketch
+
+# Each worker process owns its own sketch rows, so writes never contend. The id
+# is stable across restarts (one row per worker slot and day, not per start);
+# a restarted worker resumes its stored sketch instead of starting a new row.
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+QUANTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+EMPTY_PERFORMANCE = {
+    "latency_ms": None,
+    "models": {},
+    "recent_executions": 0,
+    "recent_errors": 0,
+    "avg_ttft_ms": None,
+    "prompt_tokens": 0,
+    "completion_tokens": 0
+}
+
+class LatencySketches:
+    """This worker's per-(subject, model, day) duration sketches"""
+
+    def __init__(self):
+        self.sketches: Dict[Tuple[str, str, datetime], QuantileSketch] = {}
+        self.lock = threading.Lock()
+
+    def add(
+        self,
+        subject: str,
+        model: str,
+        day: datetime,
+        duration_ms: int,
+        load: Callable[[], Optional[Dict[str, Any]]] = lambda: None
+    ) -> Dict[str, Any]:
+        """Record a duration and return a snapshot of the updated sketch.
+
+        `load` returns the persisted sketch for a key this process hasn't seen
+        yet (e.g. after a restart), so counts keep growing instead of resetting.
+        """
+        key = (subject, model, day)
+        with self.lock:
+            known = key in self.sketches
+        stored = None if known else load()
+        with self.lock:
+            # Drop previous days; their final state is already persisted
+            for old in [old for old in self.sketches if old[2] < day]:
+                del self.sketches[old]
+            sketch = self.sketches.get(key)
+            if sketch is None:
+                sketch = self.sketches[key] = QuantileSketch.from_dict(stored) if stored else QuantileSketch()
+            sketch.add(duration_ms)
+            return sketch.to_dict()
+
+latency_sketches = LatencySketches()
+
+# (prompt, completion) tokens; None when the LLM doesn't report them
+TokenCounts = Tuple[Optional[int], Optional[int]]
+
+def crew_token_counts(crew: Any) -> TokenCounts:
+    """Tokens the crew's agents have counted so far"""
+    prompt = completion = None
+    for agent in getattr(crew, "agents", None) or []:
+        process = getattr(agent, "_token_process", None)
+        summary = process.get_summary() if process is not None else None
+        if summary is None:
+            continue
+        if not isinstance(summary, dict):
+            summary = getattr(summary, "__dict__", {})
+        prompt = (prompt or 0) + (summary.get("prompt_tokens") or 0)
+        completion = (completion or 0) + (summary.get("completion_tokens") or 0)
+    return prompt, completion
+
+def crew_token_usage(crew: Any, before: TokenCounts = (None, None)) -> TokenCounts:
+    """Tokens one kickoff used: the agents' counters now, minus what they held before it.
+
+    Agent counters keep accumulating across kickoffs, so reading them (or
+    crew.usage_metrics, their sum) alone over-counts anything reused.
+    """
+    after = crew_token_counts(crew) if crew is not None else (None, None)
+    return tuple(
+        None if now is None else now - (then or 0)
+        for now, then in zip(after, before)
+    )
+
+def record_execution(
+    db: Session,
+    user_id: int,
+    subject: str,
+    model: str,
+    duration_ms: int,
+    agent_id: Optional[int] = None,
+    team_id: Optional[int] = None,
+    ttft_ms: Optional[int] = None,
+    prompt_tokens: Optional[int] = None,
+    completion_tokens: Optional[int] = None,
+    error: Optional[BaseException] = None
+):
+    """Store an execution record and fold its duration into this worker's sketch; the caller commits"""
+    db.add(ExecutionRecord(
+        user_id=user_id,
+        agent_id=agent_id,
+        team_id=team_id,
+        model=model,
+        duration_ms=duration_ms,
+        ttft_ms=ttft_ms,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        success=error is None,
+        error_class=type(error).__name__ if error is not None else None
+    ))
+
+    day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    snapshot = latency_sketches.add(
+        subject, model, day, duration_ms,
+        load=lambda: db.query(LatencySketch.sketch).filter(
+            LatencySketch.worker_id == WORKER_ID,
+            LatencySketch.subject == subject,
+            LatencySketch.model == model,
+            LatencySketch.day == day
+        ).scalar()
+    )
+    _save_sketch(db, {
+        "worker_id": WORKER_ID,
+        "user_id": user_id,
+        "subject": subject,
+        "model": model,
+        "day": day,
+        "count": snapshot["count"],
+        "sketch": snapshot
+    })
+
+def _save_sketch(db: Session, row: Dict[str, Any]):
+    table = LatencySketch.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(table).values(**row)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["worker_id", "subject", "model", "day"],
+            set_={"count": stmt.excluded.count, "sketch": stmt.excluded.sketch},
+            # Concurrent threads may commit out of order; never replace a newer snapshot
+            where=table.c.count < stmt.excluded.count
+        ))
+        return
+
+    key = (
+        table.c.worker_id == row["worker_id"],
+        table.c.subject == row["subject"],
+        table.c.model == row["model"],
+        table.c.day == row["day"]
+    )
+    exists = db.execute(select(table.c.id).where(*key)).first()
+    if exists is None:
+        db.execute(insert(table).values(**row))
+    else:
+        db.execute(update(table).where(*key, table.c.count < row["count"]).values(
+            count=row["count"], sketch=row["sketch"]
+        ))
+
+def _summarize(sketch: QuantileSketch) -> Dict[str, Any]:
+    summary = {name: _round(sketch.quantile(q)) for name, q in QUANTILES.items()}
+    summary.update(count=sketch.count, mean=_round(sketch.mean), max=_round(sketch.max))
+    return summary
+
+def _round(value: Optional[float]) -> Optional[int]:
+    return int(round(value)) if value is not None else None
+
+def _check_days(days: int):
+    if days < 1:
+        raise HTTPException(status_code=400, detail="days must be at least 1")
+
+def performance_summary(db: Session, user_id: int, days: int) -> Dict[str, Dict[str, Any]]:
+    """Latency percentiles (merged across workers and days) plus error and token stats, per subject"""
+    _check_days(days)
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+
+    merged: Dict[str, QuantileSketch] = {}
+    by_model: Dict[str, Dict[str, QuantileSketch]] = defaultdict(dict)
+    rows = db.query(LatencySketch.subject, LatencySketch.model, LatencySketch.sketch).filter(
+        LatencySketch.user_id == user_id,
+        LatencySketch.day >= start
+    ).all()
+    for subject, model, data in rows:
+        sketch = QuantileSketch.from_dict(data)
+        merged.setdefault(subject, QuantileSketch(sketch.relative_accuracy)).merge(sketch)
+        by_model[subject].setdefault(model, QuantileSketch(sketch.relative_accuracy)).merge(sketch)
+
+    stats = db.query(
+        ExecutionRecord.agent_id,
+        ExecutionRecord.team_id,
+        func.count(ExecutionRecord.id),
+        func.sum(case((ExecutionRecord.success == False, 1), else_=0)),
+        func.sum(ExecutionRecord.ttft_ms),
+        func.count(ExecutionRecord.ttft_ms),
+        func.sum(ExecutionRecord.prompt_tokens),
+        func.sum(ExecutionRecord.completion_tokens)
+    ).filter(
+        ExecutionRecord.user_id == user_id,
+        ExecutionRecord.created_at >= start
+    ).group_by(ExecutionRecord.agent_id, ExecutionRecord.team_id).all()
+
+    summary: Dict[str, Dict[str, Any]] = defaultdict(lambda: dict(EMPTY_PERFORMANCE))
+    for subject, sketch in merged.items():
+        summary[subject]["latency_ms"] = _summarize(sketch)
+        summary[subject]["models"] = {model: _summarize(s) for model, s in by_model[subject].items()}
+
+    ttft: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+    for agent_id, team_id, total, errors, ttft_sum, ttft_count, prompt_tokens, completion_tokens in stats:
+        # Parallel team subtasks are recorded against their agent
+        subject = f"agent:{agent_id}" if agent_id is not None else f"team:{team_id}"
+        entry = summary[subject]
+        entry["recent_executions"] += total
+        entry["recent_errors"] += errors or 0
+        entry["prompt_tokens"] += prompt_tokens or 0
+        entry["completion_tokens"] += completion_tokens or 0
+        ttft[subject][0] += ttft_sum or 0
+        ttft[subject][1] += ttft_count
+    for subject, (ttft_sum, ttft_count) in ttft.items():
+        if ttft_count:
+            summary[subject]["avg_ttft_ms"] = _round(ttft_sum / ttft_count)
+    return dict(summary)
+
+def error_breakdown(db: Session, user_id: int, days: int) -> List[Dict[str, Any]]:
+    """Failed executions in the window grouped by error class"""
+    _check_days(days)
+    start = datetime.utcnow() - timedelta(days=days)
+    rows = db.query(ExecutionRecord.error_class, func.count(ExecutionRecord.id)).filter(
+        ExecutionRecord.user_id == user_id,
+        ExecutionRecord.success == False,
+        ExecutionRecord.created_at >= start
+    ).group_by(ExecutionRecord.error_class).all()
+    return [{"error_class": error_class, "count": count} for error_class, count in rows]
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import threading
+import time
+from app.core.config import settings
+
+def normalize_task(task_description: str) -> str:
+    """Collapse whitespace so trivially different task texts share a cache entry"""
+    return " ".join(task_description.split())
+
+def result_cache_key(agent_config_hash: str, model_config: Dict[str, Any], task_description: str) -> str:
+    payload = json.dumps(
+        {
+            "agent": agent_config_hash,
+            "model": model_config,
+            "task": normalize_task(task_description)
+        },
+        sort_keys=True
+    )
+    return "results:" + hashlib.sha256(payload.encode()).hexdigest()
+
+class MemoryResultCache:
+    """In-process result cache with TTL expiry and LRU eviction"""
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Dict[str, Any]):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"backend": "memory", "size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+class RedisResultCache:
+    """Result cache shared across workers; Redis handles TTL expiry and LRU eviction (maxmemory-policy)"""
+
+    def __init__(self, ttl_seconds: int):
+        from app.core.redis import get_redis
+
+        self.ttl_seconds = ttl_seconds
+        self.redis = get_redis()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.redis.get(key)
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: str, value: Dict[str, Any]):
+        self.redis.set(key, json.dumps(value), ex=self.ttl_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "hits": self.hits, "misses": self.misses}
+
+def create_result_cache():
+    """Create the result cache configured by RESULT_CACHE_BACKEND (None when disabled)"""
+    if settings.RESULT_CACHE_BACKEND == "redis":
+        return RedisResultCache(ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS)
+    if settings.RESULT_CACHE_BACKEND == "memory":
+        return MemoryResultCache(
+            ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS,
+            max_entries=settings.RESULT_CACHE_MAX_ENTRIES
+        )
+    return None
+
+result_cache = create_result_cache()
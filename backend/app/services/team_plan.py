@@ -0,0 +1,171 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import threading
+import time
+from crewai import Agent as CrewAgent, Task
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
+from app.core.config import settings
+from app.models.agent import Agent, Team, TeamAgent
+
+class PlanMember:
+    """Detached snapshot of a team member with its CrewAI agent spec"""
+
+    def __init__(self, agent: Agent, agent_spec: Dict[str, Any], is_manager: bool = False):
+        self.id = agent.id
+        self.user_id = agent.user_id
+        self.name = agent.name
+        self.role = agent.role
+        self.llm_config = agent.llm_config
+        self.is_manager = is_manager
+        self.agent_spec = agent_spec
+
+    def build_agent(self) -> CrewAgent:
+        """A fresh CrewAI agent for one run; built agents carry per-run state and aren't shared"""
+        return CrewAgent(**self.agent_spec)
+
+class TeamPlan:
+    """Everything needed to run a team, compiled once from a single joined query"""
+
+    def __init__(self, team: Team, members: List[PlanMember], reducer: Optional[PlanMember]):
+        self.team_id = team.id
+        self.user_id = team.user_id
+        self.name = team.name
+        self.process_type = team.process_type
+        self.max_concurrency = team.max_concurrency
+        self.merge_template = team.merge_template
+        self.members = members
+        self.manager = next((member for member in members if member.is_manager), None)
+        self.reducer = reducer
+
+    @property
+    def agent_ids(self) -> Set[int]:
+        ids = {member.id for member in self.members}
+        if self.reducer is not None:
+            ids.add(self.reducer.id)
+        return ids
+
+    def crew_inputs(self, task_description: str) -> Tuple[List[CrewAgent], List[Task]]:
+        """Fresh agents and one task per member, in team order"""
+        agents = [member.build_agent() for member in self.members]
+        tasks = [member_task(member, task_description, agent) for member, agent in zip(self.members, agents)]
+        return agents, tasks
+
+def member_task(member: PlanMember, task_description: str, agent: CrewAgent) -> Task:
+    return Task(
+        description=f"{task_description} (handled by {member.role})",
+        agent=agent,
+        expected_output="A comprehensive response to your assigned part of the task"
+    )
+
+def compile_team_plan(db: Session, team_id: int, agent_spec: Callable[[Agent], Dict[str, Any]]) -> Optional[TeamPlan]:
+    """Load a team, its members and reducer in one query and resolve their CrewAI agent specs"""
+    team = db.query(Team).options(
+        joinedload(Team.team_agents).joinedload(TeamAgent.agent),
+        joinedload(Team.reducer_agent)
+    ).filter(Team.id == team_id).first()
+    if team is None:
+        return None
+
+    members = [
+        PlanMember(team_agent.agent, agent_spec(team_agent.agent), team_agent.is_manager)
+        for team_agent in team.team_agents
+    ]
+    reducer = None
+    if team.reducer_agent is not None:
+        reducer = PlanMember(team.reducer_agent, agent_spec(team.reducer_agent))
+    return TeamPlan(team, members, reducer)
+
+def team_agent_ids(db: Session, team: Team) -> List[int]:
+    """Agents a team run calls (members and reducer), without building a plan"""
+    agent_ids = [agent_id for agent_id, in db.query(TeamAgent.agent_id).filter(TeamAgent.team_id == team.id)]
+    if team.reducer_agent_id is not None:
+        agent_ids.append(team.reducer_agent_id)
+    return agent_ids
+
+class TeamPlanCache:
+    """Per-process LRU cache of compiled team plans.
+
+    Plans are dropped as soon as this process sees the team, its membership or
+    one of its agents change; changes made by other workers are picked up
+    when the TTL runs out.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[int, tuple]" = OrderedDict()
+        # agent_id -> ids of cached teams using it
+        self.teams_by_agent: Dict[int, Set[int]] = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, team_id: int, builder: Callable[[], Optional[TeamPlan]]) -> Optional[TeamPlan]:
+        with self.lock:
+            entry = self.entries.get(team_id)
+            if entry is not None and entry[0] >= time.monotonic():
+                self.entries.move_to_end(team_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        plan = builder()
+        if plan is None or self.ttl_seconds <= 0:
+            return plan
+
+        with self.lock:
+            self._drop(team_id)
+            self.entries[team_id] = (time.monotonic() + self.ttl_seconds, plan)
+            for agent_id in plan.agent_ids:
+                self.teams_by_agent.setdefault(agent_id, set()).add(team_id)
+            while len(self.entries) > self.max_entries:
+                self._drop(next(iter(self.entries)))
+        return plan
+
+    def invalidate_team(self, team_id: int):
+        with self.lock:
+            self._drop(team_id)
+
+    def invalidate_agent(self, agent_id: int):
+        """Drop every plan that includes the agent (as a member or reducer)"""
+        with self.lock:
+            for team_id in list(self.teams_by_agent.get(agent_id, ())):
+                self._drop(team_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+    def _drop(self, team_id: int):
+        entry = self.entries.pop(team_id, None)
+        if entry is None:
+            return
+        for agent_id in entry[1].agent_ids:
+            team_ids = self.teams_by_agent.get(agent_id)
+            if team_ids is not None:
+                team_ids.discard(team_id)
+                if not team_ids:
+                    del self.teams_by_agent[agent_id]
+
+team_plans = TeamPlanCache(
+    ttl_seconds=settings.TEAM_PLAN_TTL_SECONDS,
+    max_entries=settings.TEAM_PLAN_CACHE_SIZE
+)
+
+@event.listens_for(Team, "after_update")
+@event.listens_for(Team, "after_delete")
+def _invalidate_changed_team(mapper, connection, target: Team):
+    team_plans.invalidate_team(target.id)
+
+@event.listens_for(TeamAgent, "after_insert")
+@event.listens_for(TeamAgent, "after_update")
+@event.listens_for(TeamAgent, "after_delete")
+def _invalidate_changed_membership(mapper, connection, target: TeamAgent):
+    team_plans.invalidate_team(target.team_id)
+
+@event.listens_for(Agent, "after_update")
+@event.listens_for(Agent, "after_delete")
+def _invalidate_changed_agent(mapper, connection, target: Agent):
+    """Config edits and soft deletes go through the ORM; counter flushes don't"""
+    team_plans.invalidate_agent(target.id)
@@ -0,0 +1,86 @@
+from importlib import import_module, metadata
+from typing import Any, Callable, Dict, List, Union
+import threading
+import time
+
+# Third-party packages can add tools by declaring an entry point in this group,
+# e.g. [project.entry-points."ai_agents.tools"] my_tool = "my_pkg.tools:build_my_tool"
+ENTRY_POINT_GROUP = "ai_agents.tools"
+
+ToolFactory = Union[str, Callable[[], Any], metadata.EntryPoint]
+
+class ToolRegistry:
+    """Registry of agent tools by name, built lazily on first use"""
+
+    def __init__(self):
+        self.factories: Dict[str, Dict[str, Any]] = {}
+        self.instances: Dict[str, Any] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self.lock = threading.RLock()
+
+    def register(self, name: str, factory: ToolFactory, shared: bool = True):
+        """Register a tool factory.
+
+        `factory` is a callable, a "module:attr" import path or an entry point;
+        import paths and entry points are only imported when the tool is first used.
+        Shared tools are built once and reused by every agent.
+        """
+        with self.lock:
+            self.factories[name] = {"factory": factory, "shared": shared}
+            self.instances.pop(name, None)
+
+    def load_entry_points(self):
+        """Register tools advertised by installed packages"""
+        for entry_point in metadata.entry_points(group=ENTRY_POINT_GROUP):
+            self.register(entry_point.name, entry_point)
+
+    def get_tools(self, tool_names: List[str]) -> List[Any]:
+        """Get tool instances for the given names, skipping unknown ones"""
+        return [self.get(name) for name in tool_names if name in self.factories]
+
+    def get(self, name: str) -> Any:
+        with self.lock:
+            spec = self.factories[name]
+            if spec["shared"] and name in self.instances:
+                return self.instances[name]
+
+            import_start = time.perf_counter()
+            factory = self._resolve(spec["factory"])
+            build_start = time.perf_counter()
+            tool = factory()
+            build_end = time.perf_counter()
+
+            timing = self.timings.setdefault(name, {"builds": 0})
+            timing["builds"] += 1
+            timing["import_ms"] = round((build_start - import_start) * 1000, 2)
+            timing["build_ms"] = round((build_end - build_start) * 1000, 2)
+
+            if spec["shared"]:
+                self.instances[name] = tool
+            return tool
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Registered tools with their last import/build timings"""
+        with self.lock:
+            return [
+                {
+                    "name": name,
+                    "shared": spec["shared"],
+                    "built": name in self.instances,
+                    **self.timings.get(name, {"builds": 0})
+                } for name, spec in self.factories.items()
+            ]
+
+    def _resolve(self, factory: ToolFactory) -> Callable[[], Any]:
+        if isinstance(factory, str):
+            module_name, attr = factory.split(":")
+            return getattr(import_module(module_name), attr)
+        if isinstance(factory, metadata.EntryPoint):
+            return factory.load()
+        return factory
+
+tool_registry = ToolRegistry()
+tool_registry.register("web_search", "crewai_tools:SerperDevTool")
+tool_registry.register("web_scrape", "crewai_tools:ScrapeWebsiteTool")
+tool_registry.register("file_read", "crewai_tools:FileReadTool")
+tool_registry.load_entry_points()
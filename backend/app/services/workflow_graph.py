@@ -0,0 +1,142 @@
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+import re
+import threading
+from fastapi import HTTPException
+from app.core.config import settings
+
+NODE_TYPES = ("agent", "task", "condition")
+CONDITION_OPERATORS = ("contains", "not_contains", "equals", "regex")
+# Size bound only: Python's re has no timeout, so a short pattern like (a+)+$
+# can still backtrack for a long time; conditions are authored by the workflow owner
+MAX_CONDITION_PATTERN_LENGTH = 500
+
+# (source node, target node, source handle)
+Edge = Tuple[str, str, Optional[str]]
+
+class WorkflowGraph:
+    """Validated, topologically ordered form of a React Flow definition"""
+
+    def __init__(self, nodes: Dict[str, Dict[str, Any]], edges: List[Edge]):
+        self.nodes = nodes
+        self.incoming: Dict[str, List[Edge]] = {node_id: [] for node_id in nodes}
+        self.outgoing: Dict[str, List[Edge]] = {node_id: [] for node_id in nodes}
+        for edge in edges:
+            self.outgoing[edge[0]].append(edge)
+            self.incoming[edge[1]].append(edge)
+        self.order = self._topological_order()
+
+    def node_type(self, node_id: str) -> str:
+        return self.nodes[node_id]["type"]
+
+    def data(self, node_id: str) -> Dict[str, Any]:
+        return self.nodes[node_id]["data"]
+
+    def pattern(self, node_id: str) -> Optional[Pattern]:
+        """Compiled pattern of a regex condition node"""
+        return self.nodes[node_id].get("pattern")
+
+    def agent_ids(self) -> List[int]:
+        return sorted({
+            self.data(node_id)["agent_id"]
+            for node_id in self.nodes if self.node_type(node_id) == "agent"
+        })
+
+    def _topological_order(self) -> List[str]:
+        # Kahn's algorithm, keeping definition order among ready nodes
+        remaining = {node_id: len(edges) for node_id, edges in self.incoming.items()}
+        ready = deque(node_id for node_id in self.nodes if remaining[node_id] == 0)
+        order = []
+        while ready:
+            node_id = ready.popleft()
+            order.append(node_id)
+            for _, target, _ in self.outgoing[node_id]:
+                remaining[target] -= 1
+                if remaining[target] == 0:
+                    ready.append(target)
+
+        if len(order) < len(self.nodes):
+            cycle = [node_id for node_id in self.nodes if remaining[node_id] > 0]
+            raise HTTPException(status_code=400, detail=f"Workflow has a cycle; nodes on or after it: {', '.join(cycle)}")
+        return order
+
+def compile_condition_pattern(node_id: str, value: str) -> Pattern:
+    """Compile a regex condition once, when the workflow is compiled, rejecting bad patterns with a 400"""
+    if len(value) > MAX_CONDITION_PATTERN_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Condition node {node_id} has a pattern longer than {MAX_CONDITION_PATTERN_LENGTH} characters"
+        )
+    try:
+        return re.compile(value)
+    except re.error as exc:
+        raise HTTPException(status_code=400, detail=f"Condition node {node_id} has an invalid pattern: {exc}")
+
+def compile_workflow(definition: Dict[str, Any]) -> WorkflowGraph:
+    """Validate a React Flow definition ({"nodes": [...], "edges": [...]}) and compile it"""
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for node in definition.get("nodes") or []:
+        node_id = str(node.get("id", ""))
+        node_type = node.get("type")
+        data = node.get("data") or {}
+        if not node_id or node_id in nodes:
+            raise HTTPException(status_code=400, detail=f"Invalid or duplicate node id: {node_id!r}")
+        if node_type not in NODE_TYPES:
+            raise HTTPException(status_code=400, detail=f"Node {node_id} has unsupported type: {node_type!r}")
+        if node_type == "agent" and not isinstance(data.get("agent_id"), int):
+            raise HTTPException(status_code=400, detail=f"Agent node {node_id} needs an integer agent_id")
+        if node_type == "condition" and data.get("operator", "contains") not in CONDITION_OPERATORS:
+            raise HTTPException(status_code=400, detail=f"Condition node {node_id} has unsupported operator: {data.get('operator')!r}")
+        nodes[node_id] = {"type": node_type, "data": data}
+        if node_type == "condition" and data.get("operator") == "regex":
+            nodes[node_id]["pattern"] = compile_condition_pattern(node_id, str(data.get("value", "")))
+
+    if not nodes:
+        raise HTTPException(status_code=400, detail="Workflow has no nodes")
+
+    edges: List[Edge] = []
+    for edge in definition.get("edges") or []:
+        source, target = str(edge.get("source", "")), str(edge.get("target", ""))
+        if source not in nodes or target not in nodes:
+            raise HTTPException(status_code=400, detail=f"Edge {edge.get('id')} references an unknown node")
+        edges.append((source, target, edge.get("sourceHandle")))
+
+    return WorkflowGraph(nodes, edges)
+
+class WorkflowGraphCache:
+    """Process-wide LRU cache of compiled graphs keyed by (workflow id, version).
+
+    Saving a changed graph bumps the workflow's version, so stale entries are
+    never hit and simply age out; no cross-worker invalidation is needed.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: "OrderedDict[Tuple[int, int], WorkflowGraph]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compile(self, workflow_id: int, version: int, definition: Dict[str, Any]) -> WorkflowGraph:
+        key = (workflow_id, version)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        graph = compile_workflow(definition)
+
+        with self.lock:
+            self.entries[key] = graph
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        return graph
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"size": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+workflow_graphs = WorkflowGraphCache(max_size=settings.WORKFLOW_GRAPH_CACHE_SIZE)
@@ -0,0 +1,316 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, List, Optional, Pattern, Tuple
+import time
+from crewai import Agent as CrewAgent, Crew, Task
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.agent import Agent
+from app.models.workflow import Workflow
+from app.services.agent_cache import agent_config_hash
+from app.services.agent_service import AgentService
+from app.services.node_outputs import (
+    agent_fingerprint, load_output, node_output_key, prune_outputs, save_output, touch_outputs
+)
+from app.services.performance_service import TokenCounts, crew_token_counts, crew_token_usage
+from app.services.workflow_graph import WorkflowGraph, workflow_graphs
+
+def render(template: str, node_input: str, run_input: str) -> str:
+    # Plain substitution: templates are user input, so avoid str.format
+    return template.replace("{input}", node_input).replace("{task}", run_input)
+
+def evaluate_condition(data: Dict[str, Any], node_input: str, pattern: Optional[Pattern] = None) -> bool:
+    """Whether node_input passes a condition node; regex conditions use the pattern compile_workflow built"""
+    operator = data.get("operator", "contains")
+    value = str(data.get("value", ""))
+    if operator == "contains":
+        return value.lower() in node_input.lower()
+    if operator == "not_contains":
+        return value.lower() not in node_input.lower()
+    if operator == "equals":
+        return node_input.strip().lower() == value.strip().lower()
+    if operator == "regex":
+        return pattern.search(node_input) is not None
+    raise ValueError(f"Unknown condition operator: {operator!r}")
+
+class WorkflowRun:
+    """One execution of a compiled workflow.
+
+    Ready nodes run on a bounded thread pool as soon as all their inputs are
+    settled, so independent branches overlap. Scheduling, bookkeeping and all
+    database writes stay on the calling thread. Every agent node builds its
+    own CrewAI agent, so nodes sharing an agent can run at the same time.
+    Agent nodes whose agent, prompt and inputs are unchanged since an earlier
+    run reuse that run's stored output instead of calling the LLM.
+    """
+
+    def __init__(
+        self,
+        service: "WorkflowService",
+        workflow_id: int,
+        graph: WorkflowGraph,
+        agents: Dict[int, Tuple[Agent, Any, str]],
+        run_input: str,
+        max_concurrency: int,
+        reuse: bool = True
+    ):
+        self.service = service
+        self.workflow_id = workflow_id
+        self.graph = graph
+        self.agents = agents
+        self.run_input = run_input
+        self.max_concurrency = max_concurrency
+        self.reuse = reuse
+        self.remaining = {node_id: len(edges) for node_id, edges in graph.incoming.items()}
+        self.inputs: Dict[str, Dict[str, str]] = {node_id: {} for node_id in graph.nodes}
+        self.outputs: Dict[str, str] = {}
+        self.reports: Dict[str, Dict[str, Any]] = {}
+        self.ready: Deque[str] = deque(node_id for node_id in graph.order if self.remaining[node_id] == 0)
+        self.running: Dict[Any, str] = {}
+        self.records: List[Tuple[Agent, TokenCounts, int, Optional[BaseException]]] = []
+        # Agent node -> (output key, prompt)
+        self.prompts: Dict[str, Tuple[str, str]] = {}
+        self.saves: List[Tuple[str, str, str, int]] = []
+        self.reused: Dict[str, int] = {}  # Output key -> LLM time saved
+        self.error: Optional[Tuple[str, BaseException]] = None
+        self.start_time = 0.0
+
+    def execute(self) -> Dict[str, Any]:
+        self.start_time = time.time()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="workflow") as executor:
+            while True:
+                if self.error is None:
+                    self._launch(executor)
+                if not self.running:
+                    break
+                done, _ = wait(self.running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._finish(self.running.pop(future), future.result())
+                # Start the newly ready nodes before spending time on database writes
+                if self.error is None:
+                    self._launch(executor)
+                self._write_records()
+
+        if self.reused:
+            touch_outputs(self.service.db, self.workflow_id, self.reused)
+        prune_outputs(self.service.db, self.workflow_id)
+        self.service.db.commit()
+
+        for node_id in self.graph.order:
+            self.reports.setdefault(node_id, {"node_id": node_id, "type": self.graph.node_type(node_id), "status": "cancelled"})
+
+        critical_path = self._critical_path()
+        sinks = [node_id for node_id in self.graph.order if node_id in self.outputs and not self.graph.outgoing[node_id]]
+        result = {
+            "status": "failed" if self.error else "completed",
+            "result": "\n\n".join(self.outputs[node_id] for node_id in sinks),
+            "outputs": {node_id: self.outputs[node_id] for node_id in sinks},
+            "nodes": [self.reports[node_id] for node_id in self.graph.order],
+            "critical_path": critical_path,
+            "critical_path_ms": sum(self.reports[node_id]["duration_ms"] for node_id in critical_path),
+            "max_concurrency": self.max_concurrency,
+            "reused_nodes": sum(1 for report in self.reports.values() if report.get("reused")),
+            "llm_ms_saved": sum(self.reused.values()),
+            "execution_time": self._elapsed_ms()
+        }
+        if self.error:
+            node_id, error = self.error
+            result["error"] = f"Node {node_id} failed: {error}"
+        return result
+
+    def _launch(self, executor: ThreadPoolExecutor):
+        while self.ready and len(self.running) < self.max_concurrency:
+            node_id = self.ready.popleft()
+            if self.graph.incoming[node_id] and not self.inputs[node_id]:
+                # Every branch into this node was switched off by a condition
+                self._skip(node_id)
+                continue
+            if self.graph.node_type(node_id) == "agent" and node_id not in self.prompts and self._reuse_output(node_id):
+                continue
+            self.running[executor.submit(self._run_node, node_id, self._node_input(node_id))] = node_id
+
+    def _run_node(self, node_id: str, node_input: str) -> Dict[str, Any]:
+        """Runs on a worker thread; must not touch the database session"""
+        started = self._elapsed_ms()
+        data = self.graph.data(node_id)
+        outcome: Dict[str, Any] = {"tokens": (None, None), "error": None, "branch": None}
+        try:
+            node_type = self.graph.node_type(node_id)
+            if node_type == "agent":
+                _, agent_spec, _ = self.agents[data["agent_id"]]
+                crewai_agent = CrewAgent(**agent_spec)
+                task = Task(
+                    description=self.prompts[node_id][1],
+                    agent=crewai_agent,
+                    expected_output=self._expected_output(node_id)
+                )
+                crew = Crew(agents=[crewai_agent], tasks=[task])
+                tokens_before = crew_token_counts(crew)
+                try:
+                    outcome["output"] = str(crew.kickoff())
+                finally:
+                    outcome["tokens"] = crew_token_usage(crew, tokens_before)
+            elif node_type == "task":
+                description = data.get("description")
+                outcome["output"] = render(description, node_input, self.run_input) if description else node_input
+            else:
+                # Conditions pass their input through and pick the branch to follow
+                outcome["branch"] = "true" if evaluate_condition(data, node_input, self.graph.pattern(node_id)) else "false"
+                outcome["output"] = node_input
+        except Exception as exc:
+            outcome["error"] = exc
+        outcome["started_ms"] = started
+        outcome["finished_ms"] = self._elapsed_ms()
+        return outcome
+
+    def _finish(self, node_id: str, outcome: Dict[str, Any]):
+        duration = outcome["finished_ms"] - outcome["started_ms"]
+        error = outcome["error"]
+        self.reports[node_id] = {
+            "node_id": node_id,
+            "type": self.graph.node_type(node_id),
+            "status": "failed" if error else "completed",
+            "started_ms": outcome["started_ms"],
+            "finished_ms": outcome["finished_ms"],
+            "duration_ms": duration
+        }
+
+        if self.graph.node_type(node_id) == "agent":
+            db_agent, _, _ = self.agents[self.graph.data(node_id)["agent_id"]]
+            self.records.append((db_agent, outcome["tokens"], duration, error))
+            if error is None:
+                self.saves.append((self.prompts[node_id][0], node_id, outcome["output"], duration))
+
+        if error is not None:
+            self.reports[node_id]["error"] = str(error)
+            if self.error is None:
+                self.error = (node_id, error)
+            return
+
+        self.outputs[node_id] = outcome["output"]
+        if outcome["branch"] is not None:
+            self.reports[node_id]["branch"] = outcome["branch"]
+        for _, target, handle in self.graph.outgoing[node_id]:
+            active = outcome["branch"] is None or handle is None or handle == outcome["branch"]
+            self._release(node_id, target, active)
+
+    def _reuse_output(self, node_id: str) -> bool:
+        """Complete an agent node from a stored output when its key matches one"""
+        _, _, fingerprint = self.agents[self.graph.data(node_id)["agent_id"]]
+        prompt = render(self.graph.data(node_id).get("task") or "{input}", self._node_input(node_id), self.run_input)
+        key = node_output_key(fingerprint, prompt, self._expected_output(node_id))
+        self.prompts[node_id] = (key, prompt)
+        stored = load_output(self.service.db, self.workflow_id, key) if self.reuse else None
+        if stored is None:
+            return False
+
+        output, llm_ms = stored
+        now = self._elapsed_ms()
+        self.reports[node_id] = {
+            "node_id": node_id,
+            "type": "agent",
+            "status": "completed",
+            "started_ms": now,
+            "finished_ms": now,
+            "duration_ms": 0,
+            "reused": True,
+            "llm_ms_saved": llm_ms
+        }
+        self.reused[key] = llm_ms
+        self.outputs[node_id] = output
+        for _, target, _ in self.graph.outgoing[node_id]:
+            self._release(node_id, target, True)
+        return True
+
+    def _expected_output(self, node_id: str) -> str:
+        return self.graph.data(node_id).get("expected_output") or "A comprehensive response to the given task"
+
+    def _write_records(self):
+        saves, self.saves = self.saves, []
+        for key, node_id, output, llm_ms in saves:
+            save_output(self.service.db, self.workflow_id, key, node_id, output, llm_ms)
+        records, self.records = self.records, []
+        for db_agent, tokens, duration, error in records:
+            self.service.agent_service._record_agent_execution(db_agent, tokens, execution_time=duration, error=error)
+
+    def _skip(self, node_id: str):
+        self.reports[node_id] = {"node_id": node_id, "type": self.graph.node_type(node_id), "status": "skipped"}
+        for _, target, _ in self.graph.outgoing[node_id]:
+            self._release(node_id, target, False)
+
+    def _release(self, source: str, target: str, active: bool):
+        if active:
+            self.inputs[target][source] = self.outputs[source]
+        self.remaining[target] -= 1
+        if self.remaining[target] == 0:
+            self.ready.append(target)
+
+    def _node_input(self, node_id: str) -> str:
+        if not self.graph.incoming[node_id]:
+            return self.run_input
+        inputs = self.inputs[node_id]
+        return "\n\n".join(inputs[source] for source, _, _ in self.graph.incoming[node_id] if source in inputs)
+
+    def _critical_path(self) -> List[str]:
+        """Chain of nodes that determined when the run finished"""
+        finished = {node_id: report for node_id, report in self.reports.items() if "finished_ms" in report}
+        if not finished:
+            return []
+        node_id = max(finished, key=lambda key: finished[key]["finished_ms"])
+        path = [node_id]
+        while True:
+            # The input that arrived last is the one this node waited for
+            sources = [source for source in self.inputs[node_id] if source in finished]
+            if not sources:
+                break
+            node_id = max(sources, key=lambda key: finished[key]["finished_ms"])
+            path.append(node_id)
+        return list(reversed(path))
+
+    def _elapsed_ms(self) -> int:
+        return int((time.time() - self.start_time) * 1000)
+
+class WorkflowService:
+    def __init__(self, db: Session):
+        self.db = db
+        self.agent_service = AgentService(db)
+
+    def run(
+        self,
+        workflow: Workflow,
+        run_input: str,
+        max_concurrency: Optional[int] = None,
+        reuse: bool = True
+    ) -> Dict[str, Any]:
+        """Compile a workflow and execute it; node failures are reported, not raised"""
+        graph = workflow_graphs.get_or_compile(workflow.id, workflow.version, workflow.workflow_definition or {})
+        agents = self._load_agents(graph, workflow.user_id)
+        limit = max(1, min(max_concurrency or settings.WORKFLOW_MAX_CONCURRENCY, settings.WORKFLOW_MAX_CONCURRENCY))
+
+        result = WorkflowRun(self, workflow.id, graph, agents, run_input, limit, reuse).execute()
+        result["workflow_id"] = workflow.id
+        return result
+
+    def _load_agents(self, graph: WorkflowGraph, user_id: int) -> Dict[int, Tuple[Agent, Any, str]]:
+        """The user's agents referenced by agent nodes, with their CrewAI agent specs and fingerprints"""
+        agent_ids = graph.agent_ids()
+        db_agents = self.db.query(Agent).filter(
+            Agent.id.in_(agent_ids),
+            Agent.user_id == user_id,
+            Agent.is_active == True
+        ).all() if agent_ids else []
+
+        missing = set(agent_ids) - {db_agent.id for db_agent in db_agents}
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Workflow references unknown agents: {sorted(missing)}")
+        return {
+            db_agent.id: (
+                db_agent,
+                self.agent_service._agent_spec(db_agent),
+                agent_fingerprint(
+                    agent_config_hash(self.agent_service._agent_data(db_agent)),
+                    self.agent_service._model_config(db_agent)
+                )
+            ) for db_agent in db_agents
+        }
@@ -0,0 +1,119 @@
+from typing import Any, Dict, List
+from fastapi import HTTPException
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.orm import Session
+from app.models.workflow import Workflow, WorkflowEdge, WorkflowNode
+
+NODE_FIELDS = ("node_type", "position_x", "position_y", "data", "config")
+EDGE_FIELDS = ("source_node_id", "target_node_id", "source_handle", "target_handle", "edge_type")
+
+def coordinate(value: Any) -> int:
+    """A React Flow position coordinate as a stored integer; anything non-numeric is 0"""
+    try:
+        return int(round(float(value or 0)))
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+def node_rows(definition: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """React Flow nodes as workflow_nodes rows, keyed by node id"""
+    rows: Dict[str, Dict[str, Any]] = {}
+    for node in definition.get("nodes") or []:
+        node_id = str(node.get("id") or "")
+        if not node_id or node_id in rows:
+            raise HTTPException(status_code=400, detail=f"Invalid or duplicate node id: {node_id!r}")
+        position = node.get("position")
+        if not isinstance(position, dict):
+            position = {}
+        rows[node_id] = {
+            "node_id": node_id,
+            "node_type": str(node.get("type") or "default"),
+            "position_x": coordinate(position.get("x")),
+            "position_y": coordinate(position.get("y")),
+            "data": node.get("data") or {},
+            "config": node.get("config") or {}
+        }
+    return rows
+
+def edge_rows(definition: Dict[str, Any], node_ids) -> Dict[str, Dict[str, Any]]:
+    """React Flow edges as workflow_edges rows, keyed by edge id"""
+    rows: Dict[str, Dict[str, Any]] = {}
+    for edge in definition.get("edges") or []:
+        edge_id = str(edge.get("id") or "")
+        source, target = str(edge.get("source") or ""), str(edge.get("target") or "")
+        if not edge_id or edge_id in rows:
+            raise HTTPException(status_code=400, detail=f"Invalid or duplicate edge id: {edge_id!r}")
+        if source not in node_ids or target not in node_ids:
+            raise HTTPException(status_code=400, detail=f"Edge {edge_id} references an unknown node")
+        rows[edge_id] = {
+            "edge_id": edge_id,
+            "source_node_id": source,
+            "target_node_id": target,
+            "source_handle": edge.get("sourceHandle"),
+            "target_handle": edge.get("targetHandle"),
+            "edge_type": edge.get("type") or "default"
+        }
+    return rows
+
+def sync_workflow_graph(db: Session, workflow: Workflow, definition: Dict[str, Any]) -> Dict[str, int]:
+    """Bring workflow_nodes/edges in line with a React Flow definition.
+
+    Only the difference against the stored rows is written: one bulk INSERT,
+    UPDATE and DELETE per table at most, so saving a large graph after a
+    small edit touches a handful of rows. Bumps the workflow's version when
+    anything changed; the caller commits.
+    """
+    nodes = node_rows(definition)
+    edges = edge_rows(definition, nodes)
+
+    changes = {}
+    changes.update(_sync_table(db, WorkflowNode, workflow.id, "node_id", NODE_FIELDS, nodes, "nodes"))
+    changes.update(_sync_table(db, WorkflowEdge, workflow.id, "edge_id", EDGE_FIELDS, edges, "edges"))
+
+    workflow.workflow_definition = definition
+    if any(changes.values()):
+        workflow.version = (workflow.version or 1) + 1
+    return changes
+
+def _sync_table(
+    db: Session,
+    model,
+    workflow_id: int,
+    key: str,
+    fields,
+    incoming: Dict[str, Dict[str, Any]],
+    label: str
+) -> Dict[str, int]:
+    table = model.__table__
+    stored = db.execute(
+        select(table.c.id, table.c[key], *(table.c[field] for field in fields)).where(table.c.workflow_id == workflow_id)
+    ).all()
+
+    inserts: List[Dict[str, Any]] = []
+    updates: List[Dict[str, Any]] = []
+    existing = {}
+    for row in stored:
+        # Rows duplicated by an older writer are dropped along with removed ones
+        if getattr(row, key) in existing:
+            continue
+        existing[getattr(row, key)] = row
+    deletes = [row.id for row in stored if existing.get(getattr(row, key)) is not row or getattr(row, key) not in incoming]
+
+    for item_key, item in incoming.items():
+        row = existing.get(item_key)
+        if row is None:
+            inserts.append({"workflow_id": workflow_id, **item})
+        elif any(getattr(row, field) != item[field] for field in fields):
+            updates.append({"row_id": row.id, **{field: item[field] for field in fields}})
+
+    if inserts:
+        db.execute(insert(table), inserts)
+    if updates:
+        # executemany: SET columns come from each parameter set
+        db.execute(update(table).where(table.c.id == bindparam("row_id")), updates)
+    if deletes:
+        db.execute(delete(table).where(table.c.id.in_(deletes)))
+    return {
+        f"{label}_added": len(inserts),
+        f"{label}_updated": len(updates),
+        f"{label}_deleted": len(deletes)
+    }
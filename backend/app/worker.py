@@ -0,0 +1,38 @@
+from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
+from app.core.config import settings
+
+# Celery worker for background agent/team executions.
+# Run with: celery -A app.worker.celery_app worker --loglevel=info
+celery_app = Celery(
+    "ai_agents",
+    broker=settings.REDIS_URL,
+    backend=settings.REDIS_URL
+)
+
+celery_app.conf.update(
+    task_track_started=True,         # Report "running" instead of "queued" once picked up
+    task_acks_late=True,             # Re-deliver jobs if a worker dies mid-run
+    worker_prefetch_multiplier=1,    # Long jobs: don't hoard tasks on one worker
+    result_expires=settings.JOB_RESULT_TTL_SECONDS,
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"]
+)
+
+@celery_app.task(name="jobs.execute")
+def execute_job(kind: str, target_id: int, task_description: str):
+    """Run an agent or team execution inside a Celery worker"""
+    from app.services.job_service import run_job
+    return run_job(kind, target_id, task_description)
+
+@worker_process_init.connect
+def start_agent_metrics(**kwargs):
+    from app.services.agent_metrics import agent_metrics
+    agent_metrics.start()
+
+@worker_process_shutdown.connect
+def flush_agent_metrics(**kwargs):
+    """Write counters buffered by this worker process before it exits"""
+    from app.services.agent_metrics import agent_metrics
+    agent_metrics.shutdown()
@@ -0,0 +1,41 @@
+"""OpenAI-compatible streaming stand-in for the Cerebras API.
+
+Streams FAKE_LLM_TOKENS chunks FAKE_LLM_DELAY_MS apart for every chat
+completion, so benchmarks measure this service rather than the upstream:
+
+    FAKE_LLM_TOKENS=20 FAKE_LLM_DELAY_MS=10 uvicorn benchmarks.fake_llm:app --port 8765
+
+then start the backend (or a benchmark) with
+CEREBRAS_BASE_URL=http://127.0.0.1:8765.
+"""
+import asyncio
+import json
+import os
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+TOKENS = int(os.environ.get("FAKE_LLM_TOKENS", 20))
+DELAY_SECONDS = int(os.environ.get("FAKE_LLM_DELAY_MS", 10)) / 1000
+
+async def chat_completions(request: Request):
+    body = await request.json()
+
+    async def events():
+        for i in range(TOKENS):
+            await asyncio.sleep(DELAY_SECONDS)
+            chunk = {
+                "id": "bench",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": body["model"],
+                "system_fingerprint": "bench",
+                "choices": [{"index": 0, "delta": {"content": f"t{i} "}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+app = Starlette(routes=[Route("/v1/chat/completions", chat_completions, methods=["POST"])])
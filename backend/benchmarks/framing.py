@@ -0,0 +1,70 @@
+"""Frames, bytes and CPU per token of chat replies through coalesce and each wire codec.
+
+Runs --streams synthetic replies at once on one event loop. Each reply
+yields --tokens deltas, --delay-ms apart, like an LLM stream. The replies
+pass through coalesce at each --windows-ms and are encoded as chunk
+events plus a completion event with every codec, the way the chat socket
+sends them. Prints frames and bytes per reply and CPU microseconds per
+token for the whole pipeline. The synthetic stream's own cost is included
+and socket writes (where fewer frames save the most) are not, so compare
+rows rather than reading the figures as absolutes.
+
+    python -m benchmarks.framing --streams 50 --tokens 200 --delay-ms 5 --windows-ms 0 25 100
+"""
+import argparse
+import asyncio
+import time
+from typing import AsyncIterator, List, Tuple
+from app.core.config import settings
+from app.services.framing import DEFAULT_CODEC, SUBPROTOCOLS, coalesce
+
+CODECS = {"json": DEFAULT_CODEC, **SUBPROTOCOLS}
+
+async def deltas(tokens: int, delay: float) -> AsyncIterator[str]:
+    for i in range(tokens):
+        await asyncio.sleep(delay)
+        yield f"t{i} "
+
+async def reply(codec, tokens: int, delay: float, window: float, max_bytes: int) -> Tuple[int, int]:
+    """Frames and bytes one reply puts on the wire"""
+    frames = size = 0
+    pieces = []
+    started = time.perf_counter()
+    async for piece in coalesce(deltas(tokens, delay), window, max_bytes):
+        pieces.append(piece)
+        frames += 1
+        size += len(codec.encode({"type": "chunk", "content": piece}))
+    full_response = "".join(pieces)
+    size += len(codec.encode({
+        "type": "complete",
+        "full_response": full_response,
+        "chars": len(full_response),
+        "frames": frames,
+        "ms": int((time.perf_counter() - started) * 1000)
+    }))
+    return frames + 1, size
+
+async def main(streams: int, tokens: int, delay: float, windows_ms: List[int], max_bytes: int):
+    for window_ms in windows_ms:
+        for name, codec in CODECS.items():
+            cpu_started = time.process_time()
+            results = await asyncio.gather(*(
+                reply(codec, tokens, delay, window_ms / 1000, max_bytes) for _ in range(streams)
+            ))
+            cpu = time.process_time() - cpu_started
+            frames = sum(frames for frames, _ in results) / streams
+            size = sum(size for _, size in results) / streams
+            print(
+                f"window {window_ms:>4} ms  {name:<16} {frames:6.1f} frames/reply  {size:8.0f} bytes/reply"
+                f"  {cpu / (streams * tokens) * 1e6:6.1f} us CPU/token"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=50)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--delay-ms", type=float, default=5)
+    parser.add_argument("--windows-ms", type=int, nargs="+", default=[0, 25, 100])
+    parser.add_argument("--max-bytes", type=int, default=settings.WS_COALESCE_BYTES)
+    args = parser.parse_args()
+    asyncio.run(main(args.streams, args.tokens, args.delay_ms / 1000, args.windows_ms, args.max_bytes))
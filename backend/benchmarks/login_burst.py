@@ -0,0 +1,93 @@
+"""Login burst against a running server, with a probe on a regular endpoint.
+
+Fires --logins password logins, --concurrency at a time, while one client
+keeps listing agents. bcrypt runs on its own bounded pool, so the probe's
+latency should barely move during the burst, and logins beyond
+PASSWORD_HASH_MAX_PENDING should fail fast with 503 instead of queueing.
+
+    uvicorn app.main:app --port 8000
+    python -m benchmarks.login_burst http://127.0.0.1:8000 --logins 500 --concurrency 100
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import List
+import httpx
+from benchmarks.stats import percentile
+
+EMAIL = "bench-login@example.com"
+PASSWORD = "bench-password"
+
+def summary(latencies: List[float]) -> str:
+    if not latencies:
+        return "no samples"
+    return f"p50 {percentile(latencies, .5) * 1000:.0f} ms  p99 {percentile(latencies, .99) * 1000:.0f} ms"
+
+async def idle_probe(client: httpx.AsyncClient, headers: dict):
+    """Probe latency before the burst, for comparison"""
+    latencies = []
+    for _ in range(50):
+        started = time.perf_counter()
+        await client.get("/agents/", headers=headers)
+        latencies.append(time.perf_counter() - started)
+    print(f"idle probe {summary(latencies)}")
+
+async def main(url: str, logins: int, concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency + 10)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        await client.post("/auth/register", json={"email": EMAIL, "username": "bench-login", "password": PASSWORD})
+        response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        probe_latencies: List[float] = []
+        probe_failures: Counter = Counter()
+        probe_done = asyncio.Event()
+
+        async def probe():
+            while not probe_done.is_set():
+                started = time.perf_counter()
+                try:
+                    response = await client.get("/agents/", headers=headers)
+                    if response.status_code == 200:
+                        probe_latencies.append(time.perf_counter() - started)
+                    else:
+                        probe_failures[response.status_code] += 1
+                except httpx.HTTPError as exc:
+                    probe_failures[type(exc).__name__] += 1
+                await asyncio.sleep(0.01)
+
+        await idle_probe(client, headers)
+        probe_task = asyncio.ensure_future(probe())
+        statuses: Counter = Counter()
+        login_latencies: List[float] = []
+        slots = asyncio.Semaphore(concurrency)
+
+        async def login():
+            async with slots:
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+                except httpx.HTTPError as exc:
+                    statuses[type(exc).__name__] += 1
+                    return
+                statuses[response.status_code] += 1
+                if response.status_code == 200:
+                    login_latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        probe_done.set()
+        await probe_task
+
+        print(f"logins     {statuses.get(200, 0) / elapsed:.0f}/s  {summary(login_latencies)}  statuses {dict(statuses)}")
+        print(f"probe      {summary(probe_latencies)}  ({len(probe_latencies)} ok during the burst, failures {dict(probe_failures)})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("url")
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.logins, args.concurrency))
@@ -0,0 +1,16 @@
+import asyncio
+import time
+from typing import List
+
+def percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+async def loop_stall(stop: asyncio.Event, interval: float = 0.005) -> float:
+    """Longest time the loop took past a short sleep until stop is set"""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
@@ -0,0 +1,53 @@
+"""Concurrent chat streams through CerebrasService.stream_response on one event loop.
+
+Reports time to first token, overall token throughput and the worst
+event-loop stall at each concurrency level. A stream that blocks the loop
+shows up as a stall about as long as a whole reply, and time to first
+token then grows with the number of streams.
+
+    CEREBRAS_API_KEY=x CEREBRAS_BASE_URL=http://127.0.0.1:8765 \\
+        python -m benchmarks.stream_chat --concurrency 1 10 50 200
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Tuple
+from app.services.cerebras_service import get_cerebras_service
+from benchmarks.stats import loop_stall, percentile
+
+async def one_stream(service, prompt: str) -> Tuple[float, int]:
+    started = time.perf_counter()
+    first_token = None
+    tokens = 0
+    async for _ in service.stream_response([{"role": "user", "content": prompt}]):
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        tokens += 1
+    return first_token or 0.0, tokens
+
+async def main(concurrency: List[int], prompt: str):
+    service = get_cerebras_service()
+    try:
+        for n in concurrency:
+            stop = asyncio.Event()
+            stall = asyncio.ensure_future(loop_stall(stop))
+            started = time.perf_counter()
+            results = await asyncio.gather(*(one_stream(service, prompt) for _ in range(n)))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            first_tokens = [first for first, _ in results]
+            print(
+                f"{n:>5} streams  ttft p50 {percentile(first_tokens, .5) * 1000:.0f} ms"
+                f"  p99 {percentile(first_tokens, .99) * 1000:.0f} ms"
+                f"  {sum(tokens for _, tokens in results) / elapsed:.0f} tokens/s"
+                f"  worst loop stall {await stall * 1000:.1f} ms"
+            )
+    finally:
+        await service.aclose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--prompt", default="Say hello")
+    args = parser.parse_args()
+    asyncio.run(main(args.concurrency, args.prompt))
@@ -0,0 +1,81 @@
+"""Sync vs async endpoint throughput and tail latency against a running server.
+
+Creates one agent and one team, then at each concurrency level sends
+--requests GETs split across that many clients to two single-row lookups
+of the same shape: GET /agents/{id}, an async def route on the
+AsyncSession, and GET /teams/{id}, a def route on a sync Session in the
+threadpool. Prints req/s, p50 and p99 for each. Sync routes stop scaling
+once the threadpool's slots are all waiting on the database; the gap is
+widest against a networked Postgres, not a local SQLite file.
+
+    uvicorn app.main:app --port 8000
+    python -m benchmarks.sync_async http://127.0.0.1:8000 --concurrency 10 50 200 --requests 2000
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import List
+import httpx
+from benchmarks.stats import percentile
+
+EMAIL = "bench-sync-async@example.com"
+PASSWORD = "bench-password"
+
+async def login(client: httpx.AsyncClient) -> dict:
+    await client.post("/auth/register", json={"email": EMAIL, "username": "bench-sync-async", "password": PASSWORD})
+    response = await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def load(client: httpx.AsyncClient, path: str, headers: dict, requests: int, concurrency: int):
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+            except httpx.HTTPError as exc:
+                statuses[type(exc).__name__] += 1
+                continue
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    if not latencies:
+        return f"no successful requests, statuses {dict(statuses)}"
+    return (
+        f"{len(latencies) / elapsed:7.0f} req/s  p50 {percentile(latencies, .5) * 1000:7.1f} ms"
+        f"  p99 {percentile(latencies, .99) * 1000:7.1f} ms  statuses {dict(statuses)}"
+    )
+
+async def main(url: str, concurrency: List[int], requests: int):
+    limits = httpx.Limits(max_connections=max(concurrency) + 10)
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        headers = await login(client)
+        agent = await client.post(
+            "/agents/", headers=headers,
+            json={"name": "bench", "role": "bench", "goal": "bench", "backstory": "bench"}
+        )
+        team = await client.post("/teams/", headers=headers, json={"name": "bench"})
+        paths = {"async": f"/agents/{agent.json()['id']}", "sync": f"/teams/{team.json()['id']}"}
+
+        for path in paths.values():
+            await load(client, path, headers, 50, 5)  # Warm up caches and connections
+        for n in concurrency:
+            for label, path in paths.items():
+                print(f"{n:>5} clients  {label:>5} GET {path:<12} {await load(client, path, headers, requests, n)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("url")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.concurrency, args.requests))
@@ -0,0 +1,69 @@
+"""Connection reuse and pool pressure of the shared Cerebras HTTP clients.
+
+Runs sequential calls (which should all reuse one keep-alive connection),
+then concurrent bursts, and prints the HttpClientMetrics snapshot that
+GET /metrics exposes, per phase: peak connections, peak pool saturation
+and average time to first byte. Bursts larger than CEREBRAS_MAX_CONNECTIONS queue for a
+connection, which shows up as a higher TTFB rather than new sockets.
+
+    CEREBRAS_API_KEY=x CEREBRAS_BASE_URL=http://127.0.0.1:8765 \\
+        python -m benchmarks.upstream_pool --sequential 100 --burst 10 100 500
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Tuple
+from app.core.config import settings
+from app.services.cerebras_service import get_cerebras_service
+from benchmarks.stats import percentile
+
+async def call(service) -> float:
+    started = time.perf_counter()
+    async for _ in service.stream_response([{"role": "user", "content": "ping"}]):
+        pass
+    return time.perf_counter() - started
+
+async def pool_peak(service, stop: asyncio.Event) -> Tuple[int, float]:
+    """Most connections and highest pool saturation seen while a phase runs"""
+    connections, saturation = 0, 0.0
+    while not stop.is_set():
+        snapshot = service.http_metrics.snapshot()
+        connections = max(connections, snapshot["connections"])
+        saturation = max(saturation, snapshot["pool_saturation"])
+        await asyncio.sleep(0.005)
+    return connections, saturation
+
+async def phase(label: str, service, calls: Callable[[], Awaitable[List[float]]]):
+    metrics = service.http_metrics
+    responses, ttfb_total = metrics.responses, metrics.ttfb_ms_total
+    stop = asyncio.Event()
+    sampler = asyncio.ensure_future(pool_peak(service, stop))
+    latencies = await calls()
+    stop.set()
+    connections, saturation = await sampler
+    ttfb = (metrics.ttfb_ms_total - ttfb_total) / max(1, metrics.responses - responses)
+    print(
+        f"{label:<16} p50 {percentile(latencies, .5) * 1000:.0f} ms  p99 {percentile(latencies, .99) * 1000:.0f} ms"
+        f"  avg ttfb {ttfb:.1f} ms  peak connections {connections}  peak saturation {saturation}"
+    )
+
+async def main(sequential: int, bursts: List[int]):
+    service = get_cerebras_service()
+    print(f"pool limit {settings.CEREBRAS_MAX_CONNECTIONS}, keep-alive {settings.CEREBRAS_MAX_KEEPALIVE_CONNECTIONS}")
+
+    async def one_by_one() -> List[float]:
+        return [await call(service) for _ in range(sequential)]
+
+    try:
+        await phase(f"sequential {sequential}", service, one_by_one)
+        for n in bursts:
+            await phase(f"burst {n}", service, lambda: asyncio.gather(*(call(service) for _ in range(n))))
+    finally:
+        await service.aclose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sequential", type=int, default=100)
+    parser.add_argument("--burst", type=int, nargs="+", default=[10, 100, 500])
+    args = parser.parse_args()
+    asyncio.run(main(args.sequential, args.burst))
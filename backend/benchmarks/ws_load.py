@@ -0,0 +1,98 @@
+"""Many idle chat sockets plus a wave of active chats against a running server.
+
+Opens --idle chat WebSockets that just sit there, then --active sockets
+that each send one message and wait for the full reply. Prints how long
+the idle sockets took to open, first-chunk and full-reply latency of the
+active chats, and the server's websocket counters from GET /metrics.
+Point the server at benchmarks/fake_llm.py, turn off admission control
+(every chat comes from one user), and raise the open-file limit on both
+sides (ulimit -n) above the socket count:
+
+    CEREBRAS_BASE_URL=http://127.0.0.1:8765 ADMISSION_BACKEND= uvicorn app.main:app --port 8000
+    python -m benchmarks.ws_load http://127.0.0.1:8000 --idle 10000 --active 1000 --server-pid <pid>
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import Optional, Tuple
+import httpx
+import websockets
+from benchmarks.stats import percentile
+
+EMAIL = "bench-ws@example.com"
+PASSWORD = "bench-password"
+
+def server_rss(pid: int) -> str:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS"):
+                return line.split(":", 1)[1].strip()
+    return "unknown"
+
+async def main(url: str, idle_count: int, active_count: int, open_concurrency: int, server_pid: Optional[int]):
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        await client.post("/auth/register", json={"email": EMAIL, "username": "bench-ws", "password": PASSWORD})
+        token = (await client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        agent = await client.post("/agents/", headers=headers, json={
+            "name": "bench", "role": "assistant", "goal": "answer", "backstory": "benchmark agent"
+        })
+        chat_url = f"{url.replace('http', 'ws', 1)}/chat/ws/{agent.json()['id']}?token={token}"
+        opening = asyncio.Semaphore(open_concurrency)
+
+        async def connect():
+            async with opening:
+                return await websockets.connect(chat_url, max_queue=None, open_timeout=120, ping_interval=None)
+
+        errors: Counter = Counter()
+
+        async def chat() -> Tuple[float, float]:
+            socket = await connect()
+            started = time.perf_counter()
+            first_chunk = None
+            await socket.send(json.dumps({"content": "hi"}))
+            while True:
+                message = json.loads(await socket.recv())
+                if message["type"] == "chunk" and first_chunk is None:
+                    first_chunk = time.perf_counter() - started
+                if message["type"] == "error":
+                    errors[message.get("detail")] += 1
+                if message["type"] in ("complete", "error"):
+                    break
+            total = time.perf_counter() - started
+            await socket.close()
+            return first_chunk or total, total
+
+        started = time.perf_counter()
+        idle = await asyncio.gather(*(connect() for _ in range(idle_count)))
+        print(f"opened {idle_count} idle sockets in {time.perf_counter() - started:.1f}s")
+        print("server", (await client.get("/metrics")).json().get("websockets"))
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(chat() for _ in range(active_count)))
+        elapsed = time.perf_counter() - started
+        first_chunks = [first for first, _ in results]
+        totals = [total for _, total in results]
+        print(
+            f"{active_count} active replies in {elapsed:.1f}s;"
+            f" first chunk p50 {percentile(first_chunks, .5) * 1000:.0f} ms p99 {percentile(first_chunks, .99) * 1000:.0f} ms;"
+            f" full reply p50 {percentile(totals, .5) * 1000:.0f} ms p99 {percentile(totals, .99) * 1000:.0f} ms"
+        )
+        if errors:
+            print("errors", dict(errors))
+        print("server", (await client.get("/metrics")).json().get("websockets"))
+        if server_pid:
+            print("server RSS", server_rss(server_pid))
+        await asyncio.gather(*(socket.close() for socket in idle))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("url")
+    parser.add_argument("--idle", type=int, default=10000)
+    parser.add_argument("--active", type=int, default=1000)
+    parser.add_argument("--open-concurrency", type=int, default=200, help="sockets opening at once")
+    parser.add_argument("--server-pid", type=int, help="print the server's resident memory (Linux)")
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.idle, args.active, args.open_concurrency, args.server_pid))
@@ -36,7 +36,9 @@ CREATE TABLE IF NOT EXISTS agents (
     memory_enabled BOOLEAN DEFAULT TRUE,
     allow_delegation BOOLEAN DEFAULT FALSE,
     verbose BOOLEAN DEFAULT TRUE,
+    cache_results BOOLEAN DEFAULT TRUE,
     total_executions INTEGER DEFAULT 0,
+    successful_executions INTEGER DEFAULT 0,
     success_rate INTEGER DEFAULT 0,
     avg_response_time INTEGER DEFAULT 0,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
@@ -51,6 +53,9 @@ CREATE TABLE IF NOT EXISTS teams (
     name VARCHAR(255) NOT NULL,
     description TEXT,
     process_type VARCHAR(50) DEFAULT 'sequential',
+    max_concurrency INTEGER DEFAULT 4,
+    reducer_agent_id INTEGER REFERENCES agents(id) ON DELETE SET NULL,
+    merge_template TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     is_active BOOLEAN DEFAULT TRUE
@@ -94,11 +99,88 @@ CREATE TABLE IF NOT EXISTS workflows (
     name VARCHAR(255) NOT NULL,
     description TEXT,
     workflow_definition JSONB DEFAULT '{}',
+    version INTEGER NOT NULL DEFAULT 1,
     is_active BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create workflow_nodes and workflow_edges tables (normalized React Flow graph)
+CREATE TABLE IF NOT EXISTS workflow_nodes (
+    id SERIAL PRIMARY KEY,
+    workflow_id INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    node_id VARCHAR(100) NOT NULL,
+    node_type VARCHAR(50) NOT NULL,
+    position_x INTEGER DEFAULT 0,
+    position_y INTEGER DEFAULT 0,
+    data JSONB DEFAULT '{}',
+    config JSONB DEFAULT '{}'
+);
+
+CREATE TABLE IF NOT EXISTS workflow_edges (
+    id SERIAL PRIMARY KEY,
+    workflow_id INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    edge_id VARCHAR(100) NOT NULL,
+    source_node_id VARCHAR(100) NOT NULL,
+    target_node_id VARCHAR(100) NOT NULL,
+    source_handle VARCHAR(100),
+    target_handle VARCHAR(100),
+    edge_type VARCHAR(50) DEFAULT 'default'
+);
+
+-- Create usage_counts table (hourly per-user counters for analytics trends)
+CREATE TABLE IF NOT EXISTS usage_counts (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    metric VARCHAR(50) NOT NULL,
+    bucket_start TIMESTAMP NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT uq_usage_counts_user_metric_bucket UNIQUE (user_id, metric, bucket_start)
+);
+
+-- Create execution_records table (one row per execution, including failures)
+CREATE TABLE IF NOT EXISTS execution_records (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    agent_id INTEGER REFERENCES agents(id) ON DELETE SET NULL,
+    team_id INTEGER REFERENCES teams(id) ON DELETE SET NULL,
+    model VARCHAR(100) NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    ttft_ms INTEGER,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    success BOOLEAN NOT NULL,
+    error_class VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create latency_sketches table (per-worker quantile sketches, merged at read time)
+CREATE TABLE IF NOT EXISTS latency_sketches (
+    id SERIAL PRIMARY KEY,
+    worker_id VARCHAR(100) NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    subject VARCHAR(50) NOT NULL,
+    model VARCHAR(100) NOT NULL,
+    day TIMESTAMP NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    sketch JSONB NOT NULL,
+    CONSTRAINT uq_latency_sketches_worker_subject_model_day UNIQUE (worker_id, subject, model, day)
+);
+
+-- Create workflow_node_outputs table (memoized agent node outputs for incremental reruns)
+CREATE TABLE IF NOT EXISTS workflow_node_outputs (
+    id SERIAL PRIMARY KEY,
+    workflow_id INTEGER NOT NULL REFERENCES workflows(id) ON DELETE CASCADE,
+    node_key VARCHAR(64) NOT NULL,
+    node_id VARCHAR(100) NOT NULL,
+    output BYTEA NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    llm_ms INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP NOT NULL,
+    CONSTRAINT uq_workflow_node_outputs_workflow_key UNIQUE (workflow_id, node_key)
+);
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
@@ -109,6 +191,19 @@ CREATE INDEX IF NOT EXISTS idx_team_agents_team_id ON team_agents(team_id);
 CREATE INDEX IF NOT EXISTS idx_conversations_user_id ON conversations(user_id);
 CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation_id);
 CREATE INDEX IF NOT EXISTS idx_workflows_user_id ON workflows(user_id);
+CREATE INDEX IF NOT EXISTS idx_agents_user_active ON agents(user_id, is_active, id);
+CREATE INDEX IF NOT EXISTS idx_teams_user_active ON teams(user_id, is_active, id);
+CREATE INDEX IF NOT EXISTS idx_team_agents_team_order ON team_agents(team_id, order_index);
+CREATE INDEX IF NOT EXISTS idx_workflows_user_active ON workflows(user_id, is_active, id);
+CREATE INDEX IF NOT EXISTS idx_workflow_nodes_workflow_id ON workflow_nodes(workflow_id);
+CREATE INDEX IF NOT EXISTS idx_workflow_edges_workflow_id ON workflow_edges(workflow_id);
+CREATE INDEX IF NOT EXISTS idx_conversations_user_created ON conversations(user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created ON messages(conversation_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_execution_records_user_created ON execution_records(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_execution_records_agent_id ON execution_records(agent_id);
+CREATE INDEX IF NOT EXISTS idx_execution_records_team_id ON execution_records(team_id);
+CREATE INDEX IF NOT EXISTS idx_latency_sketches_user_day ON latency_sketches(user_id, day);
+CREATE INDEX IF NOT EXISTS idx_workflow_node_outputs_workflow_used ON workflow_node_outputs(workflow_id, last_used_at);
 
 -- Create updated_at trigger function
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -0,0 +1,22 @@
+import os
+import tempfile
+
+# Settings are read at import time, so point the app at a throwaway SQLite file first
+_db_dir = tempfile.mkdtemp(prefix="ai-agents-tests-")
+os.environ.setdefault("CEREBRAS_API_KEY", "test")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+
+import pytest
+from app.core.database import Base, SessionLocal, engine
+
+@pytest.fixture
+def db():
+    """A session on freshly created tables, dropped again after the test"""
+    from app.models import user, agent, conversation, workflow, usage, execution  # noqa: F401
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
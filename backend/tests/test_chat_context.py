@@ -0,0 +1,43 @@
+from app.services.chat_context import (
+    ConversationContext, ELISION_MARKER, SYSTEM_SHARE, count_tokens, message_tokens, truncate_middle
+)
+
+def prompt_tokens(context):
+    return sum(message_tokens(message) for message in context.messages())
+
+def test_token_count_covers_the_whole_prompt():
+    context = ConversationContext("You are a test agent.", budget=120)
+    for i in range(40):
+        context.add("user" if i % 2 == 0 else "assistant", f"message {i} " + "word " * (i % 7))
+        assert prompt_tokens(context) <= context.token_count <= context.budget
+    assert context.omitted and "earlier messages omitted" in context.messages()[1]["content"]
+
+def test_oversized_message_keeps_its_start_and_end():
+    context = ConversationContext("You are a test agent.", budget=60)
+    content = "QUESTION " + "filler " * 200 + " END"
+    context.add("user", content)
+
+    kept = context.messages()[-1]["content"]
+    assert kept.startswith("QUESTION")
+    assert kept.endswith("END")
+    assert ELISION_MARKER in kept
+    assert prompt_tokens(context) <= context.token_count <= context.budget
+
+def test_truncate_middle():
+    assert truncate_middle("short", 10) == "short"
+    assert truncate_middle("abcdefghij" * 10, 4) == "abcd"
+    shortened = truncate_middle("abcdefghij" * 10, 40)
+    assert len(shortened) == 40
+    assert shortened.startswith("abcdefghij") and shortened.endswith("ghij")
+    assert count_tokens(shortened) <= 10
+
+def test_long_persona_leaves_room_for_the_current_turn():
+    context = ConversationContext("You are a test agent. " + "Backstory. " * 500, budget=100)
+    assert context.system_tokens <= context.budget * SYSTEM_SHARE
+    for i in range(10):
+        context.add("user", f"question {i} " + "word " * 30)
+
+    messages = context.messages()
+    assert messages[0]["content"].startswith("You are a test agent.")
+    assert messages[-1]["content"].startswith("question 9")
+    assert prompt_tokens(context) <= context.token_count <= context.budget
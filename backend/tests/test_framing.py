@@ -0,0 +1,52 @@
+import asyncio
+from app.services.framing import coalesce
+
+class FakeStream:
+    """Async delta stream that records whether it was closed"""
+
+    def __init__(self, deltas, error=None):
+        self.deltas = list(deltas)
+        self.error = error
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.deltas:
+            await asyncio.sleep(0)
+            return self.deltas.pop(0)
+        if self.error is not None:
+            raise self.error
+        raise StopAsyncIteration
+
+    async def aclose(self):
+        self.closed = True
+
+async def collect(stream, window_seconds, max_bytes=1024):
+    pieces = []
+    try:
+        async for piece in coalesce(stream, window_seconds, max_bytes):
+            pieces.append(piece)
+    except RuntimeError as exc:
+        pieces.append(exc)
+    return pieces
+
+def test_buffered_text_is_flushed_before_an_upstream_error():
+    error = RuntimeError("upstream failed")
+    stream = FakeStream(["a", "b", "c"], error)
+    pieces = asyncio.run(collect(stream, window_seconds=10))
+    assert pieces == ["a", "bc", error]
+    assert stream.closed
+
+def test_unwindowed_stream_is_closed_when_the_consumer_stops():
+    stream = FakeStream(["a", "b", "c"])
+
+    async def first_piece():
+        pieces = coalesce(stream, 0, 1024)
+        piece = await pieces.__anext__()
+        await pieces.aclose()
+        return piece
+
+    assert asyncio.run(first_piece()) == "a"
+    assert stream.closed
@@ -0,0 +1,50 @@
+from datetime import datetime
+from app.models.agent import Agent  # noqa: F401  (resolves the Message.agent relationship)
+from app.models.conversation import Conversation, Message
+from app.models.usage import UsageCount
+from app.models.user import User
+from app.services.message_sink import MessageSink
+
+def conversation_id(db) -> int:
+    user = User(email="sink@example.com", username="sink", hashed_password="x")
+    db.add(user)
+    db.flush()
+    conversation = Conversation(user_id=user.id, title="t")
+    db.add(conversation)
+    db.commit()
+    return conversation.id
+
+def sink(**overrides) -> MessageSink:
+    options = {"batch_size": 100, "flush_seconds": 60, "max_retries": 2, "max_pending": 10}
+    options.update(overrides)
+    return MessageSink(**options)
+
+def test_a_bad_row_is_dropped_after_the_retries(db):
+    target = conversation_id(db)
+    writer = sink()
+    writer.buffer = [
+        (1, {"conversation_id": target, "agent_id": None, "role": "user", "content": content, "created_at": datetime.utcnow()})
+        for content in ("first", None, "second")  # NULL content violates NOT NULL
+    ]
+
+    assert writer.flush() == 0 and writer.flush() == 0  # Retried as a batch
+    assert len(writer.buffer) == 3
+    assert writer.flush() == 2  # Then row by row
+
+    assert writer.buffer == [] and writer.dropped == 1
+    assert [content for content, in db.query(Message.content).order_by(Message.id)] == ["first", "second"]
+    assert db.query(UsageCount.count).scalar() == 2
+
+def test_submit_hands_off_to_the_writer_and_caps_the_buffer(db):
+    target = conversation_id(db)
+    writer = sink(max_pending=3)
+    writer.flush_lock.acquire()  # Hold the writer so messages stay buffered
+    try:
+        for i in range(5):
+            writer.submit(1, target, "user", f"m{i}")
+        assert writer.thread is not None
+        assert writer.stats() == {"pending": 3, "persisted": 0, "dropped": 2}
+    finally:
+        writer.flush_lock.release()
+    writer.shutdown()
+    assert db.query(Message).count() == 3
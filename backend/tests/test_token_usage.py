@@ -0,0 +1,61 @@
+import pytest
+from fastapi import HTTPException
+from app.services.performance_service import crew_token_counts, crew_token_usage
+
+class FakeTokenProcess:
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def get_summary(self):
+        return {"prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens}
+
+class FakeAgent:
+    def __init__(self):
+        self._token_process = FakeTokenProcess()
+
+class FakeCrew:
+    def __init__(self, agents):
+        self.agents = agents
+
+    def kickoff(self, prompt_tokens, completion_tokens):
+        for agent in self.agents:
+            agent._token_process.prompt_tokens += prompt_tokens
+            agent._token_process.completion_tokens += completion_tokens
+
+def test_usage_is_the_delta_of_one_kickoff():
+    agent = FakeAgent()
+    first = FakeCrew([agent])
+    before = crew_token_counts(first)
+    first.kickoff(100, 10)
+    assert crew_token_usage(first, before) == (100, 10)
+
+    # A reused agent's counters keep growing; the next run only reports its own share
+    second = FakeCrew([agent])
+    before = crew_token_counts(second)
+    second.kickoff(30, 3)
+    assert crew_token_usage(second, before) == (30, 3)
+
+def test_agents_without_counters_report_none():
+    crew = FakeCrew([object()])
+    assert crew_token_usage(crew, crew_token_counts(crew)) == (None, None)
+
+def test_restarted_worker_resumes_its_stored_sketch(db):
+    from app.models.execution import LatencySketch
+    from app.services import performance_service
+
+    for duration in (100, 200):
+        performance_service.record_execution(db, user_id=1, subject="agent:1", model="m", duration_ms=duration)
+    db.commit()
+
+    # A restart keeps the worker id but loses the in-memory sketch
+    performance_service.latency_sketches.sketches.clear()
+    performance_service.record_execution(db, user_id=1, subject="agent:1", model="m", duration_ms=300)
+    db.commit()
+
+    rows = db.query(LatencySketch.worker_id, LatencySketch.count).all()
+    assert rows == [(performance_service.WORKER_ID, 3)]
+    assert performance_service.performance_summary(db, 1, 1)["agent:1"]["latency_ms"]["count"] == 3
+    with pytest.raises(HTTPException) as raised:
+        performance_service.performance_summary(db, 1, 0)
+    assert raised.value.status_code == 400
@@ -0,0 +1,104 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import func
+from app.models.agent import Agent
+from app.models.conversation import Conversation, Message
+from app.models.user import User
+from app.services.analytics_service import (
+    backfill_usage_counts, bucket_label, hour_bucket, increment_usage, usage_series, usage_window
+)
+
+BASE = datetime(2026, 3, 2, 0, 0)  # A Monday
+
+# Minutes after BASE; spans hour, day and week boundaries, including exact ones
+MESSAGE_OFFSETS = [0, 1, 59, 60, 61, 119, 300, 1439, 1440, 1441, 2000, 4320, 8000, 10079, 10080, 10081, 12000]
+AGENT_OFFSETS = [5, 65, 1500, 9000, 10085]
+
+def _seed(db):
+    user = User(email="u@example.com", username="u", hashed_password="x")
+    other = User(email="o@example.com", username="o", hashed_password="x")
+    db.add_all([user, other])
+    db.flush()
+    conversation = Conversation(user_id=user.id, title="c")
+    foreign = Conversation(user_id=other.id, title="f")
+    db.add_all([conversation, foreign])
+    db.flush()
+
+    for minutes in MESSAGE_OFFSETS:
+        at = BASE + timedelta(minutes=minutes, seconds=30)
+        db.add(Message(conversation_id=conversation.id, role="user", content="hi", created_at=at))
+        # Same counter update the message sink makes for each persisted message
+        increment_usage(db, user.id, "messages", at=at)
+        db.add(Message(conversation_id=foreign.id, role="user", content="hi", created_at=at))
+        increment_usage(db, other.id, "messages", at=at)
+    for minutes in AGENT_OFFSETS:
+        at = BASE + timedelta(minutes=minutes)
+        db.add(Agent(user_id=user.id, name="a", role="r", goal="g", backstory="b", created_at=at))
+        increment_usage(db, user.id, "agent_creations", at=at)
+    db.commit()
+    return user.id
+
+def _raw_series(db, user_id, start, end, bucket):
+    """The trends endpoint's original query: GROUP BY over raw rows in the window"""
+    if bucket == "hour":
+        key = func.strftime("%Y-%m-%d %H:00:00", Message.created_at)
+    else:
+        key = func.date(Message.created_at)
+    rows = db.query(key, func.count(Message.id)).join(Conversation).filter(
+        Conversation.user_id == user_id,
+        Message.created_at >= start,
+        Message.created_at < end
+    ).group_by(key).all()
+
+    agent_key = func.strftime("%Y-%m-%d %H:00:00", Agent.created_at) if bucket == "hour" else func.date(Agent.created_at)
+    agent_rows = db.query(agent_key, func.count(Agent.id)).filter(
+        Agent.user_id == user_id,
+        Agent.created_at >= start,
+        Agent.created_at < end
+    ).group_by(agent_key).all()
+
+    series = {}
+    for metric, grouped in (("messages", rows), ("agent_creations", agent_rows)):
+        counts = defaultdict(int)
+        for label, count in grouped:
+            # Weeks are rolled up from the raw daily groups
+            counts[bucket_label(datetime.fromisoformat(label), bucket)] += count
+        series[metric] = [{"date": label, "count": count} for label, count in sorted(counts.items())]
+    return series
+
+WINDOWS = [
+    (BASE, BASE + timedelta(days=14)),
+    (BASE + timedelta(minutes=30), BASE + timedelta(days=1, minutes=1)),
+    (BASE + timedelta(hours=1), BASE + timedelta(hours=2)),
+    (BASE + timedelta(days=6, hours=23, minutes=59), BASE + timedelta(days=7, minutes=2)),
+    (BASE + timedelta(days=30), BASE + timedelta(days=31)),
+]
+
+@pytest.mark.parametrize("bucket", ["hour", "day", "week"])
+@pytest.mark.parametrize("start,end", WINDOWS)
+def test_rollup_matches_raw_group_by(db, bucket, start, end):
+    user_id = _seed(db)
+    window_start, window_end = usage_window(start, end)
+
+    series = usage_series(db, user_id, start, end, bucket)
+
+    raw = _raw_series(db, user_id, window_start, window_end, bucket)
+    assert series["messages"] == raw["messages"]
+    assert series["agent_creations"] == raw["agent_creations"]
+
+def test_backfill_rebuilds_the_same_counters(db):
+    user_id = _seed(db)
+    start, end = BASE, BASE + timedelta(days=14)
+    before = usage_series(db, user_id, start, end, "hour")
+
+    backfill_usage_counts(db)
+
+    assert usage_series(db, user_id, start, end, "hour") == before
+
+def test_window_covers_whole_hours():
+    assert usage_window(BASE, BASE + timedelta(hours=2)) == (BASE, BASE + timedelta(hours=2))
+    assert usage_window(BASE + timedelta(minutes=30), BASE + timedelta(hours=1, minutes=1)) == (
+        BASE, BASE + timedelta(hours=2)
+    )
+    assert hour_bucket(BASE + timedelta(minutes=59, seconds=59)) == BASE
@@ -0,0 +1,20 @@
+import pytest
+from fastapi import HTTPException
+from app.services.workflow_graph import MAX_CONDITION_PATTERN_LENGTH, compile_workflow
+
+def condition_workflow(value):
+    return {"nodes": [{"id": "check", "type": "condition", "data": {"operator": "regex", "value": value}}]}
+
+def test_regex_condition_is_compiled_once():
+    graph = compile_workflow(condition_workflow(r"\border \d+"))
+    pattern = graph.pattern("check")
+    assert pattern.pattern == r"\border \d+"
+    assert pattern.search("see order 42")
+    assert not pattern.search("no orders")
+
+@pytest.mark.parametrize("value", ["(unclosed", "*", "a" * (MAX_CONDITION_PATTERN_LENGTH + 1)])
+def test_bad_regex_condition_is_rejected(value):
+    with pytest.raises(HTTPException) as raised:
+        compile_workflow(condition_workflow(value))
+    assert raised.value.status_code == 400
+    assert "check" in raised.value.detail
@@ -0,0 +1,14 @@
+import pytest
+from app.services.workflow_sync import node_rows
+
+@pytest.mark.parametrize("position, expected", [
+    ({"x": 12.6, "y": -3.4}, (13, -3)),
+    ({"x": "40", "y": "7.5"}, (40, 8)),
+    ({"x": "left", "y": None}, (0, 0)),
+    ({"x": [1], "y": {"a": 1}}, (0, 0)),
+    ({"x": float("nan"), "y": float("inf")}, (0, 0)),
+    ("top", (0, 0)),
+])
+def test_positions_are_coerced(position, expected):
+    rows = node_rows({"nodes": [{"id": "a", "type": "task", "position": position}]})
+    assert (rows["a"]["position_x"], rows["a"]["position_y"]) == expected
@@ -20,6 +20,8 @@ export const API_ENDPOINTS = {
     UPDATE: (id: number) => `${API_BASE_URL}/agents/${id}`,
     DELETE: (id: number) => `${API_BASE_URL}/agents/${id}`,
     EXECUTE: (id: number) => `${API_BASE_URL}/agents/${id}/execute`,
+    EXECUTE_STREAM: (id: number) => `${API_BASE_URL}/agents/${id}/execute/stream`,
+    EXECUTE_WS: (id: number, token: string) => `${WS_BASE_URL}/agents/${id}/execute/ws?token=${token}`,
   },
   
   // Teams
@@ -31,11 +33,25 @@ export const API_ENDPOINTS = {
     DELETE: (id: number) => `${API_BASE_URL}/teams/${id}`,
     ADD_AGENT: (id: number) => `${API_BASE_URL}/teams/${id}/agents`,
     EXECUTE: (id: number) => `${API_BASE_URL}/teams/${id}/execute`,
+    EXECUTE_STREAM: (id: number) => `${API_BASE_URL}/teams/${id}/execute/stream`,
+    EXECUTE_WS: (id: number, token: string) => `${WS_BASE_URL}/teams/${id}/execute/ws?token=${token}`,
+  },
+  
+  // Background jobs
+  JOBS: {
+    SUBMIT_AGENT: (agentId: number) => `${API_BASE_URL}/jobs/agents/${agentId}`,
+    SUBMIT_TEAM: (teamId: number) => `${API_BASE_URL}/jobs/teams/${teamId}`,
+    GET: (jobId: string) => `${API_BASE_URL}/jobs/${jobId}`,
+    CANCEL: (jobId: string) => `${API_BASE_URL}/jobs/${jobId}`,
+    STREAM: (jobId: string) => `${API_BASE_URL}/jobs/${jobId}/stream`,
   },
   
   // Chat
   CHAT: {
-    WEBSOCKET: (agentId: number) => `${WS_BASE_URL}/chat/ws/${agentId}`,
+    WEBSOCKET: (agentId: number, token: string, conversationId?: number) =>
+      `${WS_BASE_URL}/chat/ws/${agentId}?token=${token}${conversationId ? `&conversation_id=${conversationId}` : ''}`,
+    CONVERSATIONS: `${API_BASE_URL}/chat/conversations`,
+    MESSAGES: (conversationId: number) => `${API_BASE_URL}/chat/conversations/${conversationId}/messages`,
   },
   
   // Analytics
@@ -50,6 +66,8 @@ export const API_ENDPOINTS = {
     LIST: `${API_BASE_URL}/workflows`,
     CREATE: `${API_BASE_URL}/workflows`,
     GET: (id: number) => `${API_BASE_URL}/workflows/${id}`,
+    UPDATE: (id: number) => `${API_BASE_URL}/workflows/${id}`,
+    RUN: (id: number) => `${API_BASE_URL}/workflows/${id}/run`,
     DELETE: (id: number) => `${API_BASE_URL}/workflows/${id}`,
   },
   
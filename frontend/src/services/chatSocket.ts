@@ -0,0 +1,49 @@
+import { API_ENDPOINTS } from '../config/api';
+
+// Server -> client chat events (conversation, chunk, complete, error, ...)
+export interface ChatEvent {
+  type: string;
+  [key: string]: any;
+}
+
+export interface ChatSocketHandlers {
+  onEvent: (event: ChatEvent) => void;
+  onClose?: (event: CloseEvent) => void;
+}
+
+export interface ChatSocket {
+  socket: WebSocket;
+  send: (content: string) => void;
+  close: () => void;
+}
+
+// Chat WebSocket for an agent. Heartbeat pings are answered here and never
+// reach onEvent; the server counts the pongs as activity, so an idle but open
+// tab isn't closed by WS_IDLE_TIMEOUT_SECONDS.
+export const openChatSocket = (
+  agentId: number,
+  token: string,
+  handlers: ChatSocketHandlers,
+  conversationId?: number
+): ChatSocket => {
+  const socket = new WebSocket(API_ENDPOINTS.CHAT.WEBSOCKET(agentId, token, conversationId));
+
+  socket.onmessage = (message: MessageEvent) => {
+    const event: ChatEvent = JSON.parse(message.data);
+    if (event.type === 'ping') {
+      socket.send(JSON.stringify({ type: 'pong' }));
+      return;
+    }
+    if (event.type === 'pong') {
+      return;
+    }
+    handlers.onEvent(event);
+  };
+  socket.onclose = (event: CloseEvent) => handlers.onClose?.(event);
+
+  return {
+    socket,
+    send: (content: string) => socket.send(JSON.stringify({ type: 'message', content })),
+    close: () => socket.close(),
+  };
+};